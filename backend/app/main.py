@@ -2,6 +2,7 @@ from fastapi import FastAPI, HTTPException, Query, Request, Response, Background
 from fastapi.responses import StreamingResponse, RedirectResponse, HTMLResponse, FileResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.staticfiles import StaticFiles
+from starlette.background import BackgroundTask
 from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
@@ -12,13 +13,11 @@ from . import models, auth_utils
 import os
 import re
 import asyncio
-import httpx
 import subprocess
 import mutagen
 from urllib.parse import quote
 from unidecode import unidecode
 from thefuzz import fuzz
-import hashlib
 import time
 import json
 import uuid
@@ -26,6 +25,29 @@ import uuid
 # Importação dos Serviços
 from app.services.slskd_client import search_slskd, get_search_results, download_slskd, get_transfer_status
 from app.services.audio_manager import AudioManager
+from app.services.transcode_cache import TranscodeCache
+from app.services.file_streaming import range_file_response, stream_file_from
+from app.services.http_cache import (
+    IMMUTABLE_CACHE_CONTROL, MEDIA_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, PRIVATE_CACHE_CONTROL,
+    make_etag, validator_headers, is_not_modified, if_range_matches, not_modified_response,
+)
+from app.services.ffmpeg_pool import FFmpegPool
+from app.services.hls_service import HLSService
+from app.services.bandwidth_estimator import BandwidthEstimator
+from app.services.stream_metrics import StreamMetrics, StreamMetricsMiddleware
+from app.services.pretranscode_worker import PretranscodeWorker
+from app.services.cover_service import CoverService
+from app.services.cover_tokens import CoverTokens
+from app.services.artwork_proxy import ArtworkProxy
+from app.services.http_clients import HttpClients
+from app.services.provider_cache import ProviderCache
+from app.services.circuit_breaker import CircuitBreakers
+from app.services.request_deadline import RequestDeadline
+from app.services.stream_prefetch import StreamPrefetcher
+from app.services.library_index import LibraryIndex
+from app.services.library_scanner import LibraryScanner
+from app.services.metadata_cache import MetadataCache
+from app.services.genre_enricher import GenreEnricher
 from app.services.lyrics_provider import LyricsProvider
 from app.services.catalog_provider import CatalogProvider
 from app.services.tidal_provider import TidalProvider
@@ -47,12 +69,20 @@ models.Base.metadata.create_all(bind=engine)
 
 
 app = FastAPI(title="Orfeu API", version="2.4.0")
+# Instrumenta as respostas de mídia (métricas + vazão para o quality=auto)
+app.add_middleware(StreamMetricsMiddleware)
 
 # Esquema de Segurança
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 SECRET_KEY = os.getenv("SECRET_KEY", "uma_chave_super_secreta")
 ALGORITHM = "HS256"
 
+# Orçamento de tempo (s) das rotas que dependem de provedores externos: passado o prazo,
+# as chamadas restantes falham na hora e a rota responde com o que já tem
+RECOMMENDATIONS_BUDGET_SECONDS = float(os.getenv("RECOMMENDATIONS_BUDGET_SECONDS", "10"))
+ARTIST_BUDGET_SECONDS = float(os.getenv("ARTIST_BUDGET_SECONDS", "8"))
+SEARCH_BUDGET_SECONDS = float(os.getenv("SEARCH_BUDGET_SECONDS", "8"))
+
 # --- Configuração de Arquivos Estáticos (OTA Updates) ---
 os.makedirs("/downloads_public", exist_ok=True)
 # NOTE: Removed StaticFiles mount - using custom route download_file_with_headers() instead
@@ -63,13 +93,6 @@ os.makedirs("/downloads_public", exist_ok=True)
 PLAYLIST_COVERS_DIR = "/downloads_public/playlist_covers"
 os.makedirs(PLAYLIST_COVERS_DIR, exist_ok=True)
 
-# --- Constantes ---
-TIERS = {"low": "128k", "medium": "192k", "high": "320k", "lossless": "original"}
-
-# --- Cache de Proxy de Imagem ---
-SHORT_URL_MAP: Dict[str, dict] = {} 
-PROXY_EXPIRY_SECONDS = 3600
-
 # --- Modelos Pydantic para API ---
 class UserCreate(BaseModel):
     username: str
@@ -139,25 +162,34 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         raise HTTPException(status_code=401, detail="Usuário não encontrado")
     return user
 
+# Usernames com acesso às rotas de diagnóstico (separados por vírgula)
+ADMIN_USERNAMES = {u.strip() for u in os.getenv("ADMIN_USERNAMES", "").split(",") if u.strip()}
+
+async def get_admin_user(current_user: models.User = Depends(get_current_user)):
+    if current_user.username not in ADMIN_USERNAMES:
+        raise HTTPException(status_code=403, detail="Acesso restrito a administradores")
+    return current_user
+
 # --- Helpers ---
 async def download_file_background(url: str, dest_path: str, metadata: dict, cover_url: str = None):
     try:
         os.makedirs(os.path.dirname(dest_path), exist_ok=True)
         temp_path = dest_path + ".tmp"
-        async with httpx.AsyncClient() as client:
-            async with client.stream('GET', url) as response:
-                response.raise_for_status()
-                with open(temp_path, 'wb') as f:
-                    async for chunk in response.aiter_bytes():
-                        f.write(chunk)
+        client = HttpClients.get_async("downloads")
+        async with client.stream('GET', url) as response:
+            response.raise_for_status()
+            with open(temp_path, 'wb') as f:
+                async for chunk in response.aiter_bytes():
+                    f.write(chunk)
         
         cover_bytes = None
-        target_cover = cover_url or await LyricsProvider.get_online_cover(dest_path)
+        # Capa embutida sempre a original, mesmo que o app mande a URL do proxy de artes
+        target_cover = ArtworkProxy.original_url(cover_url) or await LyricsProvider.get_online_cover(dest_path)
         if target_cover:
             try:
-                async with httpx.AsyncClient() as client:
-                    resp = await client.get(target_cover, timeout=10.0)
-                    if resp.status_code == 200: cover_bytes = resp.content
+                client = HttpClients.get_async("artwork")
+                resp = await client.get(target_cover, timeout=10.0)
+                if resp.status_code == 200: cover_bytes = resp.content
             except: pass
         
         if os.path.exists(dest_path):
@@ -166,6 +198,9 @@ async def download_file_background(url: str, dest_path: str, metadata: dict, cov
         os.rename(temp_path, dest_path)
         if metadata: await run_in_threadpool(AudioManager.embed_metadata, dest_path, metadata, cover_bytes)
         print(f"✅ Download HTTP concluído e tagueado: {dest_path}")
+        LibraryIndex.add_path(dest_path)
+        # Deixa os tiers com perdas prontos antes do primeiro play
+        PretranscodeWorker.enqueue(dest_path)
     except Exception as e:
         print(f"❌ Erro download background: {e}")
         if os.path.exists(temp_path): os.remove(temp_path)
@@ -314,39 +349,26 @@ def register_download(tidal_id: int = None, ytmusic_id: str = None,
         db.close()
     return None
 
-def fetch_and_assign_genre(artist: str, album: str = None, title: str = None) -> str:
-    """
-    Busca o gênero de uma track usando a API do iTunes.
-    Retorna o gênero encontrado ou None.
-    """
-    try:
-        genre = MetadataProvider.get_genre(artist or "", album or "", title or "")
-        if genre and genre != "Desconhecido":
-            print(f"🎵 Gênero encontrado: {artist} - {title} → {genre}")
-            return genre
-    except Exception as e:
-        print(f"⚠️ Erro ao buscar gênero: {e}")
-    return None
-
-def get_short_cover_url(filename: str) -> str:
-    hash_object = hashlib.sha256(filename.encode())
-    short_hash = hash_object.hexdigest()[:12]
-    SHORT_URL_MAP[short_hash] = {
-        "filename": filename,
-        "expires": time.time() + PROXY_EXPIRY_SECONDS
-    }
+def get_short_cover_url(filename: str, track_id: Optional[int] = None) -> str:
+    # Token assinado (sem estado no servidor): com o id da faixa a URL fica mais curta
+    token = CoverTokens.sign(filename, track_id)
     # Substitua pelo seu domínio real em produção se necessário, ou use relativa
-    return f"https://orfeu.ocnaibill.dev/cover/short/{short_hash}"
+    return f"https://orfeu.ocnaibill.dev/cover/short/{token}"
 
 # --- ROTA CUSTOMIZADA PARA APK (Fix .zip extension on Android Chrome) ---
 from fastapi.responses import FileResponse
 
+# Artefatos com versão no nome (ex.: Orfeu-v1.6.0.apk) nunca mudam de conteúdo
+VERSIONED_DOWNLOAD_PATTERN = re.compile(r"-v\d+(\.\d+)+\.[A-Za-z0-9]+$")
+
 @app.get("/downloads/{filename:path}")
-async def download_file_with_headers(filename: str):
+async def download_file_with_headers(request: Request, filename: str):
     """
     Serve arquivos de download com headers corretos.
     APK files need explicit Content-Type and Content-Disposition to prevent
     browsers from adding .zip extension.
+    Versioned builds and playlist covers (unique names) are cached as immutable;
+    everything else must revalidate (ETag/Last-Modified, 304, Range/If-Range for resumes).
     """
     file_path = os.path.join("/downloads_public", filename)
     
@@ -366,15 +388,16 @@ async def download_file_with_headers(filename: str):
     
     # Extrai apenas o nome do arquivo para o Content-Disposition
     base_filename = os.path.basename(filename)
-    
-    return FileResponse(
+
+    immutable = VERSIONED_DOWNLOAD_PATTERN.search(base_filename) or filename.startswith("playlist_covers/")
+    return range_file_response(
+        request,
         file_path,
-        media_type=content_type,
-        filename=base_filename,
+        content_type,
         headers={
             "Content-Disposition": f'attachment; filename="{base_filename}"',
-            "Cache-Control": "no-cache"
-        }
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+        },
     )
 
 def get_update_config() -> dict:
@@ -632,6 +655,11 @@ async def startup_event():
     _genre_cache_task = asyncio.create_task(genre_cache_scheduler())
     print("🚀 Scheduler de cache de gêneros iniciado (atualização a cada 24h)")
 
+    TranscodeCache.start()
+    PretranscodeWorker.start()
+    LibraryIndex.start()
+    GenreEnricher.start()
+
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cancela o scheduler ao desligar."""
@@ -639,6 +667,10 @@ async def shutdown_event():
     if _genre_cache_task:
         _genre_cache_task.cancel()
         print("⏹️ Scheduler de cache de gêneros encerrado")
+    PretranscodeWorker.stop()
+    LibraryIndex.stop()
+    GenreEnricher.stop()
+    await HttpClients.close_all()
 
 # =====================================================
 # FIM DO SISTEMA DE CACHE DE GÊNEROS
@@ -991,24 +1023,22 @@ def toggle_favorite(req: FavoriteRequest, db: Session = Depends(get_db), current
         duration = 0
         try:
             fp = AudioManager.find_local_file(req.filename)
-            meta = AudioManager.get_audio_metadata(fp)
+            meta = MetadataCache.get_metadata(fp)
             duration = meta.get('duration', 0)
         except: pass
         
-        # Busca gênero automaticamente
-        genre = fetch_and_assign_genre(req.artist, req.album, req.title)
-        
         track = models.Track(
             filename=req.filename, 
             title=req.title, 
             artist=req.artist, 
             album=req.album, 
-            duration=duration,
-            genre=genre
+            duration=duration
         )
         db.add(track)
         db.commit()
         db.refresh(track)
+        # Gênero é buscado em background
+        GenreEnricher.enqueue(track.id, track.artist, track.album, track.title)
     
     # 2. Toggle Favorito
     fav = db.query(models.Favorite).filter(models.Favorite.user_id == current_user.id, models.Favorite.track_id == track.id).first()
@@ -1033,7 +1063,7 @@ def get_favorites(db: Session = Depends(get_db), current_user: models.User = Dep
         "album": t.album,
         "duration": t.duration,
         "format": t.filename.split('.')[-1] if t.filename else "",
-        "coverProxyUrl": get_short_cover_url(t.filename) if t.filename else None,
+        "coverProxyUrl": get_short_cover_url(t.filename, t.id) if t.filename else None,
         "isFavorite": True,
         "tidalId": t.tidal_id  # Inclui tidal_id para verificação de favoritos
     } for t in favorites]
@@ -1190,24 +1220,22 @@ def add_track_to_playlist(playlist_id: int, item: PlaylistItemAdd, db: Session =
         duration = 0
         try:
             fp = AudioManager.find_local_file(item.filename)
-            meta = AudioManager.get_audio_metadata(fp)
+            meta = MetadataCache.get_metadata(fp)
             duration = meta.get('duration', 0)
         except: pass
         
-        # Busca gênero automaticamente
-        genre = fetch_and_assign_genre(item.artist, item.album, item.title)
-        
         track = models.Track(
             filename=item.filename, 
             title=item.title or "Desconhecido", 
             artist=item.artist or "Desconhecido", 
             album=item.album, 
-            duration=duration,
-            genre=genre
+            duration=duration
         )
         db.add(track)
         db.commit()
         db.refresh(track)
+        # Gênero é buscado em background
+        GenreEnricher.enqueue(track.id, track.artist, track.album, track.title)
         
     # Adiciona à playlist no fim da lista
     last_item = db.query(models.PlaylistItem).filter(models.PlaylistItem.playlist_id == playlist_id).order_by(models.PlaylistItem.order.desc()).first()
@@ -1237,7 +1265,7 @@ def get_playlist_details(playlist_id: int, db: Session = Depends(get_db), curren
             "album": t.album,
             "duration": t.duration,
             "format": t.filename.split('.')[-1] if t.filename else "",
-            "coverProxyUrl": get_short_cover_url(t.filename) if t.filename else None,
+            "coverProxyUrl": get_short_cover_url(t.filename, t.id) if t.filename else None,
             "id": t.id,
             "playlist_item_id": item.id
         })
@@ -1353,6 +1381,7 @@ def get_trajectory(db: Session = Depends(get_db), current_user: models.User = De
     } for p in retro_playlists]
 
 @app.get("/home/discover")
+@RequestDeadline.limit(RECOMMENDATIONS_BUDGET_SECONDS)
 async def get_discover_weekly(limit: int = 10, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     """
     Descobertas da Semana - Artistas que você ainda não ouviu mas pode gostar.
@@ -1392,76 +1421,66 @@ async def get_discover_weekly(limit: int = 10, db: Session = Depends(get_db), cu
         if top_artists_query:
             top_artist_names = [a[0] for a in top_artists_query[:5]]  # Top 5
             
-            for base_artist in top_artist_names:
-                if len(discoveries) >= limit:
-                    break
-                
-                # Busca artistas similares via Last.fm
-                similar_artists = await run_in_threadpool(
-                    LastfmProvider.get_similar_artists, 
-                    base_artist, 
-                    8  # 8 similares por artista base
-                )
-                
-                if not similar_artists:
-                    continue
-                
-                # Ordena por match score (maior similaridade primeiro)
-                similar_artists.sort(key=lambda x: x.get('match', 0), reverse=True)
-                
-                for similar in similar_artists:
-                    artist_name = similar.get('name', '')
-                    artist_lower = artist_name.lower()
+            # Similares de todos os artistas base ao mesmo tempo (prazo da rota vale para todos)
+            similar_lists = await asyncio.gather(*(
+                run_in_threadpool(LastfmProvider.get_similar_artists, base_artist, 8)  # 8 similares por artista base
+                for base_artist in top_artist_names
+            ))
+            
+            # Candidatos na ordem: artista base mais ouvido primeiro, maior similaridade primeiro
+            candidates = []
+            candidate_names = set()
+            for base_artist, similar_artists in zip(top_artist_names, similar_lists):
+                for similar in sorted(similar_artists or [], key=lambda x: x.get('match', 0), reverse=True):
+                    artist_lower = similar.get('name', '').lower()
                     
-                    # Pula se já conhece ou já foi adicionado
-                    if artist_lower in known_artists or artist_lower in seen_artists:
+                    # Pula se já conhece, já é candidato ou o match é muito baixo
+                    if artist_lower in known_artists or artist_lower in candidate_names:
                         continue
-                    
-                    # Pula se match muito baixo
                     if similar.get('match', 0) < 0.1:
                         continue
                     
-                    seen_artists.add(artist_lower)
-                    
-                    # Busca o álbum mais recente desse artista no Tidal
-                    try:
-                        albums = await run_in_threadpool(
-                            TidalProvider.search_catalog,
-                            artist_name,
-                            3,
-                            "album"
-                        )
-                        
-                        # Filtra álbuns do artista correto
-                        artist_albums = [
-                            a for a in albums 
-                            if a.get('artistName', '').lower() == artist_lower
-                        ]
-                        
-                        if artist_albums:
-                            album = artist_albums[0]
-                            discoveries.append({
-                                "title": album['collectionName'],
-                                "artist": album['artistName'],
-                                "imageUrl": album.get('artworkUrl', similar.get('image', '')),
-                                "type": "album",
-                                "id": album['collectionId'],
-                                "reason": f"Porque você curte {base_artist}",
-                                "matchScore": similar.get('match', 0)
-                            })
-                            
-                            if len(discoveries) >= limit:
-                                break
-                    except Exception as e:
-                        print(f"⚠️ Erro buscando álbum de {artist_name}: {e}")
+                    candidate_names.add(artist_lower)
+                    candidates.append((base_artist, similar))
+            
+            async def fetch_album(artist_name: str):
+                """Álbum mais recente do artista no Tidal (None se não achou)."""
+                try:
+                    albums = await TidalProvider.search_catalog_async(artist_name, 3, "album")
+                    # Filtra álbuns do artista correto
+                    artist_albums = [a for a in albums if a.get('artistName', '').lower() == artist_name.lower()]
+                    return artist_albums[0] if artist_albums else None
+                except Exception as e:
+                    print(f"⚠️ Erro buscando álbum de {artist_name}: {e}")
+                    return None
+            
+            # Busca os álbuns em lotes do tamanho do que falta: não consulta artistas além do necessário
+            position = 0
+            while position < len(candidates) and len(discoveries) < limit and not RequestDeadline.expired():
+                batch = candidates[position:position + limit - len(discoveries)]
+                position += len(batch)
+                albums = await asyncio.gather(*(fetch_album(similar.get('name', '')) for _, similar in batch))
+                
+                for (base_artist, similar), album in zip(batch, albums):
+                    seen_artists.add(similar.get('name', '').lower())
+                    if not album:
                         continue
+                    discoveries.append({
+                        "title": album['collectionName'],
+                        "artist": album['artistName'],
+                        "imageUrl": album.get('artworkUrl', similar.get('image', '')),
+                        "type": "album",
+                        "id": album['collectionId'],
+                        "reason": f"Porque você curte {base_artist}",
+                        "matchScore": similar.get('match', 0)
+                    })
         
         # 3. FALLBACK: Usuário novo sem histórico - usa gêneros populares
         if len(discoveries) < limit:
             fallback_tags = ["indie", "alternative", "pop", "electronic", "rock"]
             
             for tag in fallback_tags:
-                if len(discoveries) >= limit:
+                if len(discoveries) >= limit or RequestDeadline.expired():
                     break
                 
                 try:
@@ -1481,12 +1500,7 @@ async def get_discover_weekly(limit: int = 10, db: Session = Depends(get_db), cu
                         seen_artists.add(artist_lower)
                         
                         # Busca álbum via Tidal
-                        albums = await run_in_threadpool(
-                            TidalProvider.search_catalog,
-                            artist_name,
-                            1,
-                            "album"
-                        )
+                        albums = await TidalProvider.search_catalog_async(artist_name, 1, "album")
                         
                         if albums:
                             album = albums[0]
@@ -1499,7 +1513,7 @@ async def get_discover_weekly(limit: int = 10, db: Session = Depends(get_db), cu
                                 "reason": f"Popular em {tag.capitalize()}"
                             })
                             
-                            if len(discoveries) >= limit:
+                            if len(discoveries) >= limit or RequestDeadline.expired():
                                 break
                 except:
                     continue
@@ -1524,6 +1538,7 @@ async def get_discover_weekly(limit: int = 10, db: Session = Depends(get_db), cu
         return []
 
 @app.get("/home/recommendations")
+@RequestDeadline.limit(RECOMMENDATIONS_BUDGET_SECONDS)
 async def get_recommendations(limit: int = 10, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     """
     Recomendações personalizadas baseadas no histórico real do usuário.
@@ -1592,18 +1607,14 @@ async def get_recommendations(limit: int = 10, db: Session = Depends(get_db), cu
         if top_artists and len(recommendations) < limit:
             print(f"🥇 Fase OURO: Buscando discografia dos top artistas...")
             
-            for artist in top_artists[:5]:  # Top 5 artistas
-                if len(recommendations) >= limit:
-                    break
-                    
+            async def fetch_releases(artist: str) -> list:
+                """Lançamentos do artista no Tidal, mais recentes primeiro ([] se não achou)."""
                 try:
                     # Busca o artista no Tidal para pegar o ID
-                    artist_search = await run_in_threadpool(
-                        TidalProvider.search_catalog, artist, 1, "artist"
-                    )
+                    artist_search = await TidalProvider.search_catalog_async(artist, 1, "artist")
                     
                     if not artist_search:
-                        continue
+                        return []
                     
                     # Verifica se é realmente o artista certo
                     found_artist = artist_search[0]
@@ -1611,54 +1622,61 @@ async def get_recommendations(limit: int = 10, db: Session = Depends(get_db), cu
                         normalize_text(artist), 
                         normalize_text(found_artist.get('artistName', ''))
                     ) < 85:
-                        continue
+                        return []
                     
                     artist_id = found_artist.get('artistId')
                     if not artist_id:
-                        continue
+                        return []
                     
                     # Busca detalhes do artista (inclui álbuns)
-                    artist_details = await run_in_threadpool(
-                        TidalProvider.get_artist_details, artist_id
-                    )
+                    artist_details = await TidalProvider.get_artist_details_async(artist_id)
                     
                     if not artist_details:
-                        continue
+                        return []
                     
                     # Pega álbuns e singles
                     all_releases = artist_details.get('albums', []) + artist_details.get('singles', [])
                     
                     # Ordena por data de lançamento (mais recente primeiro)
                     all_releases.sort(key=lambda x: x.get('releaseDate', '0000'), reverse=True)
-                    
-                    for release in all_releases[:3]:  # Top 3 releases por artista
-                        album_name = release.get('collectionName', '')
-                        album_id = release.get('collectionId')
-                        
-                        if not album_id or album_id in seen_ids:
-                            continue
-                        
-                        # Não recomenda álbuns já ouvidos
-                        if normalize_text(album_name) in listened_albums_set:
-                            continue
-                        
-                        seen_ids.add(album_id)
-                        recommendations.append({
-                            "title": album_name,
-                            "artist": release.get('artistName', artist),
-                            "imageUrl": release.get('artworkUrl', ''),
-                            "type": "album",
-                            "id": album_id,
-                            "year": release.get('year', ''),
-                            "reason": f"Mais de {artist}"
-                        })
-                        
-                        if len(recommendations) >= limit:
-                            break
-                            
+                    return all_releases
                 except Exception as e:
                     print(f"   ⚠️ Erro buscando álbuns de {artist}: {e}")
-                    continue
+                    return []
+            
+            # Top 5 artistas consultados ao mesmo tempo (o prazo da rota vale para todos);
+            # a montagem segue a ordem de quem mais ouve
+            top_five = top_artists[:5]
+            releases_by_artist = await asyncio.gather(*(fetch_releases(artist) for artist in top_five))
+            
+            for artist, all_releases in zip(top_five, releases_by_artist):
+                if len(recommendations) >= limit:
+                    break
+                
+                for release in all_releases[:3]:  # Top 3 releases por artista
+                    album_name = release.get('collectionName', '')
+                    album_id = release.get('collectionId')
+                    
+                    if not album_id or album_id in seen_ids:
+                        continue
+                    
+                    # Não recomenda álbuns já ouvidos
+                    if normalize_text(album_name) in listened_albums_set:
+                        continue
+                    
+                    seen_ids.add(album_id)
+                    recommendations.append({
+                        "title": album_name,
+                        "artist": release.get('artistName', artist),
+                        "imageUrl": release.get('artworkUrl', ''),
+                        "type": "album",
+                        "id": album_id,
+                        "year": release.get('year', ''),
+                        "reason": f"Mais de {artist}"
+                    })
+                    
+                    if len(recommendations) >= limit:
+                        break
         
         # =========================================================
         # 3. FASE PRATA: Artistas do mesmo gênero
@@ -1667,15 +1685,13 @@ async def get_recommendations(limit: int = 10, db: Session = Depends(get_db), cu
             print(f"🥈 Fase PRATA: Buscando artistas dos gêneros {user_genres}...")
             
             for genre in user_genres:
-                if len(recommendations) >= limit:
+                if len(recommendations) >= limit or RequestDeadline.expired():
                     break
                 
                 try:
                     # Busca artistas específicos do gênero (não genérico)
                     # Usa o gênero + "artist" para buscar artistas reais
-                    genre_artists = await run_in_threadpool(
-                        TidalProvider.search_catalog, f"{genre}", 10, "artist"
-                    )
+                    genre_artists = await TidalProvider.search_catalog_async(f"{genre}", 10, "artist")
                     
                     if not genre_artists:
                         continue
@@ -1697,9 +1713,7 @@ async def get_recommendations(limit: int = 10, db: Session = Depends(get_db), cu
                         try:
                             artist_id = genre_artist.get('artistId')
                             if artist_id:
-                                artist_details = await run_in_threadpool(
-                                    TidalProvider.get_artist_details, artist_id
-                                )
+                                artist_details = await TidalProvider.get_artist_details_async(artist_id)
                                 
                                 if artist_details and artist_details.get('albums'):
                                     top_album = artist_details['albums'][0]
@@ -1717,7 +1731,7 @@ async def get_recommendations(limit: int = 10, db: Session = Depends(get_db), cu
                                             "reason": f"Porque você curte {genre}"
                                         })
                                         
-                                        if len(recommendations) >= limit:
+                                        if len(recommendations) >= limit or RequestDeadline.expired():
                                             break
                         except:
                             continue
@@ -1736,20 +1750,16 @@ async def get_recommendations(limit: int = 10, db: Session = Depends(get_db), cu
                 if saved_artist.lower() in top_artists_lower:
                     continue  # Já coberto na fase ouro
                     
-                if len(recommendations) >= limit:
+                if len(recommendations) >= limit or RequestDeadline.expired():
                     break
                 
                 try:
-                    artist_search = await run_in_threadpool(
-                        TidalProvider.search_catalog, saved_artist, 1, "artist"
-                    )
+                    artist_search = await TidalProvider.search_catalog_async(saved_artist, 1, "artist")
                     
                     if artist_search:
                         artist_id = artist_search[0].get('artistId')
                         if artist_id:
-                            artist_details = await run_in_threadpool(
-                                TidalProvider.get_artist_details, artist_id
-                            )
+                            artist_details = await TidalProvider.get_artist_details_async(artist_id)
                             
                             if artist_details and artist_details.get('albums'):
                                 for album in artist_details['albums'][:2]:
@@ -1772,7 +1782,7 @@ async def get_recommendations(limit: int = 10, db: Session = Depends(get_db), cu
                                         "reason": f"Da sua biblioteca"
                                     })
                                     
-                                    if len(recommendations) >= limit:
+                                    if len(recommendations) >= limit or RequestDeadline.expired():
                                         break
                 except:
                     continue
@@ -1829,7 +1839,7 @@ async def get_new_releases(limit: int = 10, db: Session = Depends(get_db), curre
         print("📢 Usuário sem histórico suficiente, buscando novidades gerais...")
         try:
             # Busca álbuns populares/novos
-            results = await run_in_threadpool(TidalProvider.search_catalog, "new releases 2024", limit, "album")
+            results = await TidalProvider.search_catalog_async("new releases 2024", limit, "album")
             
             if results:
                 return [{
@@ -2099,8 +2109,8 @@ def log_history(req: HistoryRequest, db: Session = Depends(get_db), current_user
     if not track:
         try:
             fp = AudioManager.find_local_file(req.filename)
-            meta = AudioManager.get_audio_metadata(fp)
-            tags = AudioManager.get_audio_tags(fp)
+            info = MetadataCache.get(fp)
+            meta, tags = info["metadata"], info["tags"]
             
             # PRIORIDADE: Metadados do catálogo > Tags do arquivo
             # Isso evita problemas com arquivos que têm metadados incorretos
@@ -2108,10 +2118,10 @@ def log_history(req: HistoryRequest, db: Session = Depends(get_db), current_user
             album_name = req.catalog_album or tags.get('album')
             title_name = req.catalog_title or tags.get('title') or os.path.splitext(req.filename)[0]
             
-            # Busca gênero: primeiro do request, depois dos metadados, depois online
+            # Gênero: primeiro do request, depois dos metadados; sem nenhum, busca online em background
             genre = req.genre or tags.get('genre')
-            if not genre or genre == "" or genre == "Desconhecido":
-                genre = fetch_and_assign_genre(artist_name, album_name, title_name)
+            if genre == "Desconhecido":
+                genre = None
             
             track = models.Track(
                 filename=req.filename,
@@ -2127,6 +2137,8 @@ def log_history(req: HistoryRequest, db: Session = Depends(get_db), current_user
             db.add(track)
             db.commit()
             db.refresh(track)
+            if not genre:
+                GenreEnricher.enqueue(track.id, artist_name, album_name, title_name)
         except Exception as e:
             print(f"⚠️ Erro ao criar track no histórico: {e}")
             return {"status": "error", "message": "Track não encontrada"}
@@ -2160,10 +2172,7 @@ def log_history(req: HistoryRequest, db: Session = Depends(get_db), current_user
                 track.genre = req.genre
                 updated = True
             else:
-                genre = fetch_and_assign_genre(track.artist, track.album, track.title)
-                if genre:
-                    track.genre = genre
-                    updated = True
+                GenreEnricher.enqueue(track.id, track.artist, track.album, track.title)
         if updated:
             db.commit()
     
@@ -2178,56 +2187,40 @@ def log_history(req: HistoryRequest, db: Session = Depends(get_db), current_user
 # Precisamos atualizar a função de biblioteca para ler do Banco de Dados
 # e uma função background para popular o banco com os arquivos do disco.
 
-async def sync_files_to_db(db: Session):
-    print("🔄 Sincronizando arquivos do disco para o DB...")
-    base_path = "/downloads"
-    for root, dirs, files in os.walk(base_path):
-        for file in files:
-            if file.lower().endswith(('.flac', '.mp3', '.m4a')):
-                full_path = os.path.join(root, file)
-                rel_path = os.path.relpath(full_path, base_path)
-                
-                # Verifica se já existe no banco
-                exists = db.query(models.Track).filter(models.Track.filename == rel_path).first()
-                if not exists:
-                    try:
-                        # Lê metadados
-                        from app.services.audio_manager import AudioManager
-                        tags = AudioManager.get_audio_tags(full_path)
-                        meta = AudioManager.get_audio_metadata(full_path)
-                        
-                        # Se não tem gênero nos metadados, busca online
-                        genre = tags.get('genre')
-                        if not genre or genre == "" or genre == "Desconhecido":
-                            artist = tags.get('artist') or "Desconhecido"
-                            album = tags.get('album')
-                            title = tags.get('title') or file
-                            genre = fetch_and_assign_genre(artist, album, title)
-                        
-                        track = models.Track(
-                            filename=rel_path,
-                            title=tags.get('title') or file,
-                            artist=tags.get('artist') or "Desconhecido",
-                            album=tags.get('album'),
-                            genre=genre,
-                            duration=meta.get('duration', 0),
-                            format=meta.get('format'),
-                            bitrate=meta.get('bitrate')
-                        )
-                        db.add(track)
-                    except Exception as e:
-                        print(f"Erro ao indexar {file}: {e}")
-    db.commit()
-    print("✅ Sincronização concluída.")
-
 @app.post("/library/scan")
-async def scan_library_db(background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def scan_library_db():
     """
     Força uma varredura no disco e atualiza o Banco de Dados.
+    Incremental (só arquivos novos/alterados são relidos) e em background; acompanhe em /library/scan/status.
     """
-    background_tasks.add_task(sync_files_to_db, db)
+    if not LibraryScanner.start():
+        return {"status": "running", "message": "Já existe uma indexação em andamento.", "progress": LibraryScanner.status()}
     return {"status": "started", "message": "Indexação iniciada."}
 
+@app.get("/library/scan/status")
+def get_library_scan_status(admin: models.User = Depends(get_admin_user)):
+    """Progresso da última varredura (fase, arquivos novos/alterados/removidos, processados, erros)."""
+    return LibraryScanner.status()
+
+@app.get("/library/genre-enrichment-status")
+def get_genre_enrichment_status(admin: models.User = Depends(get_admin_user)):
+    """Fila de busca de gêneros em background (pendentes, em retry, faixas atualizadas)."""
+    return GenreEnricher.stats()
+
+@app.get("/admin/providers/health")
+def get_providers_health(admin: models.User = Depends(get_admin_user)):
+    """Estado dos disjuntores de cada provedor externo (fechado/aberto/meio-aberto), clientes HTTP e cache."""
+    return {
+        "breakers": CircuitBreakers.stats(),
+        "http_clients": HttpClients.stats(),
+        "cache": ProviderCache.stats(),
+    }
+
+@app.get("/providers/cache-status")
+def get_provider_cache_status(admin: models.User = Depends(get_admin_user)):
+    """Cache das respostas de Tidal/YTMusic/Last.fm/iTunes: hits por camada, stale, negativos e misses por endpoint."""
+    return ProviderCache.stats()
+
 # --- NOVA ROTA DE BIBLIOTECA (VIA DB) ---
 @app.get("/library")
 def get_library_db(db: Session = Depends(get_db)):
@@ -2428,22 +2421,37 @@ def latest_version_check():
 
 # --- PROXY IMAGEM DISCORD ---
 @app.get("/cover/short/{hash_id}")
-async def proxy_cover_art(hash_id: str):
-    item = SHORT_URL_MAP.get(hash_id)
-    if not item: raise HTTPException(404, "Cover hash inválido.")
-    if time.time() > item["expires"]:
-        del SHORT_URL_MAP[hash_id]
-        raise HTTPException(404, "Cover hash expirado.")
-    filename = item["filename"]
-    return RedirectResponse(f"/cover?filename={quote(filename)}", status_code=302)
+async def proxy_cover_art(
+    request: Request, hash_id: str, size: Optional[int] = None, format: Optional[str] = None, db: Session = Depends(get_db)
+):
+    track_id, filename = CoverTokens.verify(hash_id)
+    if track_id is not None:
+        track = db.query(models.Track.filename).filter(models.Track.id == track_id).first()
+        if not track: raise HTTPException(404, "Cover hash inválido.")
+        filename = track.filename
+    # Serve a imagem direto (sem o 302 para /cover)
+    full_path = AudioManager.find_local_file(filename)
+    return await cover_response(request, full_path, size, format)
 
 # --- BUSCA ---
+# Prazo da busca no catálogo: o provedor que não responder até aqui fica de fora da página
+SEARCH_DEADLINE_SECONDS = float(os.getenv("SEARCH_DEADLINE_SECONDS", "3.5"))
+_late_searches: set = set()  # Buscas atrasadas terminam em background (e aquecem o ProviderCache)
+
+def _finish_in_background(task: asyncio.Task):
+    _late_searches.add(task)
+    task.add_done_callback(_late_searches.discard)
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
 @app.get("/search/catalog")
+@RequestDeadline.limit(SEARCH_BUDGET_SECONDS)
 async def search_catalog(
+    response: Response,
     query: str, 
     limit: int = 20, 
     offset: int = 0, 
-    type: str = Query("song", enum=["song", "album", "artist"]) 
+    type: str = Query("song", enum=["song", "album", "artist"]),
+    artwork_size: int = ArtworkProxy.DEFAULT_SIZE,
 ):
     """
     Busca no catálogo de músicas.
@@ -2457,19 +2465,35 @@ async def search_catalog(
     yt_results = []
     tidal_results = []
     
-    # 1. TIDAL PRIMEIRO (metadados ricos, capas HD, IDs de álbum/artista)
-    try:
-        tidal_results = await run_in_threadpool(TidalProvider.search_catalog, query, fetch_limit, type)
-        print(f"   ✅ Tidal retornou {len(tidal_results)} resultados.")
-    except Exception as e:
-        print(f"   ❌ Erro no Tidal: {e}")
-    
-    # 2. YouTube Music em paralelo (para cobertura adicional de músicas não no Tidal)
-    try:
-        yt_results = await run_in_threadpool(CatalogProvider.search_catalog, query, type, fetch_limit)
-        print(f"   ✅ YTMusic retornou {len(yt_results)} resultados.")
-    except Exception as e:
-        print(f"   ❌ Erro no YTMusic: {e}")
+    # 1. TIDAL (metadados ricos, capas HD, IDs de álbum/artista) e 2. YouTube Music (cobertura extra), em paralelo
+    tasks = {
+        "tidal": asyncio.create_task(TidalProvider.search_catalog_async(query, fetch_limit, type)),
+        "ytmusic": asyncio.create_task(run_in_threadpool(CatalogProvider.search_catalog, query, type, fetch_limit)),
+    }
+    done, pending = await asyncio.wait(tasks.values(), timeout=SEARCH_DEADLINE_SECONDS)
+    if not done:
+        # Nenhum respondeu no prazo: fica com o primeiro que responder
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+    missing = []
+    for name, task in tasks.items():
+        if task in pending:
+            print(f"   ⏱️ {name} passou do prazo de {SEARCH_DEADLINE_SECONDS}s, ficou de fora.")
+            _finish_in_background(task)
+            missing.append(name)
+            continue
+        try:
+            if name == "tidal":
+                tidal_results = task.result()
+            else:
+                yt_results = task.result()
+            print(f"   ✅ {name} retornou {len(task.result())} resultados.")
+        except Exception as e:
+            print(f"   ❌ Erro no {name}: {e}")
+            missing.append(name)
+    if missing:
+        # O corpo continua sendo a lista; o app lê o header para oferecer "buscar de novo"
+        response.headers["X-Partial-Results"] = ",".join(missing)
     
     # 3. Mescla resultados com deduplicação inteligente (Tidal é prioritário)
     results = merge_and_deduplicate_results(tidal_results, yt_results, type)
@@ -2502,7 +2526,7 @@ async def search_catalog(
             
             if local_file:
                 try:
-                    tags = AudioManager.get_audio_tags(local_file)
+                    tags = await run_in_threadpool(MetadataCache.get_tags, local_file)
                     item['genre'] = tags.get('genre')
                 except:
                     pass
@@ -2510,7 +2534,7 @@ async def search_catalog(
             item['isDownloaded'] = False
             item['filename'] = None
 
-    return final_page
+    return ArtworkProxy.rewrite(final_page, artwork_size)
 
 
 def merge_and_deduplicate_results(primary_results: list, secondary_results: list, result_type: str) -> list:
@@ -2574,7 +2598,8 @@ def merge_and_deduplicate_results(primary_results: list, secondary_results: list
     return final_results
 
 @app.get("/catalog/artist/{artist_id}")
-async def get_artist_details(artist_id: str):
+@RequestDeadline.limit(ARTIST_BUDGET_SECONDS)
+async def get_artist_details(artist_id: str, artwork_size: int = 640):
     """
     Retorna detalhes completos do artista (Bio, Álbuns, Singles, Top Tracks).
     Suporta TIDAL (IDs numéricos) e YTMusic (IDs alfanuméricos/UC...).
@@ -2587,7 +2612,7 @@ async def get_artist_details(artist_id: str):
         if artist_id.isdigit():
              # TIDAL
              print(f"🎤 Buscando artista no TIDAL: {artist_id}")
-             result = await run_in_threadpool(TidalProvider.get_artist_details, artist_id)
+             result = await TidalProvider.get_artist_details_async(artist_id)
         else:
              # YTMUSIC (IDs geralmente começam com 'UC' ou 'U' ou hash longo)
              print(f"🎤 Buscando artista no YTMusic: {artist_id}")
@@ -2642,7 +2667,7 @@ async def get_artist_details(artist_id: str):
                 if not result["artist"].get("artworkUrl") and lastfm_info.get("image"):
                     result["artist"]["artworkUrl"] = lastfm_info["image"]
         
-        return result
+        return ArtworkProxy.rewrite(result, artwork_size)
 
     except HTTPException:
         raise
@@ -2651,7 +2676,7 @@ async def get_artist_details(artist_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/catalog/album/{collection_id}")
-async def get_album_details(collection_id: str):
+async def get_album_details(collection_id: str, artwork_size: int = 640):
     """
     Busca detalhes do álbum. Tenta Tidal primeiro, depois YTMusic.
     Agora enriquece com GÊNERO via iTunes.
@@ -2660,15 +2685,15 @@ async def get_album_details(collection_id: str):
         # Identifica provider pelo formato do ID
         if collection_id.isdigit():
              # TIDAL
-             return await run_in_threadpool(TidalProvider.get_album_details, collection_id)
+             details = await TidalProvider.get_album_details_async(collection_id)
         else:
              # YTMUSIC
              details = await run_in_threadpool(CatalogProvider.get_album_details, collection_id)
              # Enriquece YTMusic com gênero
              if details and not details.get('genre'):
-                  genre = await run_in_threadpool(MetadataProvider.get_genre, details['artistName'], details['collectionName'])
+                  genre = await MetadataProvider.get_genre_async(details['artistName'], details['collectionName'])
                   details['genre'] = genre
-             return details
+        return ArtworkProxy.rewrite(details, artwork_size)
 
     except Exception as e:
         print(f"❌ Erro rota album: {e}")
@@ -2722,7 +2747,7 @@ async def smart_download(request: SmartDownloadRequest, background_tasks: Backgr
         print(f"🔍 Sem Tidal ID, buscando no Tidal: '{request.artist} {request.track}'")
         try:
             search_query = f"{request.artist} {request.track}"
-            tidal_results = await run_in_threadpool(TidalProvider.search_catalog, search_query, 5, "song")
+            tidal_results = await TidalProvider.search_catalog_async(search_query, 5, "song")
             
             if tidal_results:
                 print(f"   📋 Tidal retornou {len(tidal_results)} resultados")
@@ -2759,7 +2784,7 @@ async def smart_download(request: SmartDownloadRequest, background_tasks: Backgr
 
     if target_tidal_id:
         print(f"🌊 Tentando download Tidal (ID: {target_tidal_id})...")
-        download_info = await run_in_threadpool(TidalProvider.get_download_url, target_tidal_id)
+        download_info = await TidalProvider.get_download_url_async(target_tidal_id)
         if download_info and download_info.get('url'):
             safe_artist = normalize_text(request.artist).replace(" ", "_")
             safe_track = normalize_text(request.track).replace(" ", "_")
@@ -2887,6 +2912,12 @@ async def check_download_status(filename: str):
         if "Tidal" in path and size > 1000000:
              return {"state": "Completed", "progress": 100.0, "speed": 0, "message": "Tidal Download"}
         if size > 0 and "Tidal" not in path: 
+             # O arquivo já existe enquanto o slskd ainda grava: só está pronto quando a transferência termina
+             status = await get_transfer_status(filename)
+             if status and status["state"] in ("Downloading", "Queued"):
+                 return status
+             # Transferência do Soulseek concluída: agenda o pré-transcode do arquivo completo
+             PretranscodeWorker.enqueue(path)
              return {"state": "Completed", "progress": 100.0, "speed": 0, "message": "Pronto"}
     except HTTPException: pass
     status = await get_transfer_status(filename)
@@ -2900,7 +2931,7 @@ async def auto_download_best(request: AutoDownloadRequest):
 @app.get("/metadata")
 async def get_track_details(filename: str):
     full_path = AudioManager.find_local_file(filename)
-    meta = AudioManager.get_audio_metadata(full_path)
+    meta = await run_in_threadpool(MetadataCache.get_metadata, full_path)
     meta['coverProxyUrl'] = get_short_cover_url(filename) # PROXY PÚBLICO
     return meta
 
@@ -2911,17 +2942,116 @@ async def get_lyrics(filename: str):
     if not lyrics: raise HTTPException(404, "Letra não encontrada")
     return lyrics
 
-@app.get("/cover")
-async def get_cover_art(filename: str):
-    full_path = AudioManager.find_local_file(filename)
-    try:
-        if AudioManager.extract_cover_stream(full_path): 
-             return StreamingResponse(AudioManager.extract_cover_stream(full_path), media_type="image/jpeg")
-    except: pass
+def cover_etag(digest: str, size: Optional[int], fmt: Optional[str]) -> str:
+    # ETag pelo conteúdo da imagem: re-taguear o arquivo sem trocar a capa não invalida o cache do cliente
+    return f'"{digest[:32]}-{size or "orig"}-{fmt or "orig"}"'
+
+async def cover_response(request: Request, full_path: str, size: Optional[int], format: Optional[str]) -> Response:
+    variant_size, variant_format = CoverService.variant_of(size, format)
+    digest = await CoverService.get_cover_digest(full_path)
+    if digest:
+        st = os.stat(full_path)
+        etag = cover_etag(digest, variant_size, variant_format)
+        cover_headers = validator_headers(etag, st.st_mtime, MEDIA_CACHE_CONTROL)
+        if is_not_modified(request, etag, st.st_mtime):
+            return not_modified_response(cover_headers)
+        cover = await CoverService.get_cover(full_path, size, format)
+        if cover:
+            return Response(cover[0], media_type=cover[1], headers=cover_headers)
     url = await LyricsProvider.get_online_cover(full_path)
     if url: return RedirectResponse(url)
     raise HTTPException(404, "Capa não encontrada")
 
+@app.get("/cover")
+async def get_cover_art(request: Request, filename: str, size: Optional[int] = None, format: Optional[str] = None):
+    """
+    Capa embutida no arquivo. 'size' (px, arredondado para 64/300/640) e 'format' (jpeg/webp)
+    pedem uma miniatura; sem eles, a imagem original. Sem capa embutida, redireciona para a do iTunes.
+    """
+    full_path = AudioManager.find_local_file(filename)
+    return await cover_response(request, full_path, size, format)
+
+@app.get("/artwork")
+async def get_artwork(request: Request, url: str, size: Optional[int] = ArtworkProxy.DEFAULT_SIZE, format: Optional[str] = None):
+    """
+    Proxy das artes remotas do catálogo (Tidal/YouTube/Last.fm), com cache em disco e miniaturas
+    em 64/300/640 px. As URLs vêm prontas no artworkUrl das respostas de busca, álbum e artista.
+    """
+    variant_size, variant_format = CoverService.variant_of(size, format)
+    etag = ArtworkProxy.etag(url, variant_size, variant_format)
+    # A arte de uma URL remota não muda (Tidal/YouTube usam ids de conteúdo no caminho)
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    # Sem Last-Modified: só If-None-Match vale
+    if request.headers.get("if-none-match") and is_not_modified(request, etag, 0):
+        return not_modified_response(headers)
+    data, media_type = await ArtworkProxy.get(url, size, format)
+    return Response(data, media_type=media_type, headers=headers)
+
+class CoverBatchRequest(BaseModel):
+    filenames: List[str] = []
+    track_ids: List[int] = []
+    size: Optional[int] = 300
+    format: Optional[str] = "jpeg"
+
+COVER_BATCH_MAX = 100
+
+@app.post("/cover/batch")
+async def get_cover_batch(req: CoverBatchRequest, db: Session = Depends(get_db)):
+    """
+    Várias capas numa resposta só (grades da biblioteca, favoritos e playlists).
+    Responde multipart/mixed: a primeira parte é um índice JSON com uma entrada por item
+    pedido (filenames, depois track_ids), com status 200/404 e o número da parte da imagem
+    (1 = primeira depois do índice). Itens com a mesma capa apontam para a mesma parte.
+    Cada parte de imagem traz Content-Type, ETag e X-Orfeu-Cover-Key (a primeira chave que a usou).
+    """
+    keys = [("filename", f) for f in req.filenames] + [("track_id", t) for t in req.track_ids]
+    if not keys:
+        raise HTTPException(400, "Informe filenames ou track_ids.")
+    if len(keys) > COVER_BATCH_MAX:
+        raise HTTPException(400, f"No máximo {COVER_BATCH_MAX} capas por pedido.")
+    variant_size, variant_format = CoverService.variant_of(req.size, req.format)
+
+    track_files = {}
+    if req.track_ids:
+        track_files = dict(db.query(models.Track.id, models.Track.filename).filter(models.Track.id.in_(req.track_ids)).all())
+
+    def resolve(kind, value):
+        filename = value if kind == "filename" else track_files.get(value)
+        if not filename:
+            return None
+        try:
+            return AudioManager.find_local_file(filename)
+        except HTTPException:
+            return None
+
+    paths = await run_in_threadpool(lambda: [resolve(kind, value) for kind, value in keys])
+    covers = await CoverService.get_covers(paths, req.size, req.format)
+
+    index, parts, part_by_etag = [], [], {}
+    for (kind, value), cover in zip(keys, covers):
+        key = value if kind == "filename" else f"track:{value}"
+        if not cover:
+            index.append({"key": key, "status": 404})
+            continue
+        data, media_type, digest = cover
+        etag = cover_etag(digest, variant_size, variant_format)
+        # Faixas do mesmo álbum costumam ter a mesma capa: uma parte só, referenciada por todas
+        if etag not in part_by_etag:
+            parts.append((key, media_type, etag, data))
+            part_by_etag[etag] = len(parts)
+        index.append({"key": key, "status": 200, "part": part_by_etag[etag], "content_type": media_type, "etag": etag, "length": len(data)})
+
+    boundary = uuid.uuid4().hex
+    body = [f"--{boundary}\r\nContent-Type: application/json\r\n\r\n".encode(), json.dumps(index).encode(), b"\r\n"]
+    for key, media_type, etag, data in parts:
+        body.append((
+            f"--{boundary}\r\nContent-Type: {media_type}\r\nContent-Length: {len(data)}\r\n"
+            f"ETag: {etag}\r\nX-Orfeu-Cover-Key: {quote(str(key))}\r\n\r\n"
+        ).encode())
+        body += [data, b"\r\n"]
+    body.append(f"--{boundary}--\r\n".encode())
+    return Response(b"".join(body), media_type=f"multipart/mixed; boundary={boundary}", headers={"Cache-Control": "no-store"})
+
 
 # --- LETRAS SINCRONIZADAS ---
 from app.services.synced_lyrics_provider import (
@@ -3033,30 +3163,210 @@ async def get_plain_lyrics(filename: str):
 
 
 @app.get("/stream")
-async def stream_music(request: Request, filename: str, quality: str = Query("lossless")):
+async def stream_music(
+    request: Request,
+    filename: str,
+    quality: str = Query("lossless"),
+    start: float = Query(0.0, ge=0),
+    codec: str = Query("mp3"),
+):
+    """
+    quality: tier (low/medium/high, aac_*, opus_*, lossless) ou 'auto'.
+    Com 'auto' o tier sai da banda do cliente (header de dica ou vazão medida nas últimas
+    respostas), dentro da família de 'codec' (mp3, aac ou opus). O tier escolhido volta em X-Orfeu-Quality.
+    """
+    resolve_started = time.monotonic()
     full_path = AudioManager.find_local_file(filename)
+    StreamMetrics.annotate(resolve_seconds=time.monotonic() - resolve_started)
     print(f"🎵 Stream: '{filename}' -> '{full_path}'")  # Debug log
+    # Com auto a resposta depende da banda de quem pediu: não pode ir para cache compartilhado
+    cache_control = PRIVATE_CACHE_CONTROL if quality == "auto" else MEDIA_CACHE_CONTROL
+    if quality == "auto":
+        quality = BandwidthEstimator.choose_tier(request.headers, request.client, codec)
     if quality != "lossless":
-        return StreamingResponse(AudioManager.transcode_stream(full_path, quality), media_type="audio/mpeg")
-    
-    file_size = os.path.getsize(full_path)
-    range_header = request.headers.get("range")
-    if range_header:
-        byte_range = range_header.replace("bytes=", "").split("-")
-        start = int(byte_range[0])
-        end = int(byte_range[1]) if byte_range[1] else file_size - 1
-        if start >= file_size: return Response(status_code=416, headers={"Content-Range": f"bytes */{file_size}"})
-        chunk_size = (end - start) + 1
-        with open(full_path, "rb") as f:
-            f.seek(start)
-            data = f.read(chunk_size)
-        headers = {"Content-Range": f"bytes {start}-{end}/{file_size}", "Accept-Ranges": "bytes", "Content-Length": str(chunk_size), "Content-Type": "audio/flac"}
-        return Response(data, status_code=206, headers=headers)
-
-    headers = {"Content-Length": str(file_size), "Accept-Ranges": "bytes", "Content-Type": "audio/flac"}
-    def iterfile():
-        with open(full_path, "rb") as f: yield from f
-    return StreamingResponse(iterfile(), headers=headers)
+        quality = AudioManager.normalize_tier(quality)
+        StreamMetrics.annotate(tier=quality)
+        bitrate_bps = AudioManager.tier_bitrate_bps(quality)
+        tier_codec = AudioManager.tier_codec(quality)
+        media_type = tier_codec["media_type"]
+        tier_headers = {"X-Orfeu-Quality": quality, "Cache-Control": cache_control}
+
+        # Validador do tier vem do original: o encode completo é determinístico, então o
+        # stream ao vivo e a cópia em cache são a mesma representação
+        source_stat = os.stat(full_path)
+        tier_etag = make_etag(source_stat, quality)
+        if start == 0 and is_not_modified(request, tier_etag, source_stat.st_mtime):
+            StreamMetrics.annotate(source="not-modified")
+            return not_modified_response({**validator_headers(tier_etag, source_stat.st_mtime), **tier_headers})
+
+        # Tier já transcodificado antes? Serve do disco (com Range) sem gastar CPU com ffmpeg
+        cached_path = TranscodeCache.lookup(full_path, quality)
+        if cached_path and not (start > 0 and not tier_codec["byte_seekable"]):
+            if start > 0 and not request.headers.get("range"):
+                # CBR: posição em segundos vira offset em bytes direto no arquivo em cache
+                StreamMetrics.annotate(source="cache-seek")
+                return stream_file_from(cached_path, int(start * bitrate_bps / 8), media_type, tier_headers)
+            StreamMetrics.annotate(source="cache")
+            return range_file_response(
+                request, cached_path, media_type, tier_headers, etag=tier_etag, last_modified=source_stat.st_mtime
+            )
+
+        # Sem cache: um Range a partir do meio vira seek por tempo (bitrate alvo conhecido),
+        # em vez de codificar e mandar tudo que vem antes. Ogg/Opus não pode começar num
+        # offset arbitrário, então ali o Range é ignorado (200 com o encode completo, RFC 7233)
+        byte_offset = 0
+        if tier_codec["byte_seekable"] and if_range_matches(request, tier_etag, source_stat.st_mtime):
+            byte_offset = transcoded_range_offset(request.headers.get("range"))
+        if byte_offset:
+            start = byte_offset * 8 / bitrate_bps
+
+        if start > 0:
+            job = await AudioManager.transcode_stream(full_path, quality, start=start)
+            StreamMetrics.annotate(source="transcode-seek", queue_seconds=job.queue_seconds, spawn_seconds=job.spawn_seconds)
+            # Bytes a partir de um seek são aproximados: validador fraco
+            weak_etag = make_etag(source_stat, f"{quality}-{start:.3f}", weak=True)
+            headers = {"Accept-Ranges": "bytes", **validator_headers(weak_etag, source_stat.st_mtime), **tier_headers}
+            status_code = 200
+            if byte_offset:
+                meta = await run_in_threadpool(MetadataCache.get_metadata, full_path)
+                estimated_size = int(float(meta.get("duration") or 0) * bitrate_bps / 8)
+                if byte_offset >= estimated_size:
+                    await job.close()
+                    return Response(status_code=416, headers={"Content-Range": f"bytes */{estimated_size}"})
+                # Tamanho estimado: o encode é CBR, então bate com o arquivo final a menos de alguns frames
+                headers["Content-Range"] = f"bytes {byte_offset}-{estimated_size - 1}/{estimated_size}"
+                status_code = 206
+            return StreamingResponse(
+                job.iter_chunks(),
+                status_code=status_code,
+                media_type=media_type,
+                headers=headers,
+                background=BackgroundTask(job.close),
+            )
+
+        job = await AudioManager.transcode_stream(full_path, quality)
+        StreamMetrics.annotate(source="transcode", queue_seconds=job.queue_seconds, spawn_seconds=job.spawn_seconds)
+        return StreamingResponse(
+            TranscodeCache.tee_stream(job, full_path, quality),
+            media_type=media_type,
+            headers={**validator_headers(tier_etag, source_stat.st_mtime), **tier_headers},
+            background=BackgroundTask(job.close),
+        )
+    
+    StreamMetrics.annotate(tier="lossless", source="file")
+    return range_file_response(request, full_path, headers={"Cache-Control": cache_control})
+
+def transcoded_range_offset(range_header: Optional[str]) -> int:
+    """Offset inicial de um Range 'bytes=N-' (ou 'bytes=N-M'); 0 se ausente ou inválido."""
+    if not range_header or not range_header.startswith("bytes="):
+        return 0
+    first = range_header[len("bytes="):].split(",")[0].strip()
+    start_str = first.split("-")[0].strip()
+    return int(start_str) if start_str.isdigit() else 0
+
+@app.get("/stream/hls/playlist.m3u8")
+async def stream_hls_playlist(request: Request, filename: str, quality: str = Query("medium")):
+    """
+    Playlist HLS (VOD) de um tier transcodificado.
+    Os segmentos saem de um único encode da faixa (no codec do tier), disparado pelo primeiro segmento pedido.
+    Com quality=auto retorna uma master playlist e o player alterna os tiers por segmento.
+    """
+    HLSService.validate_quality(quality, allow_auto=True)
+    full_path = AudioManager.find_local_file(filename)
+    if quality == "auto":
+        preferred = BandwidthEstimator.choose_tier(request.headers, request.client, "aac")
+        return Response(HLSService.build_master_playlist(filename, preferred), media_type="application/vnd.apple.mpegurl")
+    playlist = await HLSService.build_playlist(full_path, filename, quality)
+    return Response(playlist, media_type="application/vnd.apple.mpegurl")
+
+@app.get("/stream/hls/segment.ts")
+async def stream_hls_segment(request: Request, filename: str, index: int, quality: str = Query("medium")):
+    HLSService.validate_quality(quality)
+    resolve_started = time.monotonic()
+    full_path = AudioManager.find_local_file(filename)
+    StreamMetrics.annotate(resolve_seconds=time.monotonic() - resolve_started, tier=quality, source="hls")
+    source_stat = os.stat(full_path)
+    etag = make_etag(source_stat, f"{quality}-hlstrack{HLSService.SEGMENT_SECONDS:g}-{index}")
+    segment_headers = {"Cache-Control": MEDIA_CACHE_CONTROL}
+    # Revalidação não precisa nem olhar o cache de segmentos
+    if is_not_modified(request, etag, source_stat.st_mtime):
+        return not_modified_response({**validator_headers(etag, source_stat.st_mtime), **segment_headers})
+    segment_path = await HLSService.get_segment(full_path, quality, index)
+    return range_file_response(
+        request, segment_path, "video/mp2t", segment_headers, etag=etag, last_modified=source_stat.st_mtime
+    )
+
+class StreamPrefetchRequest(BaseModel):
+    filenames: Optional[List[str]] = None
+    playlist_id: Optional[int] = None
+    position: int = 0  # Índice (na ordem da playlist) da primeira faixa a aquecer
+    count: int = 3
+    quality: str = "medium"
+    codec: str = "mp3"  # Família usada quando quality=auto
+
+@app.post("/stream/prefetch", status_code=202)
+async def prefetch_stream(
+    req: StreamPrefetchRequest,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Aquece as próximas faixas da fila do player (page cache, pré-transcode do tier, capa).
+    Aceita uma lista ordenada de filenames ou uma playlist + posição. Responde na hora;
+    o trabalho roda em background.
+    """
+    filenames = list(req.filenames or [])
+    if req.playlist_id is not None:
+        playlist = db.query(models.Playlist).filter(models.Playlist.id == req.playlist_id).first()
+        if not playlist: raise HTTPException(404, "Playlist não encontrada")
+        if not playlist.is_public and playlist.user_id != current_user.id:
+            raise HTTPException(403, "Playlist privada")
+        items = sorted(playlist.items, key=lambda x: x.order)
+        start = max(req.position, 0)
+        filenames += [item.track.filename for item in items[start:start + max(req.count, 0)] if item.track and item.track.filename]
+
+    if not filenames:
+        raise HTTPException(400, "Informe filenames ou playlist_id.")
+
+    quality = req.quality
+    if quality == "auto":
+        quality = BandwidthEstimator.choose_tier(request.headers, request.client, req.codec)
+
+    filenames = filenames[:StreamPrefetcher.MAX_TRACKS]
+    background_tasks.add_task(StreamPrefetcher.warm, filenames, quality)
+    return {"status": "accepted", "quality": quality, "filenames": filenames}
+
+@app.get("/stream/cache-status")
+def get_stream_cache_status(admin: models.User = Depends(get_admin_user)):
+    """Retorna o uso do cache de transcode em disco."""
+    return TranscodeCache.stats()
+
+@app.get("/stream/ffmpeg-status")
+def get_ffmpeg_pool_status(admin: models.User = Depends(get_admin_user)):
+    """Retorna ocupação do pool de ffmpeg (rodando, na fila, rejeitados)."""
+    return FFmpegPool.stats()
+
+@app.get("/stream/pretranscode-status")
+def get_pretranscode_status(admin: models.User = Depends(get_admin_user)):
+    """Fila e vazão do pré-transcode em background (para dimensionar os workers)."""
+    return PretranscodeWorker.stats()
+
+@app.get("/stream/metrics")
+def get_stream_metrics(admin: models.User = Depends(get_admin_user)):
+    """Histogramas e contadores de streaming no formato texto do Prometheus."""
+    return Response(StreamMetrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/admin/stream-metrics")
+def get_recent_stream_metrics(limit: int = Query(100, ge=1, le=1000), admin: models.User = Depends(get_admin_user)):
+    """Tabela das últimas respostas de mídia (mais recentes primeiro). Inclui filenames e IPs: só admins."""
+    return {"streams": StreamMetrics.recent(limit)}
+
+@app.get("/stream/bandwidth-status")
+def get_bandwidth_status(admin: models.User = Depends(get_admin_user)):
+    """Resumo das estimativas de banda usadas pelo quality=auto."""
+    return BandwidthEstimator.stats()
 
 @app.post("/library/organize")
 async def organize_library(background_tasks: BackgroundTasks):
@@ -3074,7 +3384,7 @@ async def process_library_auto_tagging():
                     current_tags = AudioManager.get_audio_tags(full_path)
                     if not current_tags.get('artist') or not current_tags.get('title') or current_tags.get('artist') == 'Desconhecido':
                         clean_name = normalize_text(os.path.splitext(file)[0].replace("_", " "))
-                        results = await run_in_threadpool(TidalProvider.search_catalog, clean_name, 1)
+                        results = await TidalProvider.search_catalog_async(clean_name, 1)
                         if not results: results = await run_in_threadpool(CatalogProvider.search_catalog, clean_name, "song", 1)
                         
                         if results:
@@ -3085,9 +3395,9 @@ async def process_library_auto_tagging():
                                 cover_bytes = None
                                 if best_match.get('artworkUrl'):
                                     try:
-                                        async with httpx.AsyncClient() as client:
-                                            resp = await client.get(best_match['artworkUrl'])
-                                            if resp.status_code == 200: cover_bytes = resp.content
+                                        client = HttpClients.get_async("artwork")
+                                        resp = await client.get(best_match['artworkUrl'])
+                                        if resp.status_code == 200: cover_bytes = resp.content
                                     except: pass
                                 meta = {"title": best_match['trackName'], "artist": best_match['artistName'], "album": best_match['collectionName']}
                                 await run_in_threadpool(AudioManager.embed_metadata, full_path, meta, cover_bytes)
@@ -3095,6 +3405,11 @@ async def process_library_auto_tagging():
                 except: pass
     print(f"✨ Auto-Tagging concluído. {count} arquivos atualizados.")
 
+@app.get("/library/index-status")
+def get_library_index_status(admin: models.User = Depends(get_admin_user)):
+    """Estado do índice de arquivos usado para resolver filenames."""
+    return LibraryIndex.stats()
+
 @app.get("/library/legacy")
 async def get_library_legacy():
     """
@@ -3108,7 +3423,7 @@ async def get_library_legacy():
             if file.lower().endswith(('.flac', '.mp3', '.m4a')):
                 full_path = os.path.join(root, file)
                 try:
-                    tags = AudioManager.get_audio_tags(full_path)
+                    tags = MetadataCache.get_tags(full_path)
                     title = tags.get('title') or os.path.splitext(file)[0]
                     artist = tags.get('artist') or "Desconhecido"
                     album = tags.get('album')
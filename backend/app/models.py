@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Float, Text, JSON
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, BigInteger, String, DateTime, Float, Text, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -37,6 +37,10 @@ class Track(Base):
     
     bitrate = Column(Integer, nullable=True)
     format = Column(String, nullable=True)
+
+    # Tamanho e mtime do arquivo na última indexação (scan incremental pula os que não mudaram)
+    file_size = Column(BigInteger, nullable=True)
+    file_mtime = Column(Float, nullable=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
@@ -153,4 +157,37 @@ class GenreCache(Base):
     track_count = Column(Integer, default=0)
     source = Column(String, default="ytmusic")  # Fonte dos dados
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class AudioMetadataCache(Base):
+    """
+    Metadados técnicos e tags já lidos de cada arquivo de áudio.
+    Válidos enquanto tamanho e mtime do arquivo não mudam; se mudam, são relidos na próxima consulta.
+    """
+    __tablename__ = "audio_metadata_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    path = Column(String, unique=True, index=True)  # Caminho absoluto do arquivo
+    file_size = Column(BigInteger)
+    file_mtime = Column(Float)
+    audio_metadata = Column(JSON)  # Saída de AudioManager.get_audio_metadata
+    tags = Column(JSON)  # Saída de AudioManager.get_audio_tags
+    has_cover = Column(Boolean, default=False)  # Tem imagem embutida
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class ProviderCacheEntry(Base):
+    """
+    Respostas dos provedores externos (Tidal, YTMusic, Last.fm, iTunes) guardadas pelo ProviderCache.
+    Tempos em epoch: até fresh_until a resposta é servida direto; até stale_until é servida
+    enquanto uma atualização roda em segundo plano; depois disso a linha é descartada.
+    """
+    __tablename__ = "provider_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String, unique=True, index=True)  # namespace:hash dos argumentos
+    namespace = Column(String, index=True)  # Ex.: tidal.search, lastfm.similar
+    value = Column(JSON)
+    negative = Column(Boolean, default=False)  # Resultado vazio (TTL curto)
+    fresh_until = Column(Float)
+    stale_until = Column(Float, index=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
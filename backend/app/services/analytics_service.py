@@ -3,7 +3,7 @@ from sqlalchemy import func, desc
 from datetime import datetime, timedelta
 from app import models
 import urllib.parse
-import httpx
+from app.services.http_clients import HttpClients
 
 class AnalyticsService:
     
@@ -16,20 +16,20 @@ class AnalyticsService:
             return ""
         
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                resp = await client.get(f"{AnalyticsService.TIDAL_API}/search/artists", params={"q": artist_name, "limit": 1})
-                if resp.status_code == 200:
-                    data = resp.json()
-                    items = data.get("data", {}).get("items", []) if isinstance(data.get("data"), dict) else data.get("data", [])
-                    if items and len(items) > 0:
-                        artist_data = items[0]
-                        # Tenta diferentes estruturas de imagem
-                        picture = artist_data.get("picture") or artist_data.get("image") or artist_data.get("artworkUrl")
-                        if picture:
-                            if isinstance(picture, str):
-                                return picture if picture.startswith("http") else f"https://resources.tidal.com/images/{picture.replace('-', '/')}/750x750.jpg"
-                            elif isinstance(picture, dict):
-                                return picture.get("large") or picture.get("medium") or picture.get("small", "")
+            client = HttpClients.get_async("tidal")
+            resp = await client.get(f"{AnalyticsService.TIDAL_API}/search/artists", params={"q": artist_name, "limit": 1})
+            if resp.status_code == 200:
+                data = resp.json()
+                items = data.get("data", {}).get("items", []) if isinstance(data.get("data"), dict) else data.get("data", [])
+                if items and len(items) > 0:
+                    artist_data = items[0]
+                    # Tenta diferentes estruturas de imagem
+                    picture = artist_data.get("picture") or artist_data.get("image") or artist_data.get("artworkUrl")
+                    if picture:
+                        if isinstance(picture, str):
+                            return picture if picture.startswith("http") else f"https://resources.tidal.com/images/{picture.replace('-', '/')}/750x750.jpg"
+                        elif isinstance(picture, dict):
+                            return picture.get("large") or picture.get("medium") or picture.get("small", "")
         except Exception as e:
             print(f"⚠️ Erro ao buscar imagem do artista: {e}")
         return ""
@@ -0,0 +1,179 @@
+import os
+import asyncio
+import hashlib
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote, urlsplit, parse_qs
+
+import httpx
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from app.services.transcode_cache import TranscodeCache
+from app.services.http_clients import HttpClients
+from app.services.cover_service import CoverService, COVER_FORMATS
+
+# Endereço público do servidor (usado nas URLs reescritas que vão para o app)
+PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "https://orfeu.ocnaibill.dev").rstrip("/")
+
+
+class ArtworkProxy:
+    """
+    Proxy de artes remotas do catálogo (CDN do Tidal, thumbnails do YouTube Music, Last.fm).
+
+    A imagem remota é baixada uma vez e guardada no cache em disco (mesmo orçamento LRU do
+    cache de transcode); as miniaturas nos tamanhos fixos do CoverService são geradas sob
+    demanda. As respostas do catálogo trocam o artworkUrl pela URL do proxy com o tamanho
+    que a tela usa, então o app baixa 300px em vez de 800px+ do CDN.
+    Só hosts conhecidos são aceitos (não é um proxy aberto).
+    """
+
+    ALLOWED_HOST_SUFFIXES = (
+        "resources.tidal.com",
+        "googleusercontent.com",
+        "ggpht.com",
+        "ytimg.com",
+        "lastfm.freetls.fastly.net",
+        "mzstatic.com",
+    )
+    FETCH_TIMEOUT = 10.0
+    MAX_BYTES = 10 * 1024 * 1024
+    DEFAULT_SIZE = 300
+
+    _inflight: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def is_allowed(url: str) -> bool:
+        try:
+            parts = urlsplit(url)
+        except ValueError:
+            return False
+        host = (parts.hostname or "").lower()
+        return parts.scheme in ("http", "https") and any(
+            host == suffix or host.endswith("." + suffix) for suffix in ArtworkProxy.ALLOWED_HOST_SUFFIXES
+        )
+
+    @staticmethod
+    def proxy_url(url: Optional[str], size: int = DEFAULT_SIZE) -> Optional[str]:
+        """URL do proxy para a arte remota; URLs vazias ou de hosts desconhecidos voltam como estão."""
+        if not url or not isinstance(url, str) or not ArtworkProxy.is_allowed(url):
+            return url
+        return f"{PUBLIC_BASE_URL}/artwork?url={quote(url, safe='')}&size={size}"
+
+    @staticmethod
+    def original_url(url: Optional[str]) -> Optional[str]:
+        """Desfaz proxy_url (ex.: o app devolve o artworkUrl ao pedir um download e a capa embutida deve ser a original)."""
+        if not url or not url.startswith(f"{PUBLIC_BASE_URL}/artwork?"):
+            return url
+        return parse_qs(urlsplit(url).query).get("url", [url])[0]
+
+    @staticmethod
+    def rewrite(data, size: int = DEFAULT_SIZE):
+        """Cópia da resposta com todo campo 'artworkUrl' (em qualquer nível) apontando para o proxy."""
+        if isinstance(data, list):
+            return [ArtworkProxy.rewrite(item, size) for item in data]
+        if isinstance(data, dict):
+            return {
+                key: ArtworkProxy.proxy_url(value, size) if key == "artworkUrl" else ArtworkProxy.rewrite(value, size)
+                for key, value in data.items()
+            }
+        return data
+
+    # --- Servir ---
+
+    @staticmethod
+    def _original_path(url: str) -> str:
+        return TranscodeCache.content_path(hashlib.sha256(url.encode()).hexdigest(), "artwork", "img")
+
+    @staticmethod
+    def _read(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    @staticmethod
+    async def _download(url: str) -> bytes:
+        client = HttpClients.get_async("artwork")
+        async with client.stream("GET", url, timeout=ArtworkProxy.FETCH_TIMEOUT, follow_redirects=False) as resp:
+            if resp.status_code != 200:
+                raise HTTPException(502 if resp.status_code >= 500 else 404, "Arte remota indisponível.")
+            if not resp.headers.get("content-type", "image/").startswith("image/"):
+                raise HTTPException(502, "Resposta remota não é uma imagem.")
+            chunks, total = [], 0
+            async for chunk in resp.aiter_bytes():
+                total += len(chunk)
+                if total > ArtworkProxy.MAX_BYTES:
+                    raise HTTPException(502, "Arte remota grande demais.")
+                chunks.append(chunk)
+        return b"".join(chunks)
+
+    @staticmethod
+    async def _get_original(url: str) -> bytes:
+        path = ArtworkProxy._original_path(url)
+        if TranscodeCache.touch(path):
+            try:
+                return await run_in_threadpool(ArtworkProxy._read, path)
+            except OSError:
+                pass  # Despejada pelo LRU entre o touch e a leitura: baixa de novo
+
+        # Vários tiles pedindo a mesma arte ao mesmo tempo: um download só
+        pending = ArtworkProxy._inflight.get(url)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        future = asyncio.get_running_loop().create_future()
+        ArtworkProxy._inflight[url] = future
+        try:
+            try:
+                data = await ArtworkProxy._download(url)
+            except httpx.HTTPError as e:
+                raise HTTPException(502, f"Erro ao baixar arte remota: {e.__class__.__name__}")
+            await run_in_threadpool(TranscodeCache.store, path, data)
+            future.set_result(data)
+            return data
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Marca como consumida se ninguém mais estiver esperando
+            raise
+        finally:
+            ArtworkProxy._inflight.pop(url, None)
+
+    @staticmethod
+    def _media_type(data: bytes) -> str:
+        if data.startswith(b"\x89PNG"):
+            return "image/png"
+        if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+            return "image/webp"
+        return "image/jpeg"
+
+    @staticmethod
+    def etag(url: str, size: Optional[int], fmt: Optional[str]) -> str:
+        return f'"{hashlib.sha256(url.encode()).hexdigest()[:32]}-{size or "orig"}-{fmt or "orig"}"'
+
+    @staticmethod
+    async def get(url: str, size: Optional[int] = None, fmt: Optional[str] = None) -> Tuple[bytes, str]:
+        """(bytes, Content-Type) da arte remota no tamanho/formato pedidos."""
+        if not ArtworkProxy.is_allowed(url):
+            raise HTTPException(400, "Host de imagem não permitido.")
+        size, fmt = CoverService.variant_of(size, fmt)
+
+        key = hashlib.sha256(url.encode()).hexdigest()
+        if fmt is not None:
+            media_type, ext, _ = COVER_FORMATS[fmt]
+            variant_path = TranscodeCache.content_path(key, f"artwork-{size}-{fmt}", ext)
+            if TranscodeCache.touch(variant_path):
+                try:
+                    return await run_in_threadpool(ArtworkProxy._read, variant_path), media_type
+                except OSError:
+                    pass  # Despejada entre o touch e a leitura: gera de novo
+
+        original = await ArtworkProxy._get_original(url)
+        if fmt is None:
+            return original, ArtworkProxy._media_type(original)
+        try:
+            data = await run_in_threadpool(CoverService.resize_image, original, size, fmt)
+        except Exception as e:
+            print(f"⚠️ Erro ao redimensionar arte remota: {e}")
+            return original, ArtworkProxy._media_type(original)
+        await run_in_threadpool(TranscodeCache.store, variant_path, data)
+        return data, media_type
@@ -1,20 +1,52 @@
 import os
 import json
+import base64
 import subprocess
+from typing import Optional, Tuple
 import mutagen
 from mutagen.flac import FLAC, Picture
 from mutagen.id3 import ID3, APIC, TIT2, TPE1, TALB, TYER
-from mutagen.mp4 import MP4, MP4Cover
+from mutagen.mp4 import MP4, MP4Cover, MP4Tags
+from mutagen.mp3 import MP3
 from fastapi import HTTPException
+from app.services.ffmpeg_pool import FFmpegPool, FFmpegJob
+from app.services.library_index import LibraryIndex
 
 # Constantes
+# Codecs de saída: parâmetros do ffmpeg, container e Content-Type de cada um.
+# 'byte_seekable' indica se dá para começar a tocar de um offset qualquer do arquivo
+# (MP3/ADTS ressincronizam sozinhos; Ogg/Opus precisa dos headers do início).
+CODECS = {
+    "mp3": {"encoder": "libmp3lame", "format": "mp3", "ext": "mp3", "media_type": "audio/mpeg", "byte_seekable": True},
+    "aac": {"encoder": "aac", "format": "adts", "ext": "aac", "media_type": "audio/aac", "byte_seekable": True},
+    "opus": {"encoder": "libopus", "format": "ogg", "ext": "ogg", "media_type": "audio/ogg", "byte_seekable": False},
+}
+
 TIERS = {
-    "low": "128k",
-    "medium": "192k",
-    "high": "320k",
-    "lossless": "original"
+    "low": {"codec": "mp3", "bitrate": "128k"},
+    "medium": {"codec": "mp3", "bitrate": "192k"},
+    "high": {"codec": "mp3", "bitrate": "320k"},
+    "aac_low": {"codec": "aac", "bitrate": "96k"},
+    "aac_medium": {"codec": "aac", "bitrate": "160k"},
+    "aac_high": {"codec": "aac", "bitrate": "256k"},
+    "opus_low": {"codec": "opus", "bitrate": "64k"},
+    "opus_medium": {"codec": "opus", "bitrate": "96k"},
+    "opus_high": {"codec": "opus", "bitrate": "160k"},
+    "lossless": {"codec": "original", "bitrate": "original"},
+}
+
+# Escada de tiers por família, do mais leve ao mais pesado (usada pelo quality=auto)
+TIER_LADDERS = {
+    "mp3": ["low", "medium", "high"],
+    "aac": ["aac_low", "aac_medium", "aac_high"],
+    "opus": ["opus_low", "opus_medium", "opus_high"],
 }
 
+# Frames ID3 / átomos MP4 equivalentes às chaves do modo easy do mutagen
+# (ler o arquivo sem easy=True dá acesso às capas na mesma abertura)
+ID3_TAG_FRAMES = {"title": "TIT2", "artist": "TPE1", "album": "TALB", "genre": "TCON", "date": "TDRC"}
+MP4_TAG_ATOMS = {"title": "\xa9nam", "artist": "\xa9ART", "album": "\xa9alb", "genre": "\xa9gen", "date": "\xa9day"}
+
 class AudioManager:
     BASE_PATH = "/downloads"
 
@@ -29,7 +61,25 @@ class AudioManager:
             return full_path
         
         # SEGUNDO: Busca por nome de arquivo (fallback para compatibilidade)
-        # Só usa se o caminho completo não existir
+        # Só usa se o caminho completo não existir. Com o índice pronto é um lookup em memória
+        if LibraryIndex.is_ready():
+            found = LibraryIndex.lookup(sanitized_filename)
+            if found:
+                return found
+            # Com inotify o índice está em dia e o miss responde 404 sem varrer o disco. Só com a
+            # varredura periódica, um arquivo recém-chegado pode ainda não estar no índice
+            if LibraryIndex.is_live():
+                raise HTTPException(status_code=404, detail=f"Ficheiro '{sanitized_filename}' não encontrado.")
+
+        # Índice ainda sendo montado (ou sem inotify): varredura completa
+        found_path = AudioManager._walk_lookup(sanitized_filename)
+        if found_path:
+            LibraryIndex.add_path(found_path)
+            return found_path
+        raise HTTPException(status_code=404, detail=f"Ficheiro '{sanitized_filename}' não encontrado.")
+
+    @staticmethod
+    def _walk_lookup(sanitized_filename: str) -> Optional[str]:
         target_file_name = os.path.basename(sanitized_filename)
         
         # Varredura - mas agora priorizamos matches com caminho similar
@@ -48,27 +98,85 @@ class AudioManager:
             if len(matches) > 1:
                 print(f"⚠️ Múltiplos arquivos encontrados para '{target_file_name}': {matches}")
             return matches[0]
-                
-        raise HTTPException(status_code=404, detail=f"Ficheiro '{sanitized_filename}' não encontrado.")
+        return None
 
     @staticmethod
-    def get_audio_tags(file_path: str) -> dict:
+    def _tags_from(audio) -> dict:
         tags = {"title": None, "artist": None, "album": None, "genre": None, "date": None}
+        if audio:
+            tags["title"] = audio.get("title", [None])[0]
+            tags["artist"] = audio.get("artist", [None])[0]
+            tags["album"] = audio.get("album", [None])[0]
+            tags["genre"] = audio.get("genre", [None])[0]
+            tags["date"] = audio.get("date", [None])[0] or audio.get("year", [None])[0]
+        return tags
+
+    @staticmethod
+    def _tags_from_file(audio) -> dict:
+        """Mesmo formato de _tags_from, para um arquivo aberto sem easy=True."""
+        tags = getattr(audio, "tags", None)
+        if isinstance(tags, ID3):
+            result = {}
+            for key, frame_id in ID3_TAG_FRAMES.items():
+                frame = tags.get(frame_id)
+                values = (frame.genres if frame_id == "TCON" else frame.text) if frame else None
+                result[key] = str(values[0]) if values else None
+            return result
+        if isinstance(tags, MP4Tags):
+            return {key: (tags.get(atom) or [None])[0] for key, atom in MP4_TAG_ATOMS.items()}
+        # Vorbis comments (FLAC/Ogg) e APE já usam os mesmos nomes do modo easy
+        return AudioManager._tags_from(audio)
+
+    @staticmethod
+    def get_audio_tags(file_path: str) -> dict:
         try:
-            audio = mutagen.File(file_path, easy=True)
-            if audio:
-                tags["title"] = audio.get("title", [None])[0]
-                tags["artist"] = audio.get("artist", [None])[0]
-                tags["album"] = audio.get("album", [None])[0]
-                tags["genre"] = audio.get("genre", [None])[0]
-                tags["date"] = audio.get("date", [None])[0] or audio.get("year", [None])[0]
+            return AudioManager._tags_from(mutagen.File(file_path, easy=True))
         except Exception as e:
             print(f"⚠️ Erro Mutagen: {e}")
-        return tags
+        return AudioManager._tags_from(None)
 
     @staticmethod
-    def get_audio_metadata(file_path: str) -> dict:
-        tech_data = {}
+    def _tech_data(codec: str, sample_rate: int, bits, channels, bitrate: int, duration: float) -> dict:
+        tech_label = f"{sample_rate}Hz"
+        if bits: tech_label = f"{bits}bit/{tech_label}"
+        return {
+            "format": codec,
+            "bitrate": bitrate,
+            "sample_rate": sample_rate,
+            "channels": channels,
+            "duration": duration,
+            "tech_label": tech_label,
+            "is_lossless": codec in ['flac', 'wav', 'alac']
+        }
+
+    @staticmethod
+    def _tech_from_mutagen(audio, file_path: str) -> Optional[dict]:
+        """Dados técnicos direto do 'info' do mutagen (FLAC/MP3/M4A). None para outros containers."""
+        info = audio.info
+        bits = None
+        if isinstance(audio, FLAC):
+            codec = "flac"
+            bits = info.bits_per_sample
+        elif isinstance(audio, MP3):
+            codec = "mp3"
+        elif isinstance(audio, MP4):
+            # Mesmos nomes do ffprobe: 'mp4a.40.x' é AAC
+            codec = "alac" if info.codec == "alac" else ("aac" if info.codec.startswith("mp4a") else info.codec)
+            if codec == "alac":
+                bits = info.bits_per_sample
+        else:
+            return None
+
+        duration = float(info.length or 0)
+        bitrate = int(getattr(info, "bitrate", 0) or 0)
+        if not bitrate and duration > 0:
+            # Bitrate médio do arquivo, como o format.bit_rate do ffprobe
+            bitrate = int(os.path.getsize(file_path) * 8 / duration)
+        return AudioManager._tech_data(codec, int(info.sample_rate or 0), bits, info.channels, bitrate, duration)
+
+    @staticmethod
+    def _probe_tech(file_path: str) -> dict:
+        """ffprobe para containers que o mutagen não descreve (custa um processo por chamada)."""
         try:
             cmd = ["ffprobe", "-v", "quiet", "-print_format", "json", "-show_format", "-show_streams", file_path]
             result = subprocess.run(cmd, capture_output=True, text=True)
@@ -78,37 +186,94 @@ class AudioManager:
             format_info = data.get('format', {})
             
             if audio_stream:
-                codec = audio_stream.get('codec_name', 'unknown')
-                sample_rate = int(audio_stream.get('sample_rate', 0))
-                bits = audio_stream.get('bits_per_raw_sample') or audio_stream.get('bits_per_sample')
-                
-                tech_label = f"{sample_rate}Hz"
-                if bits: tech_label = f"{bits}bit/{tech_label}"
-                
-                tech_data = {
-                    "format": codec,
-                    "bitrate": int(format_info.get('bit_rate', 0)),
-                    "sample_rate": sample_rate,
-                    "channels": audio_stream.get('channels'),
-                    "duration": float(format_info.get('duration', 0)),
-                    "tech_label": tech_label,
-                    "is_lossless": codec in ['flac', 'wav', 'alac']
-                }
+                return AudioManager._tech_data(
+                    audio_stream.get('codec_name', 'unknown'),
+                    int(audio_stream.get('sample_rate', 0)),
+                    audio_stream.get('bits_per_raw_sample') or audio_stream.get('bits_per_sample'),
+                    audio_stream.get('channels'),
+                    int(format_info.get('bit_rate', 0)),
+                    float(format_info.get('duration', 0)),
+                )
         except Exception:
             pass
+        return {}
+
+    @staticmethod
+    def read_file_info(file_path: str) -> dict:
+        """
+        Dados técnicos, tags e presença de capa numa única abertura do arquivo (ffprobe só como fallback).
+        Retorna {"metadata": <formato de get_audio_metadata>, "tags": <formato de get_audio_tags>, "has_cover": bool}.
+        """
+        audio = None
+        tech_data = None
+        try:
+            audio = mutagen.File(file_path)
+            if audio is not None:
+                tech_data = AudioManager._tech_from_mutagen(audio, file_path)
+        except Exception as e:
+            print(f"⚠️ Erro Mutagen: {e}")
+        if tech_data is None:
+            tech_data = AudioManager._probe_tech(file_path)
 
-        artistic_data = AudioManager.get_audio_tags(file_path)
+        tags = AudioManager._tags_from_file(audio)
+        artistic_data = dict(tags)
         
         # Fallback de Título
         if not artistic_data["title"]:
             artistic_data["title"] = os.path.splitext(os.path.basename(file_path))[0]
 
-        return {
+        metadata = {
             "filename": os.path.basename(file_path),
             "path": file_path, # Útil internamente
             **tech_data,
             **artistic_data
         }
+        return {"metadata": metadata, "tags": tags, "has_cover": AudioManager._picture_from(audio) is not None}
+
+    @staticmethod
+    def get_audio_metadata(file_path: str) -> dict:
+        return AudioManager.read_file_info(file_path)["metadata"]
+
+    @staticmethod
+    def read_embedded_picture(file_path: str) -> Optional[Tuple[bytes, str]]:
+        """(bytes, mime) da capa embutida (FLAC/ID3/MP4/Ogg) lida pelo mutagen, sem ffmpeg. Prefere a 'Front Cover'."""
+        try:
+            audio = mutagen.File(file_path)
+        except Exception:
+            return None
+        return AudioManager._picture_from(audio)
+
+    @staticmethod
+    def _picture_from(audio) -> Optional[Tuple[bytes, str]]:
+        """Capa de um arquivo já aberto pelo mutagen (sem easy=True)."""
+        if audio is None:
+            return None
+
+        pictures = []
+        if isinstance(audio, FLAC):
+            pictures = [(p.type, p.data, p.mime) for p in audio.pictures]
+        elif audio.tags is not None:
+            tags = audio.tags
+            if isinstance(audio, MP4):
+                for cover in tags.get("covr", []):
+                    mime = "image/png" if cover.imageformat == MP4Cover.FORMAT_PNG else "image/jpeg"
+                    pictures.append((3, bytes(cover), mime))
+            elif hasattr(tags, "getall"):
+                pictures = [(p.type, p.data, p.mime) for p in tags.getall("APIC")]
+            else:
+                # Ogg/Opus: capa vai em METADATA_BLOCK_PICTURE (Picture do FLAC em base64)
+                for raw in tags.get("metadata_block_picture", []):
+                    try:
+                        p = Picture(base64.b64decode(raw))
+                        pictures.append((p.type, p.data, p.mime))
+                    except Exception:
+                        continue
+
+        pictures = [p for p in pictures if p[1]]
+        if not pictures:
+            return None
+        _, data, mime = next((p for p in pictures if p[0] == 3), pictures[0])
+        return data, (mime or "image/jpeg").lower()
     
     # --- NOVO: Função para Gravar Tags e Capa ---
     @staticmethod
@@ -166,26 +331,64 @@ class AudioManager:
             print(f"❌ Erro ao aplicar tags: {e}")
 
     @staticmethod
-    def transcode_stream(file_path: str, quality: str):
-        target_bitrate = TIERS.get(quality, "128k")
-        cmd = ["ffmpeg", "-i", file_path, "-f", "mp3", "-ab", target_bitrate, "-vn", "-map", "0:a:0", "-"]
-        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=10**6)
-        try:
-            while True:
-                chunk = process.stdout.read(64 * 1024)
-                if not chunk: break
-                yield chunk
-        finally:
-            process.kill()
+    def normalize_tier(quality: str) -> str:
+        """Tier transcodificado válido; desconhecido (ou lossless) cai no 'low', como sempre foi."""
+        return quality if quality in TIERS and quality != "lossless" else "low"
 
     @staticmethod
-    def extract_cover_stream(file_path: str):
-        cmd = ["ffmpeg", "-i", file_path, "-an", "-c:v", "mjpeg", "-f", "mjpeg", "-v", "error", "-"]
-        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=10**6)
-        try:
-            while True:
-                chunk = process.stdout.read(64 * 1024)
-                if not chunk: break
-                yield chunk
-        finally:
-            process.kill()
\ No newline at end of file
+    def tier_codec(quality: str) -> dict:
+        """Parâmetros do codec de saída do tier (encoder, container, extensão, Content-Type)."""
+        return CODECS[TIERS[AudioManager.normalize_tier(quality)]["codec"]]
+
+    @staticmethod
+    def tier_bitrate_bps(quality: str) -> int:
+        """Bitrate alvo do tier em bits/s (ex.: '192k' -> 192000)."""
+        target_bitrate = TIERS[AudioManager.normalize_tier(quality)]["bitrate"]
+        return int(target_bitrate[:-1]) * 1000
+
+    @staticmethod
+    async def transcode_stream(
+        file_path: str,
+        quality: str,
+        start: float = 0.0,
+        admission: bool = True,
+        niceness: Optional[int] = None,
+    ) -> FFmpegJob:
+        """
+        Inicia o encode via pool (pode levantar 503 se não houver vaga).
+        'start' faz seek na entrada, então o trecho anterior nem chega a ser decodificado.
+        admission/niceness são repassados ao FFmpegPool (workers de background usam False/19).
+        """
+        tier = TIERS[AudioManager.normalize_tier(quality)]
+        codec = CODECS[tier["codec"]]
+        cmd = ["ffmpeg", "-nostdin"]
+        if start > 0:
+            cmd += ["-ss", f"{start:.3f}"]
+        cmd += ["-i", file_path, "-vn", "-map", "0:a:0", "-c:a", codec["encoder"], "-b:a", tier["bitrate"]]
+        if tier["codec"] == "opus":
+            # VBR restrito: o tamanho fica próximo de bitrate * duração (mapeamento tempo <-> byte continua útil)
+            cmd += ["-vbr", "constrained"]
+        cmd += ["-f", codec["format"], "-"]
+        return await FFmpegPool.spawn(cmd, niceness=niceness, admission=admission)
+
+    @staticmethod
+    async def encode_hls(file_path: str, quality: str, out_dir: str, segment_seconds: float) -> FFmpegJob:
+        """
+        Codifica a faixa inteira num único encode, fatiado em segmentos MPEG-TS de
+        'segment_seconds' em out_dir (00000.ts, 00001.ts...). Um encode contínuo evita o
+        priming do encoder (silêncio/clique) em cada fronteira de segmento.
+        segments.csv recebe uma linha por segmento finalizado, na ordem.
+        """
+        tier = TIERS[AudioManager.normalize_tier(quality)]
+        # Só MP3 e AAC têm mapeamento padrão em MPEG-TS: o segmento sai no codec do tier
+        if tier["codec"] not in ("mp3", "aac"):
+            raise HTTPException(400, "HLS disponível apenas para os tiers MP3/AAC.")
+        cmd = [
+            "ffmpeg", "-nostdin", "-v", "error",
+            "-i", file_path,
+            "-map", "0:a:0", "-vn", "-c:a", CODECS[tier["codec"]]["encoder"], "-b:a", tier["bitrate"], "-ac", "2",
+            "-f", "segment", "-segment_time", f"{segment_seconds:.3f}", "-segment_format", "mpegts",
+            "-segment_list", os.path.join(out_dir, "segments.csv"), "-segment_list_type", "csv",
+            os.path.join(out_dir, "%05d.ts"),
+        ]
+        return await FFmpegPool.spawn(cmd)
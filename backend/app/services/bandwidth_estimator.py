@@ -0,0 +1,118 @@
+import os
+import time
+import threading
+from typing import Dict, Optional, Tuple
+
+from starlette.datastructures import Headers
+
+from app.services.audio_manager import AudioManager, TIER_LADDERS
+
+
+class BandwidthEstimator:
+    """
+    Estimativa de banda por cliente, usada pelo quality=auto.
+
+    A fonte principal é a vazão medida pelo próprio servidor nos primeiros segundos de cada
+    resposta de /stream (StreamMetricsMiddleware chama record). Uma dica explícita do
+    cliente (header) tem prioridade.
+    """
+
+    MEASURE_SECONDS = float(os.getenv("BANDWIDTH_MEASURE_SECONDS", "4"))
+    MIN_SAMPLE_BYTES = 256 * 1024  # Respostas menores terminam antes de o socket encher: não medem nada
+    SAMPLE_TTL = 30 * 60  # Depois disso a estimativa é descartada (o cliente pode ter trocado de rede)
+    EWMA_ALPHA = 0.5
+    # Só escolhe um tier se a banda cobrir o bitrate com folga (rebuffer é pior que perder qualidade)
+    HEADROOM = 1.5
+    MAX_CLIENTS = 4096
+
+    _estimates: Dict[str, Tuple[float, float]] = {}  # cliente -> (kbps, timestamp)
+    _lock = threading.Lock()
+
+    @staticmethod
+    def client_key(headers: Headers, client: Optional[Tuple[str, int]]) -> str:
+        # Atrás do túnel/proxy o IP real vem nos headers
+        forwarded = headers.get("cf-connecting-ip") or headers.get("x-forwarded-for", "")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+        return client[0] if client else "unknown"
+
+    @staticmethod
+    def hint_kbps(headers: Headers) -> Optional[float]:
+        """Banda informada pelo cliente: header do app (kbps) ou Client Hint 'Downlink' (Mbps)."""
+        for name, factor in (("x-orfeu-bandwidth-kbps", 1.0), ("downlink", 1000.0)):
+            value = headers.get(name)
+            if not value:
+                continue
+            try:
+                kbps = float(value) * factor
+            except ValueError:
+                continue
+            if kbps > 0:
+                return kbps
+        return None
+
+    @staticmethod
+    def record(client: str, sent_bytes: int, elapsed: float):
+        if sent_bytes < BandwidthEstimator.MIN_SAMPLE_BYTES or elapsed <= 0.05:
+            return
+        kbps = sent_bytes * 8 / 1000 / elapsed
+        now = time.time()
+        with BandwidthEstimator._lock:
+            previous = BandwidthEstimator._estimates.get(client)
+            if previous and now - previous[1] < BandwidthEstimator.SAMPLE_TTL:
+                kbps = BandwidthEstimator.EWMA_ALPHA * kbps + (1 - BandwidthEstimator.EWMA_ALPHA) * previous[0]
+            BandwidthEstimator._estimates[client] = (kbps, now)
+            if len(BandwidthEstimator._estimates) > BandwidthEstimator.MAX_CLIENTS:
+                BandwidthEstimator._prune_locked(now)
+
+    @staticmethod
+    def _prune_locked(now: float):
+        expired = [k for k, (_, ts) in BandwidthEstimator._estimates.items() if now - ts >= BandwidthEstimator.SAMPLE_TTL]
+        for key in expired:
+            del BandwidthEstimator._estimates[key]
+        # Ainda cheio: mantém só os mais recentes
+        overflow = len(BandwidthEstimator._estimates) - BandwidthEstimator.MAX_CLIENTS
+        if overflow > 0:
+            oldest = sorted(BandwidthEstimator._estimates.items(), key=lambda item: item[1][1])[:overflow]
+            for key, _ in oldest:
+                del BandwidthEstimator._estimates[key]
+
+    @staticmethod
+    def estimate_kbps(client: str) -> Optional[float]:
+        with BandwidthEstimator._lock:
+            entry = BandwidthEstimator._estimates.get(client)
+        if not entry or time.time() - entry[1] >= BandwidthEstimator.SAMPLE_TTL:
+            return None
+        return entry[0]
+
+    @staticmethod
+    def choose_tier(headers: Headers, client: Optional[Tuple[str, int]], codec: str = "mp3") -> str:
+        """
+        Resolve quality=auto para um tier da família do codec pedido.
+        Sem dica nem medição recente, usa o tier do meio da escada.
+        """
+        ladder = TIER_LADDERS.get(codec, TIER_LADDERS["mp3"])
+        if headers.get("save-data", "").lower() == "on":
+            return ladder[0]
+
+        kbps = BandwidthEstimator.hint_kbps(headers)
+        if kbps is None:
+            kbps = BandwidthEstimator.estimate_kbps(BandwidthEstimator.client_key(headers, client))
+        if kbps is None:
+            return ladder[len(ladder) // 2]
+
+        for tier in reversed(ladder):
+            if AudioManager.tier_bitrate_bps(tier) / 1000 * BandwidthEstimator.HEADROOM <= kbps:
+                return tier
+        return ladder[0]
+
+    @staticmethod
+    def stats() -> dict:
+        now = time.time()
+        with BandwidthEstimator._lock:
+            active = [kbps for kbps, ts in BandwidthEstimator._estimates.values() if now - ts < BandwidthEstimator.SAMPLE_TTL]
+        return {
+            "clients": len(active),
+            "median_kbps": round(sorted(active)[len(active) // 2], 1) if active else None,
+        }
+
@@ -1,6 +1,7 @@
 from ytmusicapi import YTMusic
 import traceback
 import re
+from app.services.provider_cache import ProviderCache, HOUR, DAY
 
 def _get_high_res_thumbnail(url: str) -> str:
     """
@@ -35,6 +36,7 @@ class CatalogProvider:
     yt = YTMusic()
 
     @staticmethod
+    @ProviderCache.cached("ytmusic.search", ttl=HOUR)
     def search_catalog(query: str, type: str = "song", limit: int = 40):
         """
         Busca músicas, álbuns ou artistas no YouTube Music.
@@ -130,9 +132,11 @@ class CatalogProvider:
 
         except Exception as e:
             print(f"❌ Erro YTMusic Search: {e}")
+            ProviderCache.mark_failed()
             return []
 
     @staticmethod
+    @ProviderCache.cached("ytmusic.album", ttl=DAY, stale_ttl=7 * DAY, is_negative=lambda d: not d or not d.get("tracks"))
     def get_album_details(browse_id: str):
         """
         Busca detalhes e faixas de um álbum pelo browseId.
@@ -181,6 +185,7 @@ class CatalogProvider:
             raise e
 
     @staticmethod
+    @ProviderCache.cached("ytmusic.artist", ttl=6 * HOUR, stale_ttl=DAY, is_negative=lambda d: not d or not d.get("artist"))
     def get_artist_details(artist_id: str):
         """
         Busca detalhes do artista no YouTube Music (Bio, Top Songs, Albums, Singles).
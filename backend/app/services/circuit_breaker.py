@@ -0,0 +1,132 @@
+import os
+import time
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+# Quanto tempo um circuito fica aberto antes da chamada de teste
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+
+
+class CircuitBreaker:
+    """
+    Disjuntor de um provedor externo.
+
+    Fechado: as chamadas passam e o resultado entra numa janela das últimas WINDOW chamadas
+    (erro, 429/5xx e chamadas mais lentas que slow_seconds contam como falha). Abre quando a
+    taxa de falha da janela passa de FAILURE_RATE ou há CONSECUTIVE_FAILURES seguidas; aberto,
+    as chamadas falham na hora. Depois de open_seconds fica meio-aberto: uma chamada de teste
+    por vez; sucesso fecha, falha abre de novo.
+    """
+
+    WINDOW = 20
+    MIN_CALLS = 5
+    FAILURE_RATE = 0.5
+    CONSECUTIVE_FAILURES = 5
+
+    def __init__(self, name: str, slow_seconds: float, open_seconds: float):
+        self.name = name
+        self.slow_seconds = slow_seconds
+        self.open_seconds = open_seconds
+        self.state = "closed"
+        self._lock = threading.Lock()
+        self._window = deque(maxlen=CircuitBreaker.WINDOW)  # True = falha
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._rejected = 0
+        self._opened_count = 0
+        self._last_error: Optional[str] = None
+
+    def allow(self) -> bool:
+        """Se a chamada pode ir ao upstream agora."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.open_seconds:
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            self._rejected += 1
+            return False
+
+    def record(self, ok: bool, latency: float, error: Optional[str] = None):
+        failed = not ok or latency > self.slow_seconds
+        with self._lock:
+            if failed:
+                self._consecutive += 1
+                self._last_error = error or f"lenta ({latency:.1f}s)"
+            else:
+                self._consecutive = 0
+
+            if self.state == "half_open":
+                self._probing = False
+                if failed:
+                    self._trip()
+                else:
+                    self.state = "closed"
+                    self._window.clear()
+                    print(f"✅ Provedor {self.name} voltou: circuito fechado")
+                return
+
+            self._window.append(failed)
+            if self.state == "closed" and failed:
+                failures = sum(self._window)
+                if self._consecutive >= CircuitBreaker.CONSECUTIVE_FAILURES or (
+                    len(self._window) >= CircuitBreaker.MIN_CALLS and failures / len(self._window) >= CircuitBreaker.FAILURE_RATE
+                ):
+                    self._trip()
+
+    def release(self):
+        """Chamada de teste abandonada sem resultado que conte (ex.: prazo da request)."""
+        with self._lock:
+            self._probing = False
+
+    def _trip(self):
+        self.state = "open"
+        self._opened_at = time.monotonic()
+        self._opened_count += 1
+        print(f"🔌 Provedor {self.name} instável ({self._last_error}): circuito aberto por {self.open_seconds:.0f}s")
+
+    def stats(self) -> dict:
+        with self._lock:
+            window = list(self._window)
+            retry_in = self.open_seconds - (time.monotonic() - self._opened_at) if self.state == "open" else 0
+            return {
+                "state": self.state,
+                "failure_rate": round(sum(window) / len(window), 3) if window else 0.0,
+                "window_calls": len(window),
+                "consecutive_failures": self._consecutive,
+                "opened_total": self._opened_count,
+                "rejected_total": self._rejected,
+                "retry_in_seconds": round(max(retry_in, 0), 1),
+                "slow_call_seconds": self.slow_seconds,
+                "last_error": self._last_error,
+            }
+
+
+class CircuitBreakers:
+    """Um disjuntor por provedor de catálogo/metadados (mesmos nomes dos perfis do HttpClients)."""
+
+    # Provedor -> tempo acima do qual a chamada conta como lenta
+    SLOW_CALL_SECONDS = {
+        "tidal": 5.0,
+        "itunes": 3.0,
+        "lastfm": 4.0,
+        "lyrics": 5.0,
+    }
+
+    _breakers: Dict[str, CircuitBreaker] = {
+        name: CircuitBreaker(name, slow, CIRCUIT_OPEN_SECONDS) for name, slow in SLOW_CALL_SECONDS.items()
+    }
+
+    @staticmethod
+    def get(name: str) -> Optional[CircuitBreaker]:
+        """Disjuntor do provedor, ou None para clientes sem disjuntor (downloads, slskd...)."""
+        return CircuitBreakers._breakers.get(name)
+
+    @staticmethod
+    def stats() -> dict:
+        return {name: breaker.stats() for name, breaker in CircuitBreakers._breakers.items()}
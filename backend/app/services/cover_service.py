@@ -0,0 +1,200 @@
+import io
+import asyncio
+import hashlib
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from app.services.audio_manager import AudioManager
+from app.services.transcode_cache import TranscodeCache
+from app.services.metadata_cache import MetadataCache
+
+# Pillow gera as miniaturas; sem ele /cover serve só a imagem original
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+    print("⚠️ Pillow não instalado. /cover vai servir só o tamanho original. Execute: pip install Pillow")
+
+# formato -> (Content-Type, extensão, formato do Pillow)
+COVER_FORMATS = {
+    "jpeg": ("image/jpeg", "jpg", "JPEG"),
+    "webp": ("image/webp", "webp", "WEBP"),
+}
+_EXT_BY_MIME = {"image/jpeg": "jpg", "image/jpg": "jpg", "image/png": "png", "image/webp": "webp"}
+
+
+class CoverService:
+    """
+    Capas embutidas nos arquivos de áudio.
+
+    A imagem é lida com o mutagen (sem ffmpeg) uma vez por versão do arquivo e guardada no
+    cache pelo hash do conteúdo, então um álbum inteiro com a mesma capa ocupa uma entrada
+    só. Uma referência pequena por arquivo aponta para esse hash (vazia = sem capa).
+    Miniaturas (tamanhos fixos, JPEG/WebP) são geradas sob demanda e também ficam no cache.
+    """
+
+    SIZES = (64, 300, 640)
+    BATCH_CONCURRENCY = 8
+    JPEG_QUALITY = 85
+    WEBP_QUALITY = 80
+
+    @staticmethod
+    def _read(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    @staticmethod
+    def normalize_size(size: Optional[int]) -> Optional[int]:
+        """Arredonda para o menor tamanho fixo que cobre o pedido (limita as variantes no cache)."""
+        if not size:
+            return None
+        if size < 0:
+            raise HTTPException(400, "Tamanho inválido.")
+        return next((s for s in CoverService.SIZES if s >= size), CoverService.SIZES[-1])
+
+    @staticmethod
+    def _load_ref(file_path: str) -> Optional[Tuple[str, str]]:
+        """
+        (hash, mime) da capa do arquivo, extraindo na primeira vez.
+        None se o arquivo não tem capa.
+        """
+        ref_path = TranscodeCache.derived_path(file_path, "cover-ref", "ref")
+        ref = None
+        if TranscodeCache.touch(ref_path):
+            try:
+                ref = CoverService._read(ref_path).decode()
+            except OSError:
+                pass  # Despejada entre o touch e a leitura: extrai de novo
+        if ref is not None:
+            if not ref:
+                return None
+            digest, mime = ref.split(" ", 1)
+            if TranscodeCache.touch(TranscodeCache.content_path(digest, "cover", _EXT_BY_MIME.get(mime, "img"))):
+                return digest, mime
+            # A imagem foi despejada do cache: extrai de novo
+
+        extracted = CoverService._extract(file_path, ref_path)
+        return extracted[:2] if extracted else None
+
+    @staticmethod
+    def _extract(file_path: str, ref_path: str) -> Optional[Tuple[str, str, bytes]]:
+        """Lê a capa do arquivo de áudio e grava imagem + referência no cache. (hash, mime, bytes) ou None."""
+        picture = None
+        if MetadataCache.has_cover(file_path) is not False:
+            picture = AudioManager.read_embedded_picture(file_path)
+        if not picture:
+            TranscodeCache.store(ref_path, b"")
+            return None
+
+        data, mime = picture
+        digest = hashlib.sha256(data).hexdigest()
+        original_path = TranscodeCache.content_path(digest, "cover", _EXT_BY_MIME.get(mime, "img"))
+        if not TranscodeCache.touch(original_path):
+            TranscodeCache.store(original_path, data)
+        TranscodeCache.store(ref_path, f"{digest} {mime}".encode())
+        return digest, mime, data
+
+    @staticmethod
+    def _load_original(file_path: str) -> Optional[Tuple[bytes, str, str]]:
+        """(bytes, mime, hash) da capa original, ou None se o arquivo não tem capa."""
+        ref = CoverService._load_ref(file_path)
+        if not ref:
+            return None
+        digest, mime = ref
+        try:
+            return CoverService._read(TranscodeCache.content_path(digest, "cover", _EXT_BY_MIME.get(mime, "img"))), mime, digest
+        except OSError:
+            # O LRU despejou a imagem entre a checagem e a leitura: extrai de novo do arquivo de áudio
+            extracted = CoverService._extract(file_path, TranscodeCache.derived_path(file_path, "cover-ref", "ref"))
+            if not extracted:
+                return None
+            digest, mime, data = extracted
+            return data, mime, digest
+
+    @staticmethod
+    def resize_image(data: bytes, size: int, fmt: str) -> bytes:
+        """Miniatura quadrada (cabe em size x size) no formato pedido; não amplia imagens menores."""
+        _, _, pil_format = COVER_FORMATS[fmt]
+        with Image.open(io.BytesIO(data)) as img:
+            img.draft("RGB", (size, size))  # JPEG: decodifica já reduzido
+            img = img.convert("RGB")
+            img.thumbnail((size, size), Image.LANCZOS)
+            out = io.BytesIO()
+            quality = CoverService.WEBP_QUALITY if fmt == "webp" else CoverService.JPEG_QUALITY
+            img.save(out, pil_format, quality=quality, optimize=fmt == "jpeg")
+            return out.getvalue()
+
+    @staticmethod
+    def variant_of(size: Optional[int], fmt: Optional[str]) -> Tuple[Optional[int], Optional[str]]:
+        """
+        Variante que será de fato servida: (None, None) é a original. Pedir só o formato
+        gera a maior miniatura. Sem Pillow, sempre a original.
+        """
+        if fmt is not None and fmt not in COVER_FORMATS:
+            raise HTTPException(400, f"Formato inválido. Use: {', '.join(COVER_FORMATS)}")
+        size = CoverService.normalize_size(size)
+        if not PIL_AVAILABLE or (size is None and fmt is None):
+            return None, None
+        return size or CoverService.SIZES[-1], fmt or "jpeg"
+
+    @staticmethod
+    async def get_cover_digest(file_path: str) -> Optional[str]:
+        """Hash do conteúdo da capa (para ETag) sem carregar a imagem. None se não há capa."""
+        ref = await run_in_threadpool(CoverService._load_ref, file_path)
+        return ref[0] if ref else None
+
+    @staticmethod
+    def _get_cover_sync(file_path: str, size: Optional[int], fmt: Optional[str]) -> Optional[Tuple[bytes, str, str]]:
+        """(bytes, Content-Type, hash da original) ou None."""
+        loaded = CoverService._load_original(file_path)
+        if not loaded:
+            return None
+        original, mime, digest = loaded
+        size, fmt = CoverService.variant_of(size, fmt)
+        if fmt is None:
+            return original, mime, digest
+
+        media_type, ext, _ = COVER_FORMATS[fmt]
+        variant_path = TranscodeCache.content_path(digest, f"cover-{size}-{fmt}", ext)
+        if TranscodeCache.touch(variant_path):
+            try:
+                return CoverService._read(variant_path), media_type, digest
+            except OSError:
+                pass  # Despejada entre o touch e a leitura: gera de novo
+        try:
+            data = CoverService.resize_image(original, size, fmt)
+        except Exception as e:
+            # Imagem que o Pillow não abre: serve a original
+            print(f"⚠️ Erro ao redimensionar capa: {e}")
+            return original, mime, digest
+        TranscodeCache.store(variant_path, data)
+        return data, media_type, digest
+
+    @staticmethod
+    async def get_cover(file_path: str, size: Optional[int] = None, fmt: Optional[str] = None) -> Optional[Tuple[bytes, str]]:
+        """(bytes, Content-Type) da capa embutida no tamanho/formato pedidos, ou None se não há capa."""
+        cover = await run_in_threadpool(CoverService._get_cover_sync, file_path, size, fmt)
+        return cover[:2] if cover else None
+
+    @staticmethod
+    async def get_covers(file_paths: List[Optional[str]], size: Optional[int] = None, fmt: Optional[str] = None) -> List[Optional[Tuple[bytes, str, str]]]:
+        """
+        Várias capas de uma vez, na ordem pedida: (bytes, Content-Type, hash) ou None
+        (sem capa, caminho None ou erro). Limita quantas leituras/redimensionamentos rodam juntos.
+        """
+        semaphore = asyncio.Semaphore(CoverService.BATCH_CONCURRENCY)
+
+        async def one(path: Optional[str]):
+            if not path:
+                return None
+            async with semaphore:
+                try:
+                    return await run_in_threadpool(CoverService._get_cover_sync, path, size, fmt)
+                except Exception as e:
+                    print(f"⚠️ Erro ao carregar capa de {path}: {e}")
+                    return None
+
+        return await asyncio.gather(*(one(path) for path in file_paths))
@@ -0,0 +1,69 @@
+import os
+import hmac
+import time
+import base64
+import hashlib
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+
+from app import auth_utils
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class CoverTokens:
+    """
+    Tokens das URLs curtas de capa (/cover/short/{token}), assinados com HMAC.
+
+    O token carrega tudo o que a rota precisa: o id da faixa no banco (ou o filename, para
+    arquivos fora da tabela tracks) e a expiração. Qualquer worker valida sem estado
+    compartilhado. A expiração é arredondada para cima numa janela fixa, então a mesma
+    faixa gera a mesma URL durante a janela (o Discord e o navegador reaproveitam o cache).
+    """
+
+    SECRET = (os.getenv("COVER_URL_SECRET") or auth_utils.SECRET_KEY).encode()
+    TTL_SECONDS = int(os.getenv("COVER_URL_TTL_SECONDS", "3600"))
+    BUCKET_SECONDS = 600
+    MAC_BYTES = 9  # 12 caracteres no token
+
+    @staticmethod
+    def _mac(payload: str) -> str:
+        digest = hmac.new(CoverTokens.SECRET, payload.encode(), hashlib.sha256).digest()
+        return _b64(digest[:CoverTokens.MAC_BYTES])
+
+    @staticmethod
+    def sign(filename: str, track_id: Optional[int] = None) -> str:
+        subject = f"t{track_id:x}" if track_id else f"f{_b64(filename.encode())}"
+        bucket = CoverTokens.BUCKET_SECONDS
+        expires = -(-(int(time.time()) + CoverTokens.TTL_SECONDS) // bucket) * bucket
+        payload = f"{subject}.{expires:x}"
+        return f"{payload}.{CoverTokens._mac(payload)}"
+
+    @staticmethod
+    def verify(token: str) -> Tuple[Optional[int], Optional[str]]:
+        """(track_id, filename) do token, um dos dois preenchido. 404 se inválido ou expirado."""
+        try:
+            subject, expires_hex, mac = token.split(".")
+            expires = int(expires_hex, 16)
+        except ValueError:
+            raise HTTPException(404, "Cover hash inválido.")
+        if not hmac.compare_digest(mac, CoverTokens._mac(f"{subject}.{expires_hex}")):
+            raise HTTPException(404, "Cover hash inválido.")
+        if time.time() > expires:
+            raise HTTPException(404, "Cover hash expirado.")
+
+        try:
+            if subject.startswith("t"):
+                return int(subject[1:], 16), None
+            if subject.startswith("f"):
+                return None, _unb64(subject[1:]).decode()
+        except ValueError:
+            pass
+        raise HTTPException(404, "Cover hash inválido.")
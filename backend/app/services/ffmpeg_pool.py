@@ -0,0 +1,166 @@
+import os
+import time
+import asyncio
+from typing import AsyncIterator, List, Optional
+
+from fastapi import HTTPException
+
+
+class FFmpegJob:
+    """
+    Um processo ffmpeg em execução que ocupa uma vaga do pool.
+    O processo é morto e a vaga devolvida assim que o consumo termina,
+    inclusive quando o cliente desconecta no meio do stream.
+    """
+
+    def __init__(self, process: asyncio.subprocess.Process, pool_slot: bool, queue_seconds: float = 0.0, spawn_seconds: float = 0.0):
+        self.process = process
+        self._pool_slot = pool_slot
+        self._finished = False
+        # Tempos para a instrumentação: espera por vaga e criação do processo
+        self.queue_seconds = queue_seconds
+        self.spawn_seconds = spawn_seconds
+
+    def _terminate(self):
+        # Síncrono de propósito: roda mesmo dentro de um escopo já cancelado
+        if self.process.returncode is None:
+            try:
+                self.process.kill()
+            except ProcessLookupError:
+                pass
+        if not self._finished:
+            self._finished = True
+            FFmpegPool._release(self._pool_slot)
+
+    async def iter_chunks(self, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+        try:
+            while True:
+                chunk = await self.process.stdout.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+            # EOF no stdout: espera o processo sair para o returncode valer (senão seria morto abaixo)
+            await self.process.wait()
+        finally:
+            self._terminate()
+
+    async def read_all(self) -> bytes:
+        try:
+            data, _ = await self.process.communicate()
+            return data
+        finally:
+            self._terminate()
+
+    async def close(self):
+        """Garante que o processo foi encerrado e recolhido (usado como BackgroundTask)."""
+        self._terminate()
+        try:
+            await asyncio.wait_for(self.process.wait(), timeout=5.0)
+        except (asyncio.TimeoutError, ProcessLookupError):
+            pass
+
+
+class FFmpegPool:
+    """
+    Controle de admissão para processos ffmpeg.
+    Limita quantos encoders rodam ao mesmo tempo; pedidos excedentes esperam numa fila
+    com timeout e, se não conseguirem vaga, recebem 503 (o cliente tenta de novo).
+    """
+
+    MAX_PROCESSES = int(os.getenv("FFMPEG_MAX_PROCESSES", str(max(2, os.cpu_count() or 2))))
+    MAX_QUEUE = int(os.getenv("FFMPEG_MAX_QUEUE", "32"))
+    QUEUE_TIMEOUT = float(os.getenv("FFMPEG_QUEUE_TIMEOUT", "10"))
+    NICENESS = int(os.getenv("FFMPEG_NICENESS", "5"))
+
+    _semaphore: Optional[asyncio.Semaphore] = None
+    _waiting = 0
+    _running = 0
+    _rejected = 0
+    _spawned = 0
+
+    @staticmethod
+    def _get_semaphore() -> asyncio.Semaphore:
+        if FFmpegPool._semaphore is None:
+            FFmpegPool._semaphore = asyncio.Semaphore(FFmpegPool.MAX_PROCESSES)
+        return FFmpegPool._semaphore
+
+    @staticmethod
+    def _release(pool_slot: bool):
+        FFmpegPool._running -= 1
+        if pool_slot:
+            FFmpegPool._get_semaphore().release()
+
+    @staticmethod
+    def _busy(reason: str) -> HTTPException:
+        FFmpegPool._rejected += 1
+        print(f"🚦 ffmpeg pool cheio ({reason}): {FFmpegPool._running} rodando, {FFmpegPool._waiting} na fila")
+        return HTTPException(
+            status_code=503,
+            detail="Servidor ocupado transcodificando. Tente novamente em instantes.",
+            headers={"Retry-After": "5"},
+        )
+
+    @staticmethod
+    async def _acquire():
+        semaphore = FFmpegPool._get_semaphore()
+        if semaphore.locked() and FFmpegPool._waiting >= FFmpegPool.MAX_QUEUE:
+            raise FFmpegPool._busy("fila cheia")
+
+        FFmpegPool._waiting += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=FFmpegPool.QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise FFmpegPool._busy("timeout na fila")
+        finally:
+            FFmpegPool._waiting -= 1
+
+    @staticmethod
+    async def spawn(cmd: List[str], niceness: Optional[int] = None, admission: bool = True) -> FFmpegJob:
+        """
+        Inicia o ffmpeg com stdout em pipe.
+        admission=False não ocupa vaga do pool (para workers de background que têm limite próprio).
+        """
+        queue_started = time.monotonic()
+        if admission:
+            await FFmpegPool._acquire()
+        spawn_started = time.monotonic()
+
+        nice_value = FFmpegPool.NICENESS if niceness is None else niceness
+
+        def _lower_priority():
+            if nice_value > 0:
+                os.nice(nice_value)
+
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+                preexec_fn=_lower_priority,
+            )
+        except Exception:
+            if admission:
+                FFmpegPool._get_semaphore().release()
+            raise
+
+        FFmpegPool._running += 1
+        FFmpegPool._spawned += 1
+        return FFmpegJob(
+            process,
+            pool_slot=admission,
+            queue_seconds=spawn_started - queue_started,
+            spawn_seconds=time.monotonic() - spawn_started,
+        )
+
+    @staticmethod
+    def stats() -> dict:
+        return {
+            "max_processes": FFmpegPool.MAX_PROCESSES,
+            "running": FFmpegPool._running,
+            "waiting": FFmpegPool._waiting,
+            "max_queue": FFmpegPool.MAX_QUEUE,
+            "queue_timeout": FFmpegPool.QUEUE_TIMEOUT,
+            "spawned_total": FFmpegPool._spawned,
+            "rejected_total": FFmpegPool._rejected,
+        }
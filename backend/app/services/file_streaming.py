@@ -0,0 +1,199 @@
+import os
+import uuid
+import mimetypes
+from typing import List, Optional, Tuple
+
+import aiofiles
+from fastapi import Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+
+from app.services.http_cache import make_etag, validator_headers, is_not_modified, if_range_matches, not_modified_response
+
+# Tamanho de cada leitura do disco: a memória por ouvinte fica limitada a isso,
+# independente do tamanho do arquivo ou do Range pedido
+CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_KB", "256")) * 1024
+
+# Content-Type pelo container real (antes era sempre audio/flac)
+AUDIO_MEDIA_TYPES = {
+    ".flac": "audio/flac",
+    ".mp3": "audio/mpeg",
+    ".m4a": "audio/mp4",
+    ".mp4": "audio/mp4",
+    ".alac": "audio/mp4",
+    ".aac": "audio/aac",
+    ".ogg": "audio/ogg",
+    ".opus": "audio/ogg",
+    ".wav": "audio/wav",
+}
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def guess_audio_media_type(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext in AUDIO_MEDIA_TYPES:
+        return AUDIO_MEDIA_TYPES[ext]
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def parse_range_header(range_header: str, file_size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Interpreta um header Range (RFC 7233) e retorna a lista de intervalos (start, end) inclusivos.
+    Suporta intervalos abertos (bytes=500-), sufixos (bytes=-500) e múltiplos intervalos.
+    Retorna None se o header for inválido (o arquivo inteiro deve ser servido)
+    e levanta RangeNotSatisfiable se nenhum intervalo couber no arquivo.
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec:
+        return None
+
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part or "-" not in part:
+            return None
+        start_str, _, end_str = part.partition("-")
+        start_str, end_str = start_str.strip(), end_str.strip()
+        try:
+            if not start_str:
+                # Sufixo: últimos N bytes
+                suffix = int(end_str)
+                if suffix <= 0:
+                    continue
+                start, end = max(file_size - suffix, 0), file_size - 1
+            else:
+                start = int(start_str)
+                end = int(end_str) if end_str else None
+                if end is not None and end < start:
+                    return None
+                end = file_size - 1 if end is None else min(end, file_size - 1)
+        except ValueError:
+            return None
+        if start >= file_size:
+            continue
+        ranges.append((start, end))
+
+    if not ranges:
+        raise RangeNotSatisfiable()
+    return ranges
+
+
+async def _iter_file_range(path: str, start: int, end: int):
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+async def _iter_multipart(path: str, ranges, boundary: str, media_type: str, file_size: int):
+    for start, end in ranges:
+        yield (
+            f"--{boundary}\r\n"
+            f"Content-Type: {media_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{file_size}\r\n\r\n"
+        ).encode()
+        async for chunk in _iter_file_range(path, start, end):
+            yield chunk
+        yield b"\r\n"
+    yield f"--{boundary}--\r\n".encode()
+
+
+def range_file_response(
+    request: Request,
+    path: str,
+    media_type: Optional[str] = None,
+    headers: Optional[dict] = None,
+    etag: Optional[str] = None,
+    last_modified: Optional[float] = None,
+) -> Response:
+    """
+    Serve um arquivo do disco respeitando o header Range, sempre em chunks de CHUNK_SIZE.
+    Sem Range usa FileResponse (envio direto do arquivo pelo servidor ASGI).
+    Emite ETag/Last-Modified (do próprio arquivo, ou os informados quando o arquivo é um
+    derivado, ex.: entrada do cache de transcode), responde 304 a pedidos condicionais e
+    só aplica o Range se o If-Range ainda bater.
+    """
+    media_type = media_type or guess_audio_media_type(path)
+    st = os.stat(path)
+    file_size = st.st_size
+    etag = etag or make_etag(st)
+    last_modified = st.st_mtime if last_modified is None else last_modified
+    base_headers = {"Accept-Ranges": "bytes", **validator_headers(etag, last_modified), **(headers or {})}
+
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(base_headers)
+
+    range_header = request.headers.get("range")
+    if not range_header:
+        return FileResponse(path, media_type=media_type, headers=base_headers)
+
+    if file_size == 0:
+        # Arquivo vazio: nenhum intervalo cabe nele (com If-Range divergente, o Range é ignorado)
+        if if_range_matches(request, etag, last_modified):
+            return Response(status_code=416, headers={**base_headers, "Content-Range": "bytes */0"})
+        return Response(b"", media_type=media_type, headers=base_headers)
+
+    ranges = None
+    # If-Range que não bate: a cópia do cliente é de outra versão, então o Range é ignorado
+    if if_range_matches(request, etag, last_modified):
+        try:
+            ranges = parse_range_header(range_header, file_size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**base_headers, "Content-Range": f"bytes */{file_size}"})
+
+    if not ranges:
+        # Range malformado ou If-Range divergente: serve o arquivo inteiro (RFC 7233)
+        return StreamingResponse(
+            _iter_file_range(path, 0, file_size - 1),
+            media_type=media_type,
+            headers={**base_headers, "Content-Length": str(file_size)},
+        )
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        return StreamingResponse(
+            _iter_file_range(path, start, end),
+            status_code=206,
+            media_type=media_type,
+            headers={
+                **base_headers,
+                "Content-Range": f"bytes {start}-{end}/{file_size}",
+                "Content-Length": str(end - start + 1),
+            },
+        )
+
+    # Múltiplos intervalos: multipart/byteranges
+    boundary = uuid.uuid4().hex
+    content_length = 0
+    for start, end in ranges:
+        content_length += len(
+            f"--{boundary}\r\nContent-Type: {media_type}\r\nContent-Range: bytes {start}-{end}/{file_size}\r\n\r\n"
+        ) + (end - start + 1) + 2
+    content_length += len(f"--{boundary}--\r\n")
+
+    return StreamingResponse(
+        _iter_multipart(path, ranges, boundary, media_type, file_size),
+        status_code=206,
+        media_type=f"multipart/byteranges; boundary={boundary}",
+        headers={**base_headers, "Content-Length": str(content_length)},
+    )
+
+
+def stream_file_from(path: str, offset: int, media_type: str, headers: Optional[dict] = None) -> Response:
+    """Serve o arquivo a partir de um offset (resposta 200, usado em seeks por tempo)."""
+    file_size = os.path.getsize(path)
+    if file_size == 0:
+        return Response(b"", media_type=media_type, headers={"Accept-Ranges": "bytes", **(headers or {})})
+    offset = min(max(offset, 0), file_size - 1)
+    return StreamingResponse(
+        _iter_file_range(path, offset, file_size - 1),
+        media_type=media_type,
+        headers={"Accept-Ranges": "bytes", "Content-Length": str(file_size - offset), **(headers or {})},
+    )
@@ -0,0 +1,231 @@
+import os
+import time
+import queue
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import or_
+
+from app import models
+from app.database import SessionLocal
+from app.services.metadata_provider import MetadataProvider
+
+GenreKey = Tuple[str, str, str]  # (artista, álbum, título se não há álbum), em minúsculas
+
+
+class GenreEnricher:
+    """
+    Busca de gênero (iTunes) fora das requests.
+
+    Rotas e o scanner gravam a faixa na hora e só enfileiram o id aqui. Uma thread consome
+    a fila em lotes: faixas do mesmo artista/álbum viram uma busca só, as buscas respeitam
+    um intervalo mínimo (o iTunes bloqueia com 403/429 quando passa do limite), falhas de
+    rede voltam para a fila com espera crescente e o resultado é gravado numa única
+    transação por lote, sem sobrescrever gênero que alguém já preencheu.
+    """
+
+    BATCH_SIZE = int(os.getenv("GENRE_ENRICH_BATCH", "20"))
+    BATCH_WAIT_SECONDS = float(os.getenv("GENRE_ENRICH_BATCH_WAIT", "2"))
+    MIN_INTERVAL_SECONDS = float(os.getenv("GENRE_ENRICH_INTERVAL", "3"))  # Entre buscas no iTunes
+    MAX_ATTEMPTS = 4
+    RETRY_BASE_SECONDS = 30
+    RESOLVED_CACHE_SIZE = 2048
+
+    _queue: "queue.Queue[GenreKey]" = queue.Queue()
+    _lock = threading.Lock()
+    _pending: Dict[GenreKey, dict] = {}  # chave -> {"ids", "artist", "album", "title", "attempts"}
+    _retry: List[Tuple[float, GenreKey]] = []  # (quando, chave)
+    _resolved: "OrderedDict[GenreKey, Optional[str]]" = OrderedDict()
+    _thread: Optional[threading.Thread] = None
+    _stop = threading.Event()
+    _last_lookup = 0.0
+
+    _lookups = 0
+    _updated = 0
+    _not_found = 0
+    _retried = 0
+    _failed = 0
+
+    @staticmethod
+    def _key(artist: str, album: Optional[str], title: Optional[str]) -> GenreKey:
+        artist = (artist or "").strip().lower()
+        album = (album or "").strip().lower()
+        # Com álbum, uma busca serve para todas as faixas dele; singles buscam pela faixa
+        return artist, album, "" if album else (title or "").strip().lower()
+
+    @staticmethod
+    def enqueue(track_id: int, artist: str, album: Optional[str] = None, title: Optional[str] = None):
+        """Agenda a busca de gênero de uma faixa já gravada. Não bloqueia."""
+        if not track_id or not artist or artist == "Desconhecido":
+            return
+        key = GenreEnricher._key(artist, album, title)
+        with GenreEnricher._lock:
+            entry = GenreEnricher._pending.get(key)
+            if entry is not None:
+                entry["ids"].add(track_id)
+                return
+            GenreEnricher._pending[key] = {
+                "ids": {track_id}, "artist": artist, "album": album or "", "title": title or "", "attempts": 0,
+            }
+        GenreEnricher._queue.put(key)
+
+    @staticmethod
+    def enqueue_tracks(tracks: Iterable[Tuple[int, str, Optional[str], Optional[str]]]) -> int:
+        """Agenda várias faixas (id, artista, álbum, título). Retorna quantas foram aceitas."""
+        count = 0
+        for track_id, artist, album, title in tracks:
+            if track_id and artist and artist != "Desconhecido":
+                GenreEnricher.enqueue(track_id, artist, album, title)
+                count += 1
+        return count
+
+    # --- Worker ---
+
+    @staticmethod
+    def _next_batch() -> List[GenreKey]:
+        batch: List[GenreKey] = []
+        now = time.monotonic()
+        with GenreEnricher._lock:
+            due = [item for item in GenreEnricher._retry if item[0] <= now]
+            GenreEnricher._retry = [item for item in GenreEnricher._retry if item[0] > now]
+        batch.extend(key for _, key in due)
+
+        # Espera o primeiro item e junta o que chegar logo em seguida (ex.: um álbum inteiro)
+        try:
+            batch.append(GenreEnricher._queue.get(timeout=GenreEnricher.BATCH_WAIT_SECONDS if batch else 1.0))
+        except queue.Empty:
+            return batch
+        deadline = time.monotonic() + GenreEnricher.BATCH_WAIT_SECONDS
+        while len(batch) < GenreEnricher.BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(GenreEnricher._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    @staticmethod
+    def _lookup(entry: dict) -> Optional[str]:
+        wait = GenreEnricher._last_lookup + GenreEnricher.MIN_INTERVAL_SECONDS - time.monotonic()
+        if wait > 0:
+            GenreEnricher._stop.wait(wait)
+        try:
+            genre = MetadataProvider.get_genre(entry["artist"], entry["album"], entry["title"], raise_errors=True)
+        finally:
+            GenreEnricher._last_lookup = time.monotonic()
+            GenreEnricher._lookups += 1
+        return genre if genre and genre != "Desconhecido" else None
+
+    @staticmethod
+    def _remember(key: GenreKey, genre: Optional[str]):
+        resolved = GenreEnricher._resolved
+        resolved[key] = genre
+        resolved.move_to_end(key)
+        while len(resolved) > GenreEnricher.RESOLVED_CACHE_SIZE:
+            resolved.popitem(last=False)
+
+    @staticmethod
+    def _process(batch: List[GenreKey]):
+        results: Dict[str, List[int]] = {}
+        for key in batch:
+            with GenreEnricher._lock:
+                entry = GenreEnricher._pending.get(key)
+            if entry is None:
+                continue
+
+            if key in GenreEnricher._resolved:
+                genre = GenreEnricher._resolved[key]
+            else:
+                try:
+                    genre = GenreEnricher._lookup(entry)
+                except Exception as e:
+                    entry["attempts"] += 1
+                    if entry["attempts"] < GenreEnricher.MAX_ATTEMPTS:
+                        GenreEnricher._retried += 1
+                        delay = GenreEnricher.RETRY_BASE_SECONDS * (2 ** (entry["attempts"] - 1))
+                        with GenreEnricher._lock:
+                            GenreEnricher._retry.append((time.monotonic() + delay, key))
+                    else:
+                        GenreEnricher._failed += 1
+                        print(f"⚠️ Gênero de '{entry['artist']}' não resolvido após {entry['attempts']} tentativas: {e}")
+                        with GenreEnricher._lock:
+                            GenreEnricher._pending.pop(key, None)
+                    continue
+                GenreEnricher._remember(key, genre)
+
+            # Ids que chegaram durante a busca entram no mesmo update
+            with GenreEnricher._lock:
+                entry = GenreEnricher._pending.pop(key, entry)
+            if genre:
+                results.setdefault(genre, []).extend(entry["ids"])
+            else:
+                GenreEnricher._not_found += 1
+
+        if results:
+            GenreEnricher._store(results)
+
+    @staticmethod
+    def _store(results: Dict[str, List[int]]):
+        db = SessionLocal()
+        try:
+            updated = 0
+            for genre, ids in results.items():
+                updated += db.query(models.Track)\
+                    .filter(models.Track.id.in_(ids))\
+                    .filter(or_(models.Track.genre.is_(None), models.Track.genre == "", models.Track.genre == "Desconhecido"))\
+                    .update({"genre": genre}, synchronize_session=False)
+            db.commit()
+            GenreEnricher._updated += updated
+            if updated:
+                print(f"🎵 Gênero preenchido em {updated} faixas ({', '.join(results)})")
+        except Exception as e:
+            db.rollback()
+            print(f"❌ Erro ao gravar gêneros: {e}")
+        finally:
+            db.close()
+
+    @staticmethod
+    def _run():
+        while not GenreEnricher._stop.is_set():
+            try:
+                batch = GenreEnricher._next_batch()
+                if batch:
+                    GenreEnricher._process(batch)
+            except Exception as e:
+                print(f"❌ Erro no enriquecimento de gêneros: {e}")
+                GenreEnricher._stop.wait(5)
+
+    @staticmethod
+    def start():
+        if GenreEnricher._thread and GenreEnricher._thread.is_alive():
+            return
+        GenreEnricher._stop.clear()
+        GenreEnricher._thread = threading.Thread(target=GenreEnricher._run, daemon=True, name="genre-enricher")
+        GenreEnricher._thread.start()
+
+    @staticmethod
+    def stop():
+        GenreEnricher._stop.set()
+        GenreEnricher._thread = None
+
+    @staticmethod
+    def stats() -> dict:
+        with GenreEnricher._lock:
+            pending = len(GenreEnricher._pending)
+            pending_tracks = sum(len(entry["ids"]) for entry in GenreEnricher._pending.values())
+            retrying = len(GenreEnricher._retry)
+        return {
+            "running": bool(GenreEnricher._thread and GenreEnricher._thread.is_alive()),
+            "pending_lookups": pending,
+            "pending_tracks": pending_tracks,
+            "retrying": retrying,
+            "lookups_total": GenreEnricher._lookups,
+            "tracks_updated_total": GenreEnricher._updated,
+            "not_found_total": GenreEnricher._not_found,
+            "retried_total": GenreEnricher._retried,
+            "failed_total": GenreEnricher._failed,
+            "min_interval_seconds": GenreEnricher.MIN_INTERVAL_SECONDS,
+        }
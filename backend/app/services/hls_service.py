@@ -0,0 +1,205 @@
+import os
+import math
+import shutil
+import asyncio
+import tempfile
+from collections import OrderedDict
+from typing import Dict, Optional
+from urllib.parse import quote
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from app.services.audio_manager import AudioManager, TIERS, TIER_LADDERS
+from app.services.transcode_cache import TranscodeCache
+from app.services.metadata_cache import MetadataCache
+
+
+class HLSService:
+    """
+    Saída HLS para os tiers transcodificados.
+
+    A playlist é montada a partir da duração do arquivo. O primeiro segmento pedido que
+    não está no cache dispara um único encode da faixa inteira (no codec do tier: MP3 ou
+    AAC em MPEG-TS, duração fixa), e cada segmento vai para o cache de transcode assim
+    que fica pronto. Um encode contínuo mantém a linha do tempo e o estado do encoder
+    entre segmentos, sem lacunas nem cliques nas fronteiras. Um seek para frente espera o
+    encode chegar lá (dezenas de vezes mais rápido que o tempo real).
+    """
+
+    SEGMENT_SECONDS = float(os.getenv("HLS_SEGMENT_SECONDS", "6"))
+    POLL_SECONDS = 0.2
+
+    # Um encode em produção por faixa+tier: ouvintes que chegam no meio esperam o mesmo
+    _encodes: Dict[str, "_TrackEncode"] = {}
+    # Segmentos que o último encode completo de cada faixa+tier produziu (pode ser menos que a playlist)
+    _produced: "OrderedDict[str, int]" = OrderedDict()
+    PRODUCED_SIZE = 4096
+
+    # Variantes da master playlist do quality=auto (só a escada AAC: a master anuncia mp4a)
+    AUTO_LADDER = TIER_LADDERS["aac"]
+
+    @staticmethod
+    def validate_quality(quality: str, allow_auto: bool = False):
+        if allow_auto and quality == "auto":
+            return
+        # Opus não tem mapeamento padrão em MPEG-TS; lossless não é transcodificado
+        if quality not in TIERS or TIERS[quality]["codec"] not in ("mp3", "aac"):
+            raise HTTPException(400, "HLS disponível apenas para os tiers MP3/AAC (ex.: low, medium, high, aac_medium) ou auto.")
+
+    @staticmethod
+    def build_master_playlist(filename: str, preferred: str) -> str:
+        """
+        Master playlist com uma variante por tier AAC.
+        O player troca de variante na fronteira dos segmentos conforme a banda; a preferida
+        (estimativa do servidor) vem primeiro porque é por ela que o player começa.
+        """
+        tiers = sorted(HLSService.AUTO_LADDER, key=lambda tier: tier != preferred)
+        lines = ["#EXTM3U", "#EXT-X-VERSION:3"]
+        for tier in tiers:
+            # ~10% de overhead do MPEG-TS sobre o bitrate do áudio
+            bandwidth = int(AudioManager.tier_bitrate_bps(tier) * 1.1)
+            lines.append(f'#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},CODECS="mp4a.40.2"')
+            lines.append(f"playlist.m3u8?filename={quote(filename)}&quality={tier}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    async def get_duration(file_path: str) -> float:
+        meta = await run_in_threadpool(MetadataCache.get_metadata, file_path)
+        duration = float(meta.get("duration") or 0)
+        if duration <= 0:
+            raise HTTPException(422, "Não foi possível determinar a duração do arquivo.")
+        return duration
+
+    @staticmethod
+    def segment_count(duration: float) -> int:
+        return max(1, math.ceil(duration / HLSService.SEGMENT_SECONDS))
+
+    @staticmethod
+    async def build_playlist(file_path: str, filename: str, quality: str) -> str:
+        duration = await HLSService.get_duration(file_path)
+        seg = HLSService.SEGMENT_SECONDS
+        count = HLSService.segment_count(duration)
+        # Depois de um encode completo, vale o que o ffmpeg produziu de fato
+        count = min(count, HLSService._produced.get(TranscodeCache.cache_key(file_path, quality), count))
+
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            f"#EXT-X-TARGETDURATION:{math.ceil(seg)}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+            "#EXT-X-PLAYLIST-TYPE:VOD",
+        ]
+        # URL relativa: resolve para /stream/hls/segment.ts a partir da playlist
+        base_query = f"filename={quote(filename)}&quality={quote(quality)}"
+        for index in range(count):
+            seg_duration = min(seg, duration - index * seg)
+            lines.append(f"#EXTINF:{seg_duration:.3f},")
+            lines.append(f"segment.ts?{base_query}&index={index}")
+        lines.append("#EXT-X-ENDLIST")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    async def get_segment(file_path: str, quality: str, index: int) -> str:
+        """Retorna o caminho do segmento em disco, codificando a faixa se ele ainda não existir."""
+        seg = HLSService.SEGMENT_SECONDS
+        path = TranscodeCache.segment_path(file_path, quality, index, seg)
+        if TranscodeCache.touch(path):
+            return path
+
+        duration = await HLSService.get_duration(file_path)
+        if index < 0 or index >= HLSService.segment_count(duration):
+            raise HTTPException(404, "Segmento fora do intervalo.")
+
+        key = TranscodeCache.cache_key(file_path, quality)
+        # A playlist sai da duração do container; o ffmpeg pode ter feito um segmento a menos
+        if index >= HLSService._produced.get(key, index + 1):
+            raise HTTPException(404, "Segmento fora do intervalo.")
+        encode = HLSService._encodes.get(key)
+        if encode is None:
+            encode = _TrackEncode()
+            HLSService._encodes[key] = encode
+            # Task própria: um ouvinte que desconecta não derruba o encode dos outros
+            encode.task = asyncio.create_task(HLSService._encode_track(key, encode, file_path, quality))
+            # Acorda quem espera só com a task já concluída (inclusive se ela falhar antes do encode)
+            encode.task.add_done_callback(lambda task: encode.notify())
+
+        while True:
+            changed = encode.changed
+            if TranscodeCache.touch(path):
+                return path
+            if encode.task.done():
+                break
+            await changed.wait()
+
+        error = encode.task.exception() if not encode.task.cancelled() else None
+        if isinstance(error, HTTPException):
+            raise error
+        if encode.segments is not None and index >= encode.segments:
+            raise HTTPException(404, "Segmento fora do intervalo.")
+        raise HTTPException(500, "Falha ao codificar segmento HLS.")
+
+    @staticmethod
+    async def _encode_track(key: str, encode: "_TrackEncode", file_path: str, quality: str):
+        seg = HLSService.SEGMENT_SECONDS
+        out_dir = await run_in_threadpool(tempfile.mkdtemp, prefix="orfeu-hls-")
+        try:
+            job = await AudioManager.encode_hls(file_path, quality, out_dir, seg)
+            finished = asyncio.ensure_future(job.read_all())
+            published = 0
+            try:
+                while True:
+                    # Lido antes da lista: depois que o ffmpeg saiu a lista está completa
+                    done = finished.done()
+                    names = await run_in_threadpool(HLSService._finished_segments, out_dir)
+                    for index in range(published, len(names)):
+                        path = TranscodeCache.segment_path(file_path, quality, index, seg)
+                        await run_in_threadpool(HLSService._publish_segment, os.path.join(out_dir, names[index]), path)
+                        published += 1
+                        encode.notify()
+                    if done:
+                        break
+                    await asyncio.wait({finished}, timeout=HLSService.POLL_SECONDS)
+            finally:
+                finished.cancel()
+            if job.process.returncode != 0:
+                print(f"❌ Encode HLS falhou ({job.process.returncode}): {os.path.basename(file_path)} [{quality}]")
+            else:
+                encode.segments = published
+                HLSService._produced[key] = published
+                HLSService._produced.move_to_end(key)
+                while len(HLSService._produced) > HLSService.PRODUCED_SIZE:
+                    HLSService._produced.popitem(last=False)
+        finally:
+            HLSService._encodes.pop(key, None)
+            await run_in_threadpool(shutil.rmtree, out_dir, True)
+
+    @staticmethod
+    def _finished_segments(out_dir: str) -> list:
+        """Arquivos dos segmentos já finalizados pelo ffmpeg, na ordem."""
+        try:
+            with open(os.path.join(out_dir, "segments.csv")) as f:
+                return [line.split(",", 1)[0] for line in f.read().splitlines() if line]
+        except FileNotFoundError:
+            return []
+
+    @staticmethod
+    def _publish_segment(source: str, path: str):
+        # Segmento que sobreviveu no cache (re-encode depois de um despejo parcial) só é renovado
+        if TranscodeCache.touch(path):
+            return
+        with open(source, "rb") as f:
+            TranscodeCache.store(path, f.read())
+
+
+class _TrackEncode:
+    """Encode HLS em andamento de uma faixa: quem espera acorda a cada segmento publicado."""
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.changed = asyncio.Event()
+        self.segments: Optional[int] = None  # Total produzido, quando o encode termina com sucesso
+
+    def notify(self):
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
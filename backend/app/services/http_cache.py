@@ -0,0 +1,83 @@
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+# Conteúdo endereçado (nome muda quando o conteúdo muda): cache eterno, sem revalidar
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Mídia servida por nome (pode ser re-tagueada): cache por um dia, depois revalida pelo ETag
+MEDIA_CACHE_CONTROL = "public, max-age=86400"
+# Pode guardar, mas sempre revalida (ex.: APK sem versão no nome)
+REVALIDATE_CACHE_CONTROL = "no-cache"
+# Resposta que depende do cliente (quality=auto): nada de cache compartilhado
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(st: os.stat_result, suffix: str = "", weak: bool = False) -> str:
+    """ETag a partir de tamanho + mtime (o 'suffix' distingue derivados: tier, segmento, capa)."""
+    tag = f"{st.st_size:x}-{st.st_mtime_ns:x}"
+    if suffix:
+        tag = f"{tag}-{suffix}"
+    return f'W/"{tag}"' if weak else f'"{tag}"'
+
+
+def validator_headers(etag: str, last_modified: float, cache_control: Optional[str] = None) -> dict:
+    headers = {"ETag": etag, "Last-Modified": formatdate(last_modified, usegmt=True)}
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    return headers
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def _parse_http_date(value: str) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def is_not_modified(request: Request, etag: str, last_modified: float) -> bool:
+    """
+    Avalia If-None-Match (comparação fraca) e, na ausência dele, If-Modified-Since (RFC 7232).
+    Só vale para GET/HEAD.
+    """
+    if request.method not in ("GET", "HEAD"):
+        return False
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        return _opaque(etag) in {_opaque(tag) for tag in if_none_match.split(",")}
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        since = _parse_http_date(if_modified_since)
+        # Datas HTTP têm resolução de segundos
+        return since is not None and int(last_modified) <= since
+    return False
+
+
+def if_range_matches(request: Request, etag: str, last_modified: float) -> bool:
+    """
+    If-Range: o Range só vale se a representação não mudou. Com ETag a comparação é forte
+    (tag fraca nunca bate); com data, precisa ser exatamente o Last-Modified.
+    Sem o header, o Range vale sempre.
+    """
+    if_range = request.headers.get("if-range")
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return not if_range.startswith("W/") and not etag.startswith("W/") and if_range == etag
+    since = _parse_http_date(if_range)
+    return since is not None and int(last_modified) == since
+
+
+def not_modified_response(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
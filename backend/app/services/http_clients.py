@@ -0,0 +1,193 @@
+import os
+import time
+import threading
+from typing import Dict, Optional
+
+import httpx
+
+from app.services.provider_cache import ProviderCache
+from app.services.circuit_breaker import CircuitBreaker, CircuitBreakers
+from app.services.request_deadline import RequestDeadline
+
+# HTTP/2 multiplexa as requisições para o mesmo host numa conexão só; sem o h2, fica no HTTP/1.1 com keep-alive
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+    print("⚠️ h2 não instalado. Clientes HTTP só com HTTP/1.1. Execute: pip install h2")
+
+
+class ProviderUnavailable(httpx.TransportError):
+    """Chamada recusada sem ir à rede: circuito do provedor aberto ou prazo da request esgotado."""
+
+
+def _is_failure(status_code: int) -> bool:
+    # Bloqueio, rate limit e erro do servidor: a resposta vazia do provider não é um "não encontrado"
+    return status_code in (401, 403, 429) or status_code >= 500
+
+
+def _admit(request: httpx.Request, breaker: Optional[CircuitBreaker]) -> bool:
+    """
+    Decide se a chamada sai e encurta os timeouts para o que resta do prazo da request.
+    Retorna se algum timeout foi encurtado (timeout nesse caso é do prazo, não do provedor).
+    """
+    remaining = RequestDeadline.remaining()
+    if remaining is not None and remaining <= 0:
+        ProviderCache.mark_failed()
+        raise ProviderUnavailable("Prazo da request esgotado", request=request)
+    if breaker is not None and not breaker.allow():
+        ProviderCache.mark_failed()
+        raise ProviderUnavailable(f"Circuito aberto para {breaker.name}", request=request)
+
+    capped = False
+    if remaining is not None:
+        timeout = dict(request.extensions.get("timeout", {}))
+        for phase in ("connect", "read", "write", "pool"):
+            if timeout.get(phase) is None or timeout[phase] > remaining:
+                timeout[phase] = remaining
+                capped = True
+        request.extensions["timeout"] = timeout
+    return capped
+
+
+def _settle(breaker: Optional[CircuitBreaker], started: float, capped: bool,
+            response: Optional[httpx.Response] = None, error: Optional[BaseException] = None):
+    """Registra o resultado no disjuntor e avisa o ProviderCache se a chamada falhou."""
+    failed = error is not None or _is_failure(response.status_code)
+    if failed:
+        ProviderCache.mark_failed()
+    if breaker is None:
+        return
+    if error is not None and (not isinstance(error, Exception) or (capped and isinstance(error, httpx.TimeoutException))):
+        # Cancelada ou cortada pelo prazo da request: não diz nada sobre a saúde do provedor
+        breaker.release()
+        return
+    detail = error.__class__.__name__ if error is not None else f"HTTP {response.status_code}"
+    breaker.record(not failed, time.monotonic() - started, detail)
+
+
+class _TrackedTransport(httpx.HTTPTransport):
+    """
+    Transport dos clientes compartilhados: aplica o disjuntor do provedor e o prazo da request,
+    e avisa o ProviderCache quando a chamada falhou (para não cachear o resultado vazio).
+    """
+
+    def __init__(self, breaker: Optional[CircuitBreaker] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.breaker = breaker
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        capped = _admit(request, self.breaker)
+        started = time.monotonic()
+        try:
+            response = super().handle_request(request)
+        except BaseException as e:
+            _settle(self.breaker, started, capped, error=e)
+            raise
+        _settle(self.breaker, started, capped, response=response)
+        return response
+
+
+class _AsyncTrackedTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, breaker: Optional[CircuitBreaker] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.breaker = breaker
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        capped = _admit(request, self.breaker)
+        started = time.monotonic()
+        try:
+            response = await super().handle_async_request(request)
+        except BaseException as e:
+            _settle(self.breaker, started, capped, error=e)
+            raise
+        _settle(self.breaker, started, capped, response=response)
+        return response
+
+
+class HttpClients:
+    """
+    Registro central de clientes httpx, um por provedor, reaproveitados entre chamadas.
+
+    Cada cliente mantém seu pool de conexões por host com keep-alive, então buscas seguidas
+    no mesmo serviço não pagam DNS + TCP + TLS de novo. Os clientes são criados sob demanda;
+    os assíncronos pertencem ao event loop do servidor e são fechados no shutdown.
+    Timeouts passados na chamada (client.get(..., timeout=...)) continuam valendo.
+    """
+
+    HTTP2 = HTTP2_AVAILABLE and os.getenv("HTTP_CLIENT_HTTP2", "1") != "0"
+
+    # Timeout padrão de cada provedor (connect, read)
+    PROFILES: Dict[str, httpx.Timeout] = {
+        "default": httpx.Timeout(10.0, connect=5.0),
+        "tidal": httpx.Timeout(10.0, connect=5.0),
+        "lastfm": httpx.Timeout(10.0, connect=5.0),
+        "itunes": httpx.Timeout(5.0, connect=3.0),
+        "lyrics": httpx.Timeout(10.0, connect=5.0),
+        "slskd": httpx.Timeout(15.0, connect=5.0),
+        "artwork": httpx.Timeout(10.0, connect=5.0),
+        # Arquivos de áudio: o read é por chunk, mas a CDN pode demorar a começar
+        "downloads": httpx.Timeout(60.0, connect=10.0),
+    }
+    LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=10, keepalive_expiry=60.0)
+
+    _sync: Dict[str, httpx.Client] = {}
+    _async: Dict[str, httpx.AsyncClient] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _timeout(name: str) -> httpx.Timeout:
+        return HttpClients.PROFILES.get(name, HttpClients.PROFILES["default"])
+
+    @staticmethod
+    def get_sync(name: str = "default") -> httpx.Client:
+        """Cliente síncrono compartilhado (para os providers que rodam em threads)."""
+        client = HttpClients._sync.get(name)
+        if client is None:
+            with HttpClients._lock:
+                client = HttpClients._sync.get(name)
+                if client is None:
+                    client = httpx.Client(
+                        timeout=HttpClients._timeout(name),
+                        transport=_TrackedTransport(
+                            CircuitBreakers.get(name), limits=HttpClients.LIMITS, http2=HttpClients.HTTP2
+                        ),
+                    )
+                    HttpClients._sync[name] = client
+        return client
+
+    @staticmethod
+    def get_async(name: str = "default") -> httpx.AsyncClient:
+        """Cliente assíncrono compartilhado (usar só no event loop do servidor)."""
+        client = HttpClients._async.get(name)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                timeout=HttpClients._timeout(name),
+                transport=_AsyncTrackedTransport(
+                    CircuitBreakers.get(name), limits=HttpClients.LIMITS, http2=HttpClients.HTTP2
+                ),
+            )
+            HttpClients._async[name] = client
+        return client
+
+    @staticmethod
+    async def close_all():
+        """Fecha todos os pools (shutdown do app)."""
+        with HttpClients._lock:
+            sync_clients = list(HttpClients._sync.values())
+            HttpClients._sync = {}
+        async_clients = list(HttpClients._async.values())
+        HttpClients._async = {}
+        for client in sync_clients:
+            client.close()
+        for client in async_clients:
+            await client.aclose()
+
+    @staticmethod
+    def stats() -> dict:
+        return {
+            "http2": HttpClients.HTTP2,
+            "sync_clients": sorted(HttpClients._sync),
+            "async_clients": sorted(HttpClients._async),
+        }
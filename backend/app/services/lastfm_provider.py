@@ -7,8 +7,9 @@ e informações de gênero/tags.
 API Docs: https://www.last.fm/api
 """
 import os
-import httpx
 from typing import Optional
+from app.services.http_clients import HttpClients
+from app.services.provider_cache import ProviderCache, HOUR, DAY
 
 class LastfmProvider:
     """
@@ -27,6 +28,7 @@ class LastfmProvider:
         return key
     
     @staticmethod
+    @ProviderCache.cached("lastfm.similar", ttl=7 * DAY)
     def get_similar_artists(artist_name: str, limit: int = 10) -> list[dict]:
         """
         Busca artistas similares a um artista específico.
@@ -55,53 +57,54 @@ class LastfmProvider:
                 "autocorrect": 1  # Corrige erros de digitação
             }
             
-            with httpx.Client() as client:
-                response = client.get(
-                    LastfmProvider.BASE_URL, 
-                    params=params, 
-                    timeout=10.0
-                )
-                
-                if response.status_code != 200:
-                    print(f"⚠️ Last.fm API Error: {response.status_code}")
-                    return []
-                
-                data = response.json()
-                
-                # Verifica se houve erro na resposta
-                if "error" in data:
-                    print(f"⚠️ Last.fm Error: {data.get('message', 'Unknown error')}")
-                    return []
-                
-                similar_artists = data.get("similarartists", {}).get("artist", [])
-                
-                # Normaliza os resultados
-                results = []
-                for artist in similar_artists:
-                    # Pega a maior imagem disponível
-                    images = artist.get("image", [])
-                    image_url = ""
-                    for img in reversed(images):  # Começa da maior
-                        if img.get("#text"):
-                            image_url = img["#text"]
-                            break
+            client = HttpClients.get_sync("lastfm")
+            response = client.get(
+                LastfmProvider.BASE_URL, 
+                params=params, 
+                timeout=10.0
+            )
+                
+            if response.status_code != 200:
+                print(f"⚠️ Last.fm API Error: {response.status_code}")
+                return []
+                
+            data = response.json()
+                
+            # Verifica se houve erro na resposta
+            if "error" in data:
+                print(f"⚠️ Last.fm Error: {data.get('message', 'Unknown error')}")
+                return []
+                
+            similar_artists = data.get("similarartists", {}).get("artist", [])
+                
+            # Normaliza os resultados
+            results = []
+            for artist in similar_artists:
+                # Pega a maior imagem disponível
+                images = artist.get("image", [])
+                image_url = ""
+                for img in reversed(images):  # Começa da maior
+                    if img.get("#text"):
+                        image_url = img["#text"]
+                        break
                     
-                    results.append({
-                        "name": artist.get("name", ""),
-                        "match": float(artist.get("match", 0)),  # Score de similaridade (0-1)
-                        "mbid": artist.get("mbid", ""),
-                        "url": artist.get("url", ""),
-                        "image": image_url
-                    })
+                results.append({
+                    "name": artist.get("name", ""),
+                    "match": float(artist.get("match", 0)),  # Score de similaridade (0-1)
+                    "mbid": artist.get("mbid", ""),
+                    "url": artist.get("url", ""),
+                    "image": image_url
+                })
                 
-                print(f"🎵 Last.fm: {len(results)} artistas similares a '{artist_name}'")
-                return results
+            print(f"🎵 Last.fm: {len(results)} artistas similares a '{artist_name}'")
+            return results
                 
         except Exception as e:
             print(f"❌ Erro Last.fm get_similar_artists: {e}")
             return []
     
     @staticmethod
+    @ProviderCache.cached("lastfm.artist_info", ttl=DAY, stale_ttl=7 * DAY)
     def get_artist_info(artist_name: str) -> Optional[dict]:
         """
         Busca informações detalhadas de um artista, incluindo tags/gêneros.
@@ -128,52 +131,53 @@ class LastfmProvider:
                 "autocorrect": 1
             }
             
-            with httpx.Client() as client:
-                response = client.get(
-                    LastfmProvider.BASE_URL, 
-                    params=params, 
-                    timeout=10.0
-                )
-                
-                if response.status_code != 200:
-                    return None
-                
-                data = response.json()
-                
-                if "error" in data:
-                    return None
-                
-                artist_data = data.get("artist", {})
-                
-                # Extrai tags
-                tags = []
-                for tag in artist_data.get("tags", {}).get("tag", []):
-                    tags.append(tag.get("name", ""))
-                
-                # Pega a maior imagem
-                images = artist_data.get("image", [])
-                image_url = ""
-                for img in reversed(images):
-                    if img.get("#text"):
-                        image_url = img["#text"]
-                        break
-                
-                return {
-                    "name": artist_data.get("name", artist_name),
-                    "mbid": artist_data.get("mbid", ""),
-                    "url": artist_data.get("url", ""),
-                    "image": image_url,
-                    "tags": tags,
-                    "bio": artist_data.get("bio", {}).get("summary", ""),
-                    "listeners": int(artist_data.get("stats", {}).get("listeners", 0)),
-                    "playcount": int(artist_data.get("stats", {}).get("playcount", 0))
-                }
+            client = HttpClients.get_sync("lastfm")
+            response = client.get(
+                LastfmProvider.BASE_URL, 
+                params=params, 
+                timeout=10.0
+            )
+                
+            if response.status_code != 200:
+                return None
+                
+            data = response.json()
+                
+            if "error" in data:
+                return None
+                
+            artist_data = data.get("artist", {})
+                
+            # Extrai tags
+            tags = []
+            for tag in artist_data.get("tags", {}).get("tag", []):
+                tags.append(tag.get("name", ""))
+                
+            # Pega a maior imagem
+            images = artist_data.get("image", [])
+            image_url = ""
+            for img in reversed(images):
+                if img.get("#text"):
+                    image_url = img["#text"]
+                    break
+                
+            return {
+                "name": artist_data.get("name", artist_name),
+                "mbid": artist_data.get("mbid", ""),
+                "url": artist_data.get("url", ""),
+                "image": image_url,
+                "tags": tags,
+                "bio": artist_data.get("bio", {}).get("summary", ""),
+                "listeners": int(artist_data.get("stats", {}).get("listeners", 0)),
+                "playcount": int(artist_data.get("stats", {}).get("playcount", 0))
+            }
                 
         except Exception as e:
             print(f"❌ Erro Last.fm get_artist_info: {e}")
             return None
     
     @staticmethod
+    @ProviderCache.cached("lastfm.tag_top_artists", ttl=DAY)
     def get_top_artists_by_tag(tag: str, limit: int = 10) -> list[dict]:
         """
         Busca os artistas mais populares de um gênero/tag específico.
@@ -201,40 +205,40 @@ class LastfmProvider:
                 "limit": limit
             }
             
-            with httpx.Client() as client:
-                response = client.get(
-                    LastfmProvider.BASE_URL, 
-                    params=params, 
-                    timeout=10.0
-                )
-                
-                if response.status_code != 200:
-                    return []
-                
-                data = response.json()
-                
-                if "error" in data:
-                    return []
-                
-                top_artists = data.get("topartists", {}).get("artist", [])
-                
-                results = []
-                for artist in top_artists:
-                    images = artist.get("image", [])
-                    image_url = ""
-                    for img in reversed(images):
-                        if img.get("#text"):
-                            image_url = img["#text"]
-                            break
+            client = HttpClients.get_sync("lastfm")
+            response = client.get(
+                LastfmProvider.BASE_URL, 
+                params=params, 
+                timeout=10.0
+            )
+                
+            if response.status_code != 200:
+                return []
+                
+            data = response.json()
+                
+            if "error" in data:
+                return []
+                
+            top_artists = data.get("topartists", {}).get("artist", [])
+                
+            results = []
+            for artist in top_artists:
+                images = artist.get("image", [])
+                image_url = ""
+                for img in reversed(images):
+                    if img.get("#text"):
+                        image_url = img["#text"]
+                        break
                     
-                    results.append({
-                        "name": artist.get("name", ""),
-                        "url": artist.get("url", ""),
-                        "image": image_url
-                    })
+                results.append({
+                    "name": artist.get("name", ""),
+                    "url": artist.get("url", ""),
+                    "image": image_url
+                })
                 
-                print(f"🏷️ Last.fm: {len(results)} top artistas para tag '{tag}'")
-                return results
+            print(f"🏷️ Last.fm: {len(results)} top artistas para tag '{tag}'")
+            return results
                 
         except Exception as e:
             print(f"❌ Erro Last.fm get_top_artists_by_tag: {e}")
@@ -245,6 +249,7 @@ class LastfmProvider:
     # ===================================================================
     
     @staticmethod
+    @ProviderCache.cached("lastfm.search_tracks", ttl=HOUR)
     def search_tracks(query: str, limit: int = 20) -> list[dict]:
         """
         Busca músicas no Last.fm.
@@ -268,46 +273,47 @@ class LastfmProvider:
                 "limit": limit
             }
             
-            with httpx.Client() as client:
-                response = client.get(LastfmProvider.BASE_URL, params=params, timeout=10.0)
-                
-                if response.status_code != 200:
-                    return []
-                
-                data = response.json()
-                if "error" in data:
-                    return []
-                
-                tracks = data.get("results", {}).get("trackmatches", {}).get("track", [])
-                
-                results = []
-                for track in tracks:
-                    # Pega imagem se disponível
-                    images = track.get("image", [])
-                    image_url = ""
-                    for img in reversed(images):
-                        if img.get("#text"):
-                            image_url = img["#text"]
-                            break
+            client = HttpClients.get_sync("lastfm")
+            response = client.get(LastfmProvider.BASE_URL, params=params, timeout=10.0)
+                
+            if response.status_code != 200:
+                return []
+                
+            data = response.json()
+            if "error" in data:
+                return []
+                
+            tracks = data.get("results", {}).get("trackmatches", {}).get("track", [])
+                
+            results = []
+            for track in tracks:
+                # Pega imagem se disponível
+                images = track.get("image", [])
+                image_url = ""
+                for img in reversed(images):
+                    if img.get("#text"):
+                        image_url = img["#text"]
+                        break
                     
-                    results.append({
-                        "trackName": track.get("name", ""),
-                        "artistName": track.get("artist", ""),
-                        "url": track.get("url", ""),
-                        "listeners": int(track.get("listeners", 0)),
-                        "mbid": track.get("mbid", ""),
-                        "artworkUrl": image_url,
-                        "source": "LastFM"
-                    })
-                
-                print(f"🔍 Last.fm: {len(results)} tracks para '{query}'")
-                return results
+                results.append({
+                    "trackName": track.get("name", ""),
+                    "artistName": track.get("artist", ""),
+                    "url": track.get("url", ""),
+                    "listeners": int(track.get("listeners", 0)),
+                    "mbid": track.get("mbid", ""),
+                    "artworkUrl": image_url,
+                    "source": "LastFM"
+                })
+                
+            print(f"🔍 Last.fm: {len(results)} tracks para '{query}'")
+            return results
                 
         except Exception as e:
             print(f"❌ Erro Last.fm search_tracks: {e}")
             return []
     
     @staticmethod
+    @ProviderCache.cached("lastfm.search_albums", ttl=HOUR)
     def search_albums(query: str, limit: int = 20) -> list[dict]:
         """
         Busca álbuns no Last.fm.
@@ -328,44 +334,45 @@ class LastfmProvider:
                 "limit": limit
             }
             
-            with httpx.Client() as client:
-                response = client.get(LastfmProvider.BASE_URL, params=params, timeout=10.0)
-                
-                if response.status_code != 200:
-                    return []
-                
-                data = response.json()
-                if "error" in data:
-                    return []
-                
-                albums = data.get("results", {}).get("albummatches", {}).get("album", [])
-                
-                results = []
-                for album in albums:
-                    images = album.get("image", [])
-                    image_url = ""
-                    for img in reversed(images):
-                        if img.get("#text"):
-                            image_url = img["#text"]
-                            break
+            client = HttpClients.get_sync("lastfm")
+            response = client.get(LastfmProvider.BASE_URL, params=params, timeout=10.0)
+                
+            if response.status_code != 200:
+                return []
+                
+            data = response.json()
+            if "error" in data:
+                return []
+                
+            albums = data.get("results", {}).get("albummatches", {}).get("album", [])
+                
+            results = []
+            for album in albums:
+                images = album.get("image", [])
+                image_url = ""
+                for img in reversed(images):
+                    if img.get("#text"):
+                        image_url = img["#text"]
+                        break
                     
-                    results.append({
-                        "collectionName": album.get("name", ""),
-                        "artistName": album.get("artist", ""),
-                        "url": album.get("url", ""),
-                        "mbid": album.get("mbid", ""),
-                        "artworkUrl": image_url,
-                        "source": "LastFM"
-                    })
-                
-                print(f"🔍 Last.fm: {len(results)} álbuns para '{query}'")
-                return results
+                results.append({
+                    "collectionName": album.get("name", ""),
+                    "artistName": album.get("artist", ""),
+                    "url": album.get("url", ""),
+                    "mbid": album.get("mbid", ""),
+                    "artworkUrl": image_url,
+                    "source": "LastFM"
+                })
+                
+            print(f"🔍 Last.fm: {len(results)} álbuns para '{query}'")
+            return results
                 
         except Exception as e:
             print(f"❌ Erro Last.fm search_albums: {e}")
             return []
     
     @staticmethod
+    @ProviderCache.cached("lastfm.search_artists", ttl=HOUR)
     def search_artists(query: str, limit: int = 20) -> list[dict]:
         """
         Busca artistas no Last.fm.
@@ -386,44 +393,45 @@ class LastfmProvider:
                 "limit": limit
             }
             
-            with httpx.Client() as client:
-                response = client.get(LastfmProvider.BASE_URL, params=params, timeout=10.0)
-                
-                if response.status_code != 200:
-                    return []
-                
-                data = response.json()
-                if "error" in data:
-                    return []
-                
-                artists = data.get("results", {}).get("artistmatches", {}).get("artist", [])
-                
-                results = []
-                for artist in artists:
-                    images = artist.get("image", [])
-                    image_url = ""
-                    for img in reversed(images):
-                        if img.get("#text"):
-                            image_url = img["#text"]
-                            break
+            client = HttpClients.get_sync("lastfm")
+            response = client.get(LastfmProvider.BASE_URL, params=params, timeout=10.0)
+                
+            if response.status_code != 200:
+                return []
+                
+            data = response.json()
+            if "error" in data:
+                return []
+                
+            artists = data.get("results", {}).get("artistmatches", {}).get("artist", [])
+                
+            results = []
+            for artist in artists:
+                images = artist.get("image", [])
+                image_url = ""
+                for img in reversed(images):
+                    if img.get("#text"):
+                        image_url = img["#text"]
+                        break
                     
-                    results.append({
-                        "artistName": artist.get("name", ""),
-                        "url": artist.get("url", ""),
-                        "listeners": int(artist.get("listeners", 0)),
-                        "mbid": artist.get("mbid", ""),
-                        "artworkUrl": image_url,
-                        "source": "LastFM"
-                    })
-                
-                print(f"🔍 Last.fm: {len(results)} artistas para '{query}'")
-                return results
+                results.append({
+                    "artistName": artist.get("name", ""),
+                    "url": artist.get("url", ""),
+                    "listeners": int(artist.get("listeners", 0)),
+                    "mbid": artist.get("mbid", ""),
+                    "artworkUrl": image_url,
+                    "source": "LastFM"
+                })
+                
+            print(f"🔍 Last.fm: {len(results)} artistas para '{query}'")
+            return results
                 
         except Exception as e:
             print(f"❌ Erro Last.fm search_artists: {e}")
             return []
     
     @staticmethod
+    @ProviderCache.cached("lastfm.artist_top_albums", ttl=DAY)
     def get_artist_top_albums(artist_name: str, limit: int = 20) -> list[dict]:
         """
         Busca os álbuns mais populares de um artista.
@@ -445,43 +453,43 @@ class LastfmProvider:
                 "autocorrect": 1
             }
             
-            with httpx.Client() as client:
-                response = client.get(LastfmProvider.BASE_URL, params=params, timeout=10.0)
-                
-                if response.status_code != 200:
-                    return []
-                
-                data = response.json()
-                if "error" in data:
-                    return []
-                
-                albums = data.get("topalbums", {}).get("album", [])
-                
-                results = []
-                for album in albums:
-                    images = album.get("image", [])
-                    image_url = ""
-                    for img in reversed(images):
-                        if img.get("#text"):
-                            image_url = img["#text"]
-                            break
+            client = HttpClients.get_sync("lastfm")
+            response = client.get(LastfmProvider.BASE_URL, params=params, timeout=10.0)
+                
+            if response.status_code != 200:
+                return []
+                
+            data = response.json()
+            if "error" in data:
+                return []
+                
+            albums = data.get("topalbums", {}).get("album", [])
+                
+            results = []
+            for album in albums:
+                images = album.get("image", [])
+                image_url = ""
+                for img in reversed(images):
+                    if img.get("#text"):
+                        image_url = img["#text"]
+                        break
                     
-                    # Pega o artista do objeto aninhado
-                    artist_obj = album.get("artist", {})
-                    artist = artist_obj.get("name", artist_name) if isinstance(artist_obj, dict) else str(artist_obj)
+                # Pega o artista do objeto aninhado
+                artist_obj = album.get("artist", {})
+                artist = artist_obj.get("name", artist_name) if isinstance(artist_obj, dict) else str(artist_obj)
                     
-                    results.append({
-                        "collectionName": album.get("name", ""),
-                        "artistName": artist,
-                        "url": album.get("url", ""),
-                        "playcount": int(album.get("playcount", 0)),
-                        "mbid": album.get("mbid", ""),
-                        "artworkUrl": image_url,
-                        "source": "LastFM"
-                    })
-                
-                print(f"📀 Last.fm: {len(results)} álbuns de '{artist_name}'")
-                return results
+                results.append({
+                    "collectionName": album.get("name", ""),
+                    "artistName": artist,
+                    "url": album.get("url", ""),
+                    "playcount": int(album.get("playcount", 0)),
+                    "mbid": album.get("mbid", ""),
+                    "artworkUrl": image_url,
+                    "source": "LastFM"
+                })
+                
+            print(f"📀 Last.fm: {len(results)} álbuns de '{artist_name}'")
+            return results
                 
         except Exception as e:
             print(f"❌ Erro Last.fm get_artist_top_albums: {e}")
@@ -558,25 +566,25 @@ class LastfmProvider:
                 "format": "json"
             }
             
-            with httpx.Client() as client:
-                response = client.post(
-                    LastfmProvider.BASE_URL,
-                    data=post_data,
-                    timeout=15.0
-                )
-                
-                data = response.json()
-                
-                if "error" in data:
-                    print(f"❌ Last.fm auth error: {data.get('message')}")
-                    return None
-                
-                session = data.get("session", {})
-                return {
-                    "session_key": session.get("key"),
-                    "username": session.get("name"),
-                    "subscriber": session.get("subscriber", 0)
-                }
+            client = HttpClients.get_sync("lastfm")
+            response = client.post(
+                LastfmProvider.BASE_URL,
+                data=post_data,
+                timeout=15.0
+            )
+                
+            data = response.json()
+                
+            if "error" in data:
+                print(f"❌ Last.fm auth error: {data.get('message')}")
+                return None
+                
+            session = data.get("session", {})
+            return {
+                "session_key": session.get("key"),
+                "username": session.get("name"),
+                "subscriber": session.get("subscriber", 0)
+            }
                 
         except Exception as e:
             print(f"❌ Erro Last.fm get_mobile_session: {e}")
@@ -639,28 +647,28 @@ class LastfmProvider:
                 "format": "json"
             }
             
-            with httpx.Client() as client:
-                response = client.post(
-                    LastfmProvider.BASE_URL,
-                    data=post_data,
-                    timeout=10.0
-                )
-                
-                data = response.json()
-                
-                if "error" in data:
-                    print(f"❌ Scrobble error: {data.get('message')}")
-                    return False
-                
-                scrobbles = data.get("scrobbles", {})
-                accepted = scrobbles.get("@attr", {}).get("accepted", 0)
-                
-                if int(accepted) > 0:
-                    print(f"✅ Scrobbled: {artist} - {track}")
-                    return True
-                else:
-                    print(f"⚠️ Scrobble ignorado: {artist} - {track}")
-                    return False
+            client = HttpClients.get_sync("lastfm")
+            response = client.post(
+                LastfmProvider.BASE_URL,
+                data=post_data,
+                timeout=10.0
+            )
+                
+            data = response.json()
+                
+            if "error" in data:
+                print(f"❌ Scrobble error: {data.get('message')}")
+                return False
+                
+            scrobbles = data.get("scrobbles", {})
+            accepted = scrobbles.get("@attr", {}).get("accepted", 0)
+                
+            if int(accepted) > 0:
+                print(f"✅ Scrobbled: {artist} - {track}")
+                return True
+            else:
+                print(f"⚠️ Scrobble ignorado: {artist} - {track}")
+                return False
                     
         except Exception as e:
             print(f"❌ Erro Last.fm scrobble_track: {e}")
@@ -704,19 +712,19 @@ class LastfmProvider:
                 "format": "json"
             }
             
-            with httpx.Client() as client:
-                response = client.post(
-                    LastfmProvider.BASE_URL,
-                    data=post_data,
-                    timeout=10.0
-                )
+            client = HttpClients.get_sync("lastfm")
+            response = client.post(
+                LastfmProvider.BASE_URL,
+                data=post_data,
+                timeout=10.0
+            )
                 
-                data = response.json()
+            data = response.json()
                 
-                if "error" in data:
-                    return False
+            if "error" in data:
+                return False
                 
-                return "nowplaying" in data
+            return "nowplaying" in data
                     
         except Exception as e:
             print(f"❌ Erro Last.fm update_now_playing: {e}")
@@ -0,0 +1,314 @@
+import os
+import time
+import threading
+from typing import Dict, List, Optional
+
+# inotify mantém o índice em tempo real; sem ele, só a varredura periódica
+try:
+    from inotify_simple import INotify, flags
+    INOTIFY_AVAILABLE = True
+except ImportError:
+    INOTIFY_AVAILABLE = False
+    print("⚠️ inotify_simple não instalado. Índice da biblioteca só com varredura periódica. Execute: pip install inotify_simple")
+
+
+class LibraryIndex:
+    """
+    Índice em memória dos arquivos de /downloads para o AudioManager.find_local_file.
+
+    Guarda basename -> caminhos relativos (na ordem da varredura) e caminho relativo em
+    minúsculas -> caminho real, então uma busca que antes varria a árvore inteira vira
+    um lookup em dicionário. É montado com os.scandir na inicialização, atualizado pelos
+    eventos do inotify e reconstruído periodicamente (cobre eventos perdidos, overflow
+    da fila do kernel e volumes de rede onde o inotify não enxerga mudanças).
+    """
+
+    BASE_PATH = "/downloads"
+    # Com inotify a reconstrução é só uma rede de segurança; sem ele, é o que mantém o índice em dia
+    RESCAN_SECONDS = float(os.getenv("LIBRARY_RESCAN_SECONDS", "3600"))
+    POLL_RESCAN_SECONDS = float(os.getenv("LIBRARY_POLL_RESCAN_SECONDS", "300"))
+
+    _by_name: Dict[str, List[str]] = {}
+    _by_lower: Dict[str, str] = {}
+    _ready = False
+    _lock = threading.Lock()
+    _stop = threading.Event()
+    _threads: List[threading.Thread] = []
+    _inotify_active = False
+    _last_build_seconds: Optional[float] = None
+    # Um por build em andamento: eventos que chegam durante a varredura, reaplicados na troca
+    _journals: List[list] = []
+
+    # --- Manutenção do índice ---
+
+    @staticmethod
+    def _scan(root_rel: str = ""):
+        """Percorre a árvore (a partir de root_rel) com scandir e retorna os caminhos relativos dos arquivos."""
+        files = []
+        stack = [os.path.join(LibraryIndex.BASE_PATH, root_rel) if root_rel else LibraryIndex.BASE_PATH]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            subdirs = []
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        # Mesmo comportamento do os.walk: não entra em links para diretórios
+                        if not entry.is_symlink():
+                            subdirs.append(entry.path)
+                    else:
+                        files.append(os.path.relpath(entry.path, LibraryIndex.BASE_PATH))
+                except OSError:
+                    continue
+            # Pilha invertida para visitar na ordem da listagem
+            stack.extend(reversed(subdirs))
+        return files
+
+    @staticmethod
+    def _add_locked(rel: str):
+        name = os.path.basename(rel)
+        paths = LibraryIndex._by_name.setdefault(name, [])
+        if rel not in paths:
+            paths.append(rel)
+        LibraryIndex._by_lower[rel.lower()] = rel
+
+    @staticmethod
+    def _remove_locked(rel: str):
+        name = os.path.basename(rel)
+        paths = LibraryIndex._by_name.get(name)
+        if paths and rel in paths:
+            paths.remove(rel)
+            if not paths:
+                del LibraryIndex._by_name[name]
+        if LibraryIndex._by_lower.get(rel.lower()) == rel:
+            del LibraryIndex._by_lower[rel.lower()]
+
+    @staticmethod
+    def _remove_tree_locked(rel_dir: str):
+        prefix = rel_dir.rstrip("/") + "/"
+        for rel in [r for r in LibraryIndex._by_lower.values() if r.startswith(prefix)]:
+            LibraryIndex._remove_locked(rel)
+
+    @staticmethod
+    def _record_locked(op, rel: str):
+        for journal in LibraryIndex._journals:
+            journal.append((op, rel))
+
+    @staticmethod
+    def build():
+        started = time.monotonic()
+        journal: list = []
+        with LibraryIndex._lock:
+            LibraryIndex._journals.append(journal)
+        try:
+            files = LibraryIndex._scan()
+            by_name: Dict[str, List[str]] = {}
+            by_lower: Dict[str, str] = {}
+            for rel in files:
+                by_name.setdefault(os.path.basename(rel), []).append(rel)
+                by_lower[rel.lower()] = rel
+            with LibraryIndex._lock:
+                LibraryIndex._by_name = by_name
+                LibraryIndex._by_lower = by_lower
+                # A varredura pode ter passado pela pasta antes do evento: reaplica na ordem
+                for op, rel in journal:
+                    op(rel)
+                LibraryIndex._ready = True
+        finally:
+            with LibraryIndex._lock:
+                LibraryIndex._journals.remove(journal)
+        LibraryIndex._last_build_seconds = time.monotonic() - started
+        print(f"📚 Índice da biblioteca: {len(files)} arquivos em {LibraryIndex._last_build_seconds:.1f}s")
+
+    @staticmethod
+    def add_tree(rel_dir: str):
+        files = LibraryIndex._scan(rel_dir)
+        with LibraryIndex._lock:
+            for rel in files:
+                LibraryIndex._add_locked(rel)
+                LibraryIndex._record_locked(LibraryIndex._add_locked, rel)
+
+    @staticmethod
+    def add_file(rel: str):
+        with LibraryIndex._lock:
+            LibraryIndex._add_locked(rel)
+            LibraryIndex._record_locked(LibraryIndex._add_locked, rel)
+
+    @staticmethod
+    def add_path(abs_path: str):
+        """Indexa um arquivo recém-gravado (ex.: fim de um download) sem esperar o inotify ou a próxima varredura."""
+        rel = os.path.relpath(abs_path, LibraryIndex.BASE_PATH)
+        if LibraryIndex._ready and not rel.startswith(".."):
+            LibraryIndex.add_file(rel)
+
+    @staticmethod
+    def remove_file(rel: str):
+        with LibraryIndex._lock:
+            LibraryIndex._remove_locked(rel)
+            LibraryIndex._record_locked(LibraryIndex._remove_locked, rel)
+
+    @staticmethod
+    def remove_tree(rel_dir: str):
+        with LibraryIndex._lock:
+            LibraryIndex._remove_tree_locked(rel_dir)
+            LibraryIndex._record_locked(LibraryIndex._remove_tree_locked, rel_dir)
+
+    # --- Consulta ---
+
+    @staticmethod
+    def is_ready() -> bool:
+        return LibraryIndex._ready
+
+    @staticmethod
+    def is_live() -> bool:
+        """Índice pronto e acompanhando o disco pelo inotify: um miss é um miss de verdade."""
+        return LibraryIndex._ready and LibraryIndex._inotify_active
+
+    @staticmethod
+    def lookup(sanitized_filename: str) -> Optional[str]:
+        """
+        Mesmas regras do fallback antigo: procura pelo basename; se algum candidato tem o
+        caminho igual ao pedido (ignorando maiúsculas), ele vence; senão, o primeiro.
+        Retorna o caminho absoluto ou None.
+        """
+        target_name = os.path.basename(sanitized_filename)
+        with LibraryIndex._lock:
+            exact = LibraryIndex._by_lower.get(sanitized_filename.lower())
+            candidates = list(LibraryIndex._by_name.get(target_name, []))
+
+        # O basename precisa bater exatamente, como no os.walk
+        if exact and os.path.basename(exact) == target_name:
+            full_path = os.path.join(LibraryIndex.BASE_PATH, exact)
+            if os.path.isfile(full_path):
+                return full_path
+
+        # Descarta entradas que sumiram do disco antes de o evento chegar
+        matches = [os.path.join(LibraryIndex.BASE_PATH, rel) for rel in candidates]
+        matches = [path for path in matches if os.path.isfile(path)]
+        if matches:
+            if len(matches) > 1:
+                print(f"⚠️ Múltiplos arquivos encontrados para '{target_name}': {matches}")
+            return matches[0]
+        return None
+
+    # --- inotify ---
+
+    @staticmethod
+    def _watch_tree(inotify, watches: Dict[int, str], abs_dir: str) -> bool:
+        mask = (flags.CREATE | flags.MOVED_TO | flags.MOVED_FROM | flags.DELETE
+                | flags.DELETE_SELF | flags.CLOSE_WRITE)
+        stack = [abs_dir]
+        while stack:
+            current = stack.pop()
+            try:
+                wd = inotify.add_watch(current, mask)
+            except OSError as e:
+                # ENOSPC: limite de watches do kernel (fs.inotify.max_user_watches)
+                print(f"⚠️ inotify indisponível para {current}: {e}. Seguindo só com varredura periódica.")
+                return False
+            watches[wd] = current
+            try:
+                with os.scandir(current) as it:
+                    stack.extend(e.path for e in it if e.is_dir() and not e.is_symlink())
+            except OSError:
+                continue
+        return True
+
+    @staticmethod
+    def _handle_event(inotify, watches: Dict[int, str], event) -> bool:
+        """Aplica um evento no índice. Retorna False se o índice precisa ser reconstruído."""
+        if event.mask & flags.Q_OVERFLOW:
+            return False
+        parent = watches.get(event.wd)
+        if parent is None:
+            return True
+        if event.mask & (flags.DELETE_SELF | flags.IGNORED):
+            watches.pop(event.wd, None)
+            return True
+        if not event.name:
+            return True
+
+        abs_path = os.path.join(parent, event.name)
+        rel = os.path.relpath(abs_path, LibraryIndex.BASE_PATH)
+        if event.mask & flags.ISDIR:
+            if event.mask & (flags.CREATE | flags.MOVED_TO):
+                LibraryIndex.add_tree(rel)
+                if not LibraryIndex._watch_tree(inotify, watches, abs_path):
+                    LibraryIndex._inotify_active = False
+            elif event.mask & (flags.DELETE | flags.MOVED_FROM):
+                LibraryIndex.remove_tree(rel)
+        elif event.mask & (flags.CREATE | flags.MOVED_TO | flags.CLOSE_WRITE):
+            LibraryIndex.add_file(rel)
+        elif event.mask & (flags.DELETE | flags.MOVED_FROM):
+            LibraryIndex.remove_file(rel)
+        return True
+
+    @staticmethod
+    def _inotify_loop():
+        inotify = INotify()
+        watches: Dict[int, str] = {}
+        try:
+            LibraryIndex._inotify_active = LibraryIndex._watch_tree(inotify, watches, LibraryIndex.BASE_PATH)
+            # Watches antes da varredura: nada criado no meio do build se perde
+            LibraryIndex.build()
+            while LibraryIndex._inotify_active and not LibraryIndex._stop.is_set():
+                for event in inotify.read(timeout=1000):
+                    if not LibraryIndex._handle_event(inotify, watches, event):
+                        print("⚠️ Fila do inotify estourou, reconstruindo índice da biblioteca")
+                        LibraryIndex.build()
+        except Exception as e:
+            print(f"❌ Watcher da biblioteca parou: {e}")
+        finally:
+            LibraryIndex._inotify_active = False
+            inotify.close()
+
+    @staticmethod
+    def _rescan_interval() -> float:
+        return LibraryIndex.RESCAN_SECONDS if LibraryIndex._inotify_active else LibraryIndex.POLL_RESCAN_SECONDS
+
+    @staticmethod
+    def _rescan_loop():
+        if not LibraryIndex._ready and not INOTIFY_AVAILABLE:
+            LibraryIndex.build()
+        while not LibraryIndex._stop.wait(LibraryIndex._rescan_interval()):
+            try:
+                LibraryIndex.build()
+            except Exception as e:
+                print(f"❌ Erro ao reconstruir índice da biblioteca: {e}")
+
+    @staticmethod
+    def start():
+        """Monta o índice e inicia a manutenção em threads (não bloqueia a inicialização)."""
+        if LibraryIndex._threads or not os.path.isdir(LibraryIndex.BASE_PATH):
+            return
+        LibraryIndex._stop.clear()
+        targets = [LibraryIndex._rescan_loop]
+        if INOTIFY_AVAILABLE:
+            targets.insert(0, LibraryIndex._inotify_loop)
+        for target in targets:
+            thread = threading.Thread(target=target, daemon=True, name=f"library-index-{target.__name__.strip('_')}")
+            thread.start()
+            LibraryIndex._threads.append(thread)
+
+    @staticmethod
+    def stop():
+        LibraryIndex._stop.set()
+        LibraryIndex._threads = []
+
+    @staticmethod
+    def stats() -> dict:
+        with LibraryIndex._lock:
+            files = len(LibraryIndex._by_lower)
+            names = len(LibraryIndex._by_name)
+        return {
+            "ready": LibraryIndex._ready,
+            "files": files,
+            "distinct_names": names,
+            "inotify": LibraryIndex._inotify_active,
+            "rescan_seconds": LibraryIndex._rescan_interval(),
+            "last_build_seconds": round(LibraryIndex._last_build_seconds, 3) if LibraryIndex._last_build_seconds is not None else None,
+        }
@@ -0,0 +1,273 @@
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import exists, or_
+from sqlalchemy.exc import IntegrityError
+
+from app import models
+from app.database import SessionLocal
+from app.services.audio_manager import AudioManager
+from app.services.genre_enricher import GenreEnricher
+
+AUDIO_EXTENSIONS = ('.flac', '.mp3', '.m4a')
+
+
+def _extract_metadata(full_path: str) -> Tuple[str, Optional[dict], Optional[str]]:
+    """Roda no processo do pool: uma leitura de metadados (técnicos + tags) por arquivo."""
+    try:
+        meta = AudioManager.get_audio_metadata(full_path)
+        return full_path, {
+            "title": meta.get("title"),
+            "artist": meta.get("artist"),
+            "album": meta.get("album"),
+            "genre": meta.get("genre"),
+            "duration": meta.get("duration", 0),
+            "format": meta.get("format"),
+            "bitrate": meta.get("bitrate"),
+        }, None
+    except Exception as e:
+        return full_path, None, str(e)
+
+
+class LibraryScanner:
+    """
+    Sincronização incremental do disco com a tabela tracks.
+
+    Carrega todas as faixas conhecidas numa única query e compara tamanho/mtime com o disco:
+    só arquivos novos ou alterados têm os metadados extraídos (num pool de processos), as
+    gravações vão em lote e faixas que sumiram do disco são removidas. Roda numa thread
+    própria com sessão própria, então não trava o event loop, e expõe o progresso.
+    """
+
+    BASE_PATH = "/downloads"
+    WORKERS = int(os.getenv("LIBRARY_SCAN_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+    BATCH_SIZE = int(os.getenv("LIBRARY_SCAN_BATCH", "500"))
+
+    _lock = threading.Lock()
+    _thread: Optional[threading.Thread] = None
+    _progress: dict = {"state": "idle"}
+
+    @staticmethod
+    def _set(**fields):
+        LibraryScanner._progress.update(fields)
+
+    @staticmethod
+    def _walk() -> Dict[str, Tuple[int, float]]:
+        """Caminho relativo -> (tamanho, mtime) de todos os arquivos de áudio."""
+        found = {}
+        stack = [LibraryScanner.BASE_PATH]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif entry.name.lower().endswith(AUDIO_EXTENSIONS):
+                                st = entry.stat()
+                                rel = os.path.relpath(entry.path, LibraryScanner.BASE_PATH)
+                                found[rel] = (st.st_size, st.st_mtime)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+            LibraryScanner._set(files_seen=len(found))
+        return found
+
+    @staticmethod
+    def _track_fields(rel: str, meta: dict) -> dict:
+        file = os.path.basename(rel)
+        genre = meta.get("genre")
+        return {
+            "title": meta.get("title") or file,
+            "artist": meta.get("artist") or "Desconhecido",
+            "album": meta.get("album"),
+            "genre": genre if genre and genre != "Desconhecido" else None,
+            "duration": meta.get("duration", 0),
+            "format": meta.get("format"),
+            "bitrate": meta.get("bitrate"),
+        }
+
+    @staticmethod
+    def _flush(db, inserts: List[dict], updates: List[dict]):
+        try:
+            if inserts:
+                db.bulk_insert_mappings(models.Track, inserts)
+            if updates:
+                db.bulk_update_mappings(models.Track, updates)
+            db.commit()
+        except IntegrityError:
+            # Uma request criou a faixa (play/favorito de arquivo ainda não indexado) durante o
+            # scan: o lote inteiro voltou, então refaz linha a linha
+            db.rollback()
+            LibraryScanner._store_rows(db, inserts, updates)
+        inserts.clear()
+        updates.clear()
+
+    @staticmethod
+    def _store_rows(db, inserts: List[dict], updates: List[dict]):
+        """Fallback do lote: faixas que já existem são atualizadas em vez de inseridas."""
+        if updates:
+            db.bulk_update_mappings(models.Track, updates)
+            db.commit()
+        for row in inserts:
+            try:
+                existing = db.query(models.Track).filter(models.Track.filename == row["filename"]).first()
+                if existing is None:
+                    db.add(models.Track(**row))
+                else:
+                    row = {**row, "genre": row["genre"] or existing.genre}
+                    for field, value in row.items():
+                        setattr(existing, field, value)
+                db.commit()
+            except IntegrityError as e:
+                db.rollback()
+                LibraryScanner._progress["errors"] += 1
+                print(f"Erro ao indexar {row['filename']}: {e}")
+
+    @staticmethod
+    def _extract_and_store(db, pending: List[str], known: dict, on_disk: dict):
+        inserts, updates = [], []
+        paths = [os.path.join(LibraryScanner.BASE_PATH, rel) for rel in pending]
+        # spawn: o processo do servidor tem threads (event loop, watchers) e fork com threads é frágil
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=LibraryScanner.WORKERS, mp_context=context) as pool:
+            for full_path, meta, error in pool.map(_extract_metadata, paths, chunksize=16):
+                rel = os.path.relpath(full_path, LibraryScanner.BASE_PATH)
+                progress = LibraryScanner._progress
+                progress["processed"] += 1
+                if meta is None:
+                    progress["errors"] += 1
+                    print(f"Erro ao indexar {rel}: {error}")
+                    continue
+
+                size, mtime = on_disk[rel]
+                row = {**LibraryScanner._track_fields(rel, meta), "file_size": size, "file_mtime": mtime}
+                if rel in known:
+                    track_id, _, _, old_genre = known[rel]
+                    # Gênero já resolvido (tag ou busca online) não é perdido se a tag não tem
+                    row["genre"] = row["genre"] or old_genre
+                    updates.append({"id": track_id, **row})
+                else:
+                    inserts.append({"filename": rel, **row})
+
+                if len(inserts) + len(updates) >= LibraryScanner.BATCH_SIZE:
+                    LibraryScanner._flush(db, inserts, updates)
+        LibraryScanner._flush(db, inserts, updates)
+
+    @staticmethod
+    def _remove_missing(db, missing: List[int]) -> Tuple[int, int]:
+        """Remove faixas que sumiram do disco. As referenciadas (histórico, favoritos, playlists) ficam."""
+        deleted = kept = 0
+        for i in range(0, len(missing), LibraryScanner.BATCH_SIZE):
+            ids = missing[i:i + LibraryScanner.BATCH_SIZE]
+            referenced = or_(
+                exists().where(models.ListenHistory.track_id == models.Track.id),
+                exists().where(models.Favorite.track_id == models.Track.id),
+                exists().where(models.PlaylistItem.track_id == models.Track.id),
+            )
+            removable = [row.id for row in db.query(models.Track.id).filter(models.Track.id.in_(ids), ~referenced)]
+            if removable:
+                db.query(models.Track).filter(models.Track.id.in_(removable)).delete(synchronize_session=False)
+                db.commit()
+            deleted += len(removable)
+            kept += len(ids) - len(removable)
+        return deleted, kept
+
+    @staticmethod
+    def _queue_genres(db, filenames: List[str]) -> int:
+        """Faixas novas/alteradas sem gênero vão para a busca online em background."""
+        rows = []
+        for i in range(0, len(filenames), LibraryScanner.BATCH_SIZE):
+            rows += db.query(models.Track.id, models.Track.artist, models.Track.album, models.Track.title)\
+                .filter(models.Track.filename.in_(filenames[i:i + LibraryScanner.BATCH_SIZE]))\
+                .filter(or_(models.Track.genre.is_(None), models.Track.genre == ""))\
+                .all()
+        return GenreEnricher.enqueue_tracks(rows)
+
+    @staticmethod
+    def run():
+        started = time.monotonic()
+        LibraryScanner._progress = {
+            "state": "running", "phase": "walking", "started_at": datetime.now().isoformat(timespec="seconds"),
+            "files_seen": 0, "new": 0, "changed": 0, "unchanged": 0, "backfilled": 0,
+            "processed": 0, "to_process": 0, "errors": 0, "deleted": 0, "missing_referenced": 0, "genres_queued": 0,
+        }
+        print("🔄 Sincronizando arquivos do disco para o DB...")
+        db = SessionLocal()
+        try:
+            on_disk = LibraryScanner._walk()
+
+            LibraryScanner._set(phase="diffing")
+            known = {
+                filename: (track_id, size, mtime, genre)
+                for track_id, filename, size, mtime, genre in db.query(
+                    models.Track.id, models.Track.filename, models.Track.file_size, models.Track.file_mtime, models.Track.genre
+                )
+            }
+
+            pending, backfill = [], []
+            for rel, (size, mtime) in on_disk.items():
+                entry = known.get(rel)
+                if entry is None:
+                    pending.append(rel)
+                    LibraryScanner._progress["new"] += 1
+                elif entry[1] is None:
+                    # Indexada antes de existir size/mtime: só registra, sem reler o arquivo
+                    backfill.append({"id": entry[0], "file_size": size, "file_mtime": mtime})
+                elif entry[1] != size or entry[2] != mtime:
+                    pending.append(rel)
+                    LibraryScanner._progress["changed"] += 1
+                else:
+                    LibraryScanner._progress["unchanged"] += 1
+
+            for i in range(0, len(backfill), LibraryScanner.BATCH_SIZE):
+                db.bulk_update_mappings(models.Track, backfill[i:i + LibraryScanner.BATCH_SIZE])
+                db.commit()
+            LibraryScanner._set(backfilled=len(backfill), phase="extracting", to_process=len(pending))
+
+            if pending:
+                LibraryScanner._extract_and_store(db, pending, known, on_disk)
+
+            LibraryScanner._set(phase="deleting")
+            missing = [entry[0] for rel, entry in known.items() if rel not in on_disk]
+            deleted, kept = LibraryScanner._remove_missing(db, missing)
+            LibraryScanner._set(deleted=deleted, missing_referenced=kept)
+
+            LibraryScanner._set(genres_queued=LibraryScanner._queue_genres(db, pending))
+
+            LibraryScanner._set(state="done", phase=None)
+            print(
+                f"✅ Sincronização concluída em {time.monotonic() - started:.1f}s: "
+                f"{LibraryScanner._progress['new']} novas, {LibraryScanner._progress['changed']} alteradas, {deleted} removidas."
+            )
+        except Exception as e:
+            db.rollback()
+            LibraryScanner._set(state="error", error=str(e))
+            print(f"❌ Erro na sincronização da biblioteca: {e}")
+        finally:
+            db.close()
+            LibraryScanner._set(
+                finished_at=datetime.now().isoformat(timespec="seconds"),
+                elapsed_seconds=round(time.monotonic() - started, 1),
+            )
+
+    @staticmethod
+    def start() -> bool:
+        """Inicia um scan em background. Retorna False se já há um rodando."""
+        with LibraryScanner._lock:
+            if LibraryScanner._thread and LibraryScanner._thread.is_alive():
+                return False
+            LibraryScanner._thread = threading.Thread(target=LibraryScanner.run, daemon=True, name="library-scan")
+            LibraryScanner._thread.start()
+            return True
+
+    @staticmethod
+    def status() -> dict:
+        return dict(LibraryScanner._progress)
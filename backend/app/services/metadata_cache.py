@@ -0,0 +1,69 @@
+import os
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from app import models
+from app.database import SessionLocal
+from app.services.audio_manager import AudioManager
+
+
+class MetadataCache:
+    """
+    Metadados de arquivo persistidos no banco (tabela audio_metadata_cache).
+
+    Cada consulta faz só um stat: se tamanho e mtime batem com a linha salva, os dados
+    saem do banco; senão o arquivo é relido (uma abertura com mutagen, que também diz se há capa)
+    e a linha é atualizada. Síncrono: nas rotas async, chamar via run_in_threadpool.
+    """
+
+    @staticmethod
+    def get(file_path: str) -> dict:
+        """{"metadata", "tags", "has_cover"} do arquivo, do banco quando ele não mudou."""
+        st = os.stat(file_path)
+        db = SessionLocal()
+        try:
+            row = db.query(models.AudioMetadataCache).filter(models.AudioMetadataCache.path == file_path).first()
+            if row and row.file_size == st.st_size and row.file_mtime == st.st_mtime:
+                return {"metadata": row.audio_metadata, "tags": row.tags, "has_cover": bool(row.has_cover)}
+
+            info = AudioManager.read_file_info(file_path)
+            fields = {
+                "file_size": st.st_size,
+                "file_mtime": st.st_mtime,
+                "audio_metadata": info["metadata"],
+                "tags": info["tags"],
+                "has_cover": info["has_cover"],
+            }
+            try:
+                if row:
+                    for key, value in fields.items():
+                        setattr(row, key, value)
+                else:
+                    db.add(models.AudioMetadataCache(path=file_path, **fields))
+                db.commit()
+            except IntegrityError:
+                # Outra request gravou o mesmo arquivo ao mesmo tempo: o dado lido serve igual
+                db.rollback()
+            except Exception as e:
+                db.rollback()
+                print(f"⚠️ Erro ao salvar cache de metadados de {os.path.basename(file_path)}: {e}")
+            return info
+        finally:
+            db.close()
+
+    @staticmethod
+    def get_metadata(file_path: str) -> dict:
+        return MetadataCache.get(file_path)["metadata"]
+
+    @staticmethod
+    def get_tags(file_path: str) -> dict:
+        return MetadataCache.get(file_path)["tags"]
+
+    @staticmethod
+    def has_cover(file_path: str) -> Optional[bool]:
+        """True/False conforme o arquivo; None se não deu para verificar."""
+        try:
+            return MetadataCache.get(file_path)["has_cover"]
+        except Exception:
+            return None
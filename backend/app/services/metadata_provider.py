@@ -1,6 +1,8 @@
-import httpx
 import urllib.parse
 
+from app.services.http_clients import HttpClients
+from app.services.provider_cache import ProviderCache, DAY
+
 class MetadataProvider:
     """
     Serviço auxiliar para buscar metadados que faltam nas APIs principais (Tidal/YT),
@@ -8,42 +10,89 @@ class MetadataProvider:
     """
     
     @staticmethod
-    def get_genre(artist: str, album_title: str = "", track_title: str = "") -> str:
+    def get_genre(artist: str, album_title: str = "", track_title: str = "", raise_errors: bool = False) -> str:
         """
         Tenta descobrir o gênero principal. 
         Prioridade: Busca por Álbum -> Busca por Track -> Retorna None
+        Com raise_errors, falhas de rede/rate limit sobem como exceção (para quem quer tentar de novo)
+        em vez de virarem "Desconhecido".
         """
         try:
-            # 1. Tenta buscar pelo Álbum (Mais preciso para gênero)
+            return MetadataProvider._fetch_genre(artist, album_title, track_title)
+        except Exception as e:
+            if raise_errors:
+                raise
+            print(f"⚠️ Erro ao buscar gênero externo: {e}")
+            return "Desconhecido"
+
+    @staticmethod
+    @ProviderCache.cached("itunes.genre", ttl=30 * DAY, is_negative=lambda g: not g or g == "Desconhecido")
+    def _fetch_genre(artist: str, album_title: str = "", track_title: str = "") -> str:
+        """
+        Busca compartilhada pelo cache e pelo SingleFlight: falhas sempre sobem como exceção
+        e cada chamador de get_genre decide se repassa ou vira "Desconhecido".
+        """
+        # 1. Tenta buscar pelo Álbum (Mais preciso para gênero)
+        if album_title and album_title.lower() not in ["single", "unknown", ""]:
+            term = f"{artist} {album_title}"
+            genre = MetadataProvider._query_itunes(term, entity="album")
+            if genre: return genre
+
+        # 2. Se falhar ou for single, tenta pela música
+        if track_title:
+            term = f"{artist} {track_title}"
+            genre = MetadataProvider._query_itunes(term, entity="song")
+            if genre: return genre
+
+        return "Desconhecido"
+
+    @staticmethod
+    def _query_itunes(term: str, entity: str) -> str:
+        encoded_term = urllib.parse.quote(term)
+        url = f"https://itunes.apple.com/search?term={encoded_term}&entity={entity}&limit=1"
+
+        client = HttpClients.get_sync("itunes")
+        resp = client.get(url, timeout=3.0) # Timeout curto para não travar o app
+        if resp.status_code == 200:
+            data = resp.json()
+            if data.get('resultCount', 0) > 0:
+                return data['results'][0].get('primaryGenreName')
+        elif resp.status_code == 429 or resp.status_code >= 500 or resp.status_code == 403:
+            # 403/429: limite de requisições do iTunes
+            resp.raise_for_status()
+        return None
+
+    @staticmethod
+    @ProviderCache.cached("itunes.genre", ttl=30 * DAY, is_negative=lambda g: not g or g == "Desconhecido")
+    async def get_genre_async(artist: str, album_title: str = "", track_title: str = "") -> str:
+        """Mesmo que get_genre, para as rotas async (cliente httpx assíncrono)."""
+        try:
             if album_title and album_title.lower() not in ["single", "unknown", ""]:
-                term = f"{artist} {album_title}"
-                genre = MetadataProvider._query_itunes(term, entity="album")
+                genre = await MetadataProvider._query_itunes_async(f"{artist} {album_title}", entity="album")
                 if genre: return genre
 
-            # 2. Se falhar ou for single, tenta pela música
             if track_title:
-                term = f"{artist} {track_title}"
-                genre = MetadataProvider._query_itunes(term, entity="song")
+                genre = await MetadataProvider._query_itunes_async(f"{artist} {track_title}", entity="song")
                 if genre: return genre
-                
+
             return "Desconhecido"
-            
+
         except Exception as e:
             print(f"⚠️ Erro ao buscar gênero externo: {e}")
             return "Desconhecido"
 
     @staticmethod
-    def _query_itunes(term: str, entity: str) -> str:
+    async def _query_itunes_async(term: str, entity: str) -> str:
         try:
             encoded_term = urllib.parse.quote(term)
             url = f"https://itunes.apple.com/search?term={encoded_term}&entity={entity}&limit=1"
-            
-            with httpx.Client() as client:
-                resp = client.get(url, timeout=3.0) # Timeout curto para não travar o app
-                if resp.status_code == 200:
-                    data = resp.json()
-                    if data.get('resultCount', 0) > 0:
-                        return data['results'][0].get('primaryGenreName')
-        except:
+
+            client = HttpClients.get_async("itunes")
+            resp = await client.get(url, timeout=3.0)
+            if resp.status_code == 200:
+                data = resp.json()
+                if data.get('resultCount', 0) > 0:
+                    return data['results'][0].get('primaryGenreName')
+        except Exception:
             pass
-        return None
\ No newline at end of file
+        return None
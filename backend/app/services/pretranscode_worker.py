@@ -0,0 +1,193 @@
+import os
+import time
+import asyncio
+from collections import deque
+from datetime import datetime, timedelta
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import func, desc
+
+from app import models
+from app.database import SessionLocal
+from app.services.audio_manager import AudioManager
+from app.services.transcode_cache import TranscodeCache
+
+
+class PretranscodeWorker:
+    """
+    Pré-transcodificação em background para o cache de transcode.
+
+    Quando uma faixa chega em /downloads (download HTTP ou transferência do Soulseek) ela entra
+    na fila, assim como as faixas mais tocadas do ListenHistory. Um número fixo de workers gera
+    os tiers configurados com prioridade mínima de CPU e fora das vagas do pool interativo,
+    então o primeiro play já sai do disco sem competir com quem está ouvindo.
+    """
+
+    TIERS = [t.strip() for t in os.getenv("PRETRANSCODE_TIERS", "medium,opus_medium").split(",") if t.strip()]
+    WORKERS = int(os.getenv("PRETRANSCODE_WORKERS", "1"))
+    MAX_QUEUE = int(os.getenv("PRETRANSCODE_MAX_QUEUE", "500"))
+    NICENESS = 19
+
+    # Varredura periódica das faixas mais tocadas
+    POPULAR_INTERVAL_HOURS = float(os.getenv("PRETRANSCODE_POPULAR_INTERVAL_HOURS", "6"))
+    POPULAR_LIMIT = int(os.getenv("PRETRANSCODE_POPULAR_LIMIT", "50"))
+    POPULAR_WINDOW_DAYS = 30
+
+    _queue: Optional[asyncio.Queue] = None
+    _pending: Set[Tuple[str, str]] = set()  # (caminho, tier) na fila ou em execução
+    _tasks: List[asyncio.Task] = []
+    _active = 0
+
+    _completed = 0
+    _failed = 0
+    _skipped = 0
+    _dropped = 0
+    _bytes_written = 0
+    _busy_seconds = 0.0
+    _recent: deque = deque(maxlen=200)  # Instantes de conclusão (vazão recente)
+
+    @staticmethod
+    def _get_queue() -> asyncio.Queue:
+        if PretranscodeWorker._queue is None:
+            PretranscodeWorker._queue = asyncio.Queue(maxsize=PretranscodeWorker.MAX_QUEUE)
+        return PretranscodeWorker._queue
+
+    @staticmethod
+    def enqueue(file_path: str, tiers: Optional[List[str]] = None) -> int:
+        """
+        Agenda os tiers de um arquivo (precisa rodar no event loop). Tiers já em cache ou já
+        na fila são ignorados. Retorna quantos encodes foram agendados.
+        """
+        queue = PretranscodeWorker._get_queue()
+        added = 0
+        for tier in tiers or PretranscodeWorker.TIERS:
+            tier = AudioManager.normalize_tier(tier)
+            key = (file_path, tier)
+            if key in PretranscodeWorker._pending:
+                continue
+            if TranscodeCache.lookup(file_path, tier):
+                PretranscodeWorker._skipped += 1
+                continue
+            try:
+                queue.put_nowait(key)
+            except asyncio.QueueFull:
+                PretranscodeWorker._dropped += 1
+                print(f"⚠️ Fila de pré-transcode cheia, descartando {os.path.basename(file_path)} [{tier}]")
+                break
+            PretranscodeWorker._pending.add(key)
+            added += 1
+        return added
+
+    @staticmethod
+    async def _encode(file_path: str, tier: str):
+        # Confere de novo: o primeiro play pode ter preenchido o cache enquanto estava na fila
+        if not os.path.isfile(file_path) or TranscodeCache.lookup(file_path, tier):
+            PretranscodeWorker._skipped += 1
+            return
+
+        started = time.monotonic()
+        job = await AudioManager.transcode_stream(
+            file_path, tier, admission=False, niceness=PretranscodeWorker.NICENESS
+        )
+        written = 0
+        try:
+            async for chunk in TranscodeCache.tee_stream(job, file_path, tier):
+                written += len(chunk)
+        finally:
+            await job.close()
+
+        if job.process.returncode not in (0, None) or written == 0:
+            raise RuntimeError(f"ffmpeg terminou com código {job.process.returncode}")
+
+        PretranscodeWorker._completed += 1
+        PretranscodeWorker._bytes_written += written
+        PretranscodeWorker._busy_seconds += time.monotonic() - started
+        PretranscodeWorker._recent.append(time.time())
+
+    @staticmethod
+    async def _worker(number: int):
+        queue = PretranscodeWorker._get_queue()
+        while True:
+            file_path, tier = await queue.get()
+            PretranscodeWorker._active += 1
+            try:
+                await PretranscodeWorker._encode(file_path, tier)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                PretranscodeWorker._failed += 1
+                print(f"❌ Pré-transcode falhou ({os.path.basename(file_path)} [{tier}]): {e}")
+            finally:
+                PretranscodeWorker._active -= 1
+                PretranscodeWorker._pending.discard((file_path, tier))
+                queue.task_done()
+
+    @staticmethod
+    def _most_played_paths() -> List[str]:
+        db = SessionLocal()
+        try:
+            since = datetime.now() - timedelta(days=PretranscodeWorker.POPULAR_WINDOW_DAYS)
+            rows = db.query(models.Track.filename, func.count(models.ListenHistory.id).label('plays'))\
+                .join(models.ListenHistory)\
+                .filter(models.ListenHistory.played_at >= since)\
+                .group_by(models.Track.filename)\
+                .order_by(desc('plays'))\
+                .limit(PretranscodeWorker.POPULAR_LIMIT)\
+                .all()
+        finally:
+            db.close()
+
+        paths = []
+        for filename, _ in rows:
+            full_path = os.path.join(AudioManager.BASE_PATH, filename)
+            if os.path.isfile(full_path):
+                paths.append(full_path)
+        return paths
+
+    @staticmethod
+    async def _popular_scheduler():
+        while True:
+            try:
+                paths = await asyncio.to_thread(PretranscodeWorker._most_played_paths)
+                added = sum(PretranscodeWorker.enqueue(path) for path in paths)
+                if added:
+                    print(f"🔥 Pré-transcode: {added} encodes agendados das {len(paths)} faixas mais tocadas")
+            except Exception as e:
+                print(f"❌ Erro ao agendar faixas mais tocadas: {e}")
+            await asyncio.sleep(PretranscodeWorker.POPULAR_INTERVAL_HOURS * 60 * 60)
+
+    @staticmethod
+    def start():
+        if PretranscodeWorker._tasks:
+            return
+        PretranscodeWorker._tasks = [
+            asyncio.create_task(PretranscodeWorker._worker(i)) for i in range(PretranscodeWorker.WORKERS)
+        ]
+        PretranscodeWorker._tasks.append(asyncio.create_task(PretranscodeWorker._popular_scheduler()))
+        print(f"🚀 Pré-transcode iniciado ({PretranscodeWorker.WORKERS} workers, tiers: {', '.join(PretranscodeWorker.TIERS)})")
+
+    @staticmethod
+    def stop():
+        for task in PretranscodeWorker._tasks:
+            task.cancel()
+        PretranscodeWorker._tasks = []
+
+    @staticmethod
+    def stats() -> dict:
+        now = time.time()
+        last_hour = sum(1 for ts in PretranscodeWorker._recent if now - ts < 3600)
+        completed = PretranscodeWorker._completed
+        return {
+            "workers": PretranscodeWorker.WORKERS,
+            "tiers": PretranscodeWorker.TIERS,
+            "queue_depth": PretranscodeWorker._get_queue().qsize(),
+            "max_queue": PretranscodeWorker.MAX_QUEUE,
+            "active": PretranscodeWorker._active,
+            "completed_total": completed,
+            "failed_total": PretranscodeWorker._failed,
+            "skipped_total": PretranscodeWorker._skipped,
+            "dropped_total": PretranscodeWorker._dropped,
+            "bytes_written_total": PretranscodeWorker._bytes_written,
+            "completed_last_hour": last_hour,
+            "avg_encode_seconds": round(PretranscodeWorker._busy_seconds / completed, 2) if completed else None,
+        }
@@ -0,0 +1,349 @@
+import os
+import copy
+import json
+import time
+import asyncio
+import hashlib
+import inspect
+import functools
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from fastapi.concurrency import run_in_threadpool
+
+from app import models
+from app.database import SessionLocal
+from app.services.single_flight import SingleFlight
+from app.services.request_deadline import RequestDeadline
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+# (valor, fresco_até, stale_até, negativo) — tempos em epoch
+Entry = Tuple[object, float, float, bool]
+
+# Lista marcada quando a chamada em andamento falhou (erro de rede, 429, 5xx...):
+# o provider devolve [] / None como sempre, mas o resultado não vai para o cache
+_failure: ContextVar[Optional[list]] = ContextVar("provider_cache_failure", default=None)
+
+
+def _is_empty(value) -> bool:
+    return not value
+
+
+class ProviderCache:
+    """
+    Cache das respostas dos provedores externos, em duas camadas.
+
+    L1 é um LRU em memória (por worker); L2 é a tabela provider_cache, compartilhada entre
+    workers e reinícios. Cada endpoint tem seu TTL; resultados vazios ficam pouco tempo
+    (cache negativo) e falhas não ficam. Depois do TTL a resposta ainda é servida durante a
+    janela de stale enquanto uma única atualização roda em segundo plano. Misses idênticos
+    simultâneos (mesmo com o cache desligado) viram uma chamada só (SingleFlight).
+    Quem chama recebe sempre uma cópia (as rotas alteram os dicts que recebem).
+    """
+
+    ENABLED = os.getenv("PROVIDER_CACHE_ENABLED", "1") != "0"
+    L1_SIZE = int(os.getenv("PROVIDER_CACHE_L1_SIZE", "2048"))
+    NEGATIVE_TTL = int(os.getenv("PROVIDER_CACHE_NEGATIVE_TTL", str(5 * MINUTE)))
+    PURGE_EVERY = 500  # Gravações no L2 entre limpezas das linhas vencidas
+
+    _l1: "OrderedDict[str, Entry]" = OrderedDict()
+    _lock = threading.Lock()
+    _refreshing: set = set()
+    _tasks: set = set()  # Referências das atualizações async (o loop só guarda referência fraca)
+    _stats: Dict[str, Dict[str, int]] = {}
+    _writes = 0
+
+    @staticmethod
+    def mark_failed():
+        """Chamado pela camada HTTP (ou pelo provider) quando a resposta atual não deve ir para o cache."""
+        flag = _failure.get()
+        if flag is not None:
+            flag.append(True)
+
+    @staticmethod
+    def _count(namespace: str, field: str):
+        with ProviderCache._lock:
+            counters = ProviderCache._stats.setdefault(namespace, {})
+            counters[field] = counters.get(field, 0) + 1
+
+    @staticmethod
+    def _begin():
+        parent = _failure.get()
+        flag: list = []
+        return parent, flag, _failure.set(flag)
+
+    @staticmethod
+    def _end(parent, flag, token) -> bool:
+        _failure.reset(token)
+        # Falha numa chamada interna (ex.: similares dentro de detalhes do artista) contamina a externa
+        if flag and parent is not None:
+            parent.append(True)
+        return bool(flag)
+
+    # --- Camadas ---
+
+    @staticmethod
+    def _l1_get(key: str) -> Optional[Entry]:
+        with ProviderCache._lock:
+            entry = ProviderCache._l1.get(key)
+            if entry is not None:
+                ProviderCache._l1.move_to_end(key)
+            return entry
+
+    @staticmethod
+    def _l1_put(key: str, entry: Entry):
+        with ProviderCache._lock:
+            ProviderCache._l1[key] = entry
+            ProviderCache._l1.move_to_end(key)
+            while len(ProviderCache._l1) > ProviderCache.L1_SIZE:
+                ProviderCache._l1.popitem(last=False)
+
+    @staticmethod
+    def _l2_get(key: str) -> Optional[Entry]:
+        db = SessionLocal()
+        try:
+            row = db.query(models.ProviderCacheEntry).filter(models.ProviderCacheEntry.key == key).first()
+            if row is None or row.stale_until < time.time():
+                return None
+            entry = (row.value, row.fresh_until, row.stale_until, bool(row.negative))
+            ProviderCache._l1_put(key, entry)
+            return entry
+        except Exception as e:
+            print(f"⚠️ Erro ao ler cache de provedor: {e}")
+            return None
+        finally:
+            db.close()
+
+    @staticmethod
+    def _l2_put(key: str, namespace: str, entry: Entry):
+        value, fresh_until, stale_until, negative = entry
+        fields = {
+            "namespace": namespace, "value": value, "negative": negative,
+            "fresh_until": fresh_until, "stale_until": stale_until,
+        }
+        db = SessionLocal()
+        try:
+            row = db.query(models.ProviderCacheEntry).filter(models.ProviderCacheEntry.key == key).first()
+            if row:
+                for field, field_value in fields.items():
+                    setattr(row, field, field_value)
+            else:
+                db.add(models.ProviderCacheEntry(key=key, **fields))
+            db.commit()
+
+            ProviderCache._writes += 1
+            if ProviderCache._writes % ProviderCache.PURGE_EVERY == 0:
+                db.query(models.ProviderCacheEntry)\
+                    .filter(models.ProviderCacheEntry.stale_until < time.time())\
+                    .delete(synchronize_session=False)
+                db.commit()
+        except IntegrityError:
+            # Outro worker gravou a mesma chave ao mesmo tempo
+            db.rollback()
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ Erro ao salvar cache de provedor ({namespace}): {e}")
+        finally:
+            db.close()
+
+    @staticmethod
+    def _entry(value, ttl: int, stale_ttl: int, negative_ttl: int, negative: bool) -> Optional[Entry]:
+        try:
+            # Cópia desacoplada de quem chamou; também garante que o valor cabe no JSON do L2
+            value = json.loads(json.dumps(value))
+        except (TypeError, ValueError):
+            return None
+        now = time.time()
+        if negative:
+            return value, now + negative_ttl, now + negative_ttl, True
+        return value, now + ttl, now + ttl + stale_ttl, False
+
+    @staticmethod
+    def _store(key: str, namespace: str, entry: Entry):
+        ProviderCache._l1_put(key, entry)
+        ProviderCache._l2_put(key, namespace, entry)
+
+    @staticmethod
+    def _serve(namespace: str, entry: Entry, source: str) -> Tuple[object, bool]:
+        """(cópia do valor, se precisa atualizar) de uma entrada ainda utilizável."""
+        value, fresh_until, _, negative = entry
+        if time.time() < fresh_until:
+            ProviderCache._count(namespace, "negative_hits" if negative else f"{source}_hits")
+            return copy.deepcopy(value), False
+        ProviderCache._count(namespace, "stale_hits")
+        return copy.deepcopy(value), True
+
+    @staticmethod
+    def _claim_refresh(key: str) -> bool:
+        with ProviderCache._lock:
+            if key in ProviderCache._refreshing:
+                return False
+            ProviderCache._refreshing.add(key)
+            return True
+
+    @staticmethod
+    def _release_refresh(key: str):
+        with ProviderCache._lock:
+            ProviderCache._refreshing.discard(key)
+
+    @staticmethod
+    def _unwrap(result):
+        """(valor, falhou) da chamada, própria ou de outra request: a falha vale para quem recebe o valor."""
+        value, failed = result
+        if failed:
+            ProviderCache.mark_failed()
+        return value
+
+    # --- Decorator ---
+
+    @staticmethod
+    def cached(namespace: str, ttl: int, stale_ttl: Optional[int] = None, negative_ttl: Optional[int] = None,
+               is_negative: Callable[[object], bool] = _is_empty):
+        """
+        Cacheia um método de provider (sync ou async) pelos seus argumentos.
+        Versões sync/async do mesmo método podem dividir o namespace (mesma assinatura, mesma saída).
+        """
+        stale_ttl = ttl if stale_ttl is None else stale_ttl
+
+        def decorator(func):
+            signature = inspect.signature(func)
+
+            def make_key(args, kwargs) -> Optional[str]:
+                try:
+                    bound = signature.bind(*args, **kwargs)
+                    bound.apply_defaults()
+                    payload = json.dumps(bound.arguments, sort_keys=True, default=str)
+                except TypeError:
+                    return None
+                return f"{namespace}:{hashlib.sha256(payload.encode()).hexdigest()[:40]}"
+
+            def shareable(result) -> bool:
+                # Falha porque o prazo da request líder acabou não é falha do provedor: quem
+                # esperava (com prazo próprio, ou sem prazo) faz a própria chamada
+                _, failed = result
+                return not (failed and RequestDeadline.expired())
+
+            def entry_for(value) -> Optional[Entry]:
+                negative_for = ProviderCache.NEGATIVE_TTL if negative_ttl is None else negative_ttl
+                return ProviderCache._entry(value, ttl, stale_ttl, negative_for, is_negative(value))
+
+            if inspect.iscoroutinefunction(func):
+                async def call(key, args, kwargs):
+                    parent, flag, token = ProviderCache._begin()
+                    try:
+                        value = await func(*args, **kwargs)
+                    finally:
+                        failed = ProviderCache._end(parent, flag, token)
+                    if failed:
+                        ProviderCache._count(namespace, "failures")
+                        return value, True
+                    entry = entry_for(value)
+                    if entry is not None and ProviderCache.ENABLED:
+                        await run_in_threadpool(ProviderCache._store, key, namespace, entry)
+                    return value, False
+
+                async def refresh(key, args, kwargs):
+                    RequestDeadline.clear()  # A task herda o prazo da request que a disparou
+                    try:
+                        ProviderCache._count(namespace, "refreshes")
+                        await SingleFlight.do_async(key, call, key, args, kwargs, shareable=shareable)
+                    except Exception as e:
+                        print(f"⚠️ Erro ao atualizar cache {namespace}: {e}")
+                    finally:
+                        ProviderCache._release_refresh(key)
+
+                @functools.wraps(func)
+                async def wrapper(*args, **kwargs):
+                    key = make_key(args, kwargs)
+                    if key is None:
+                        return await func(*args, **kwargs)
+
+                    entry, source = None, None
+                    if ProviderCache.ENABLED:
+                        entry, source = ProviderCache._l1_get(key), "l1"
+                        if entry is None:
+                            entry, source = await run_in_threadpool(ProviderCache._l2_get, key), "l2"
+                    if entry is not None and time.time() < entry[2]:
+                        value, stale = ProviderCache._serve(namespace, entry, source)
+                        if stale and ProviderCache._claim_refresh(key):
+                            task = asyncio.get_running_loop().create_task(refresh(key, args, kwargs))
+                            ProviderCache._tasks.add(task)
+                            task.add_done_callback(ProviderCache._tasks.discard)
+                        return value
+
+                    ProviderCache._count(namespace, "misses")
+                    return ProviderCache._unwrap(await SingleFlight.do_async(key, call, key, args, kwargs, shareable=shareable))
+            else:
+                def call(key, args, kwargs):
+                    parent, flag, token = ProviderCache._begin()
+                    try:
+                        value = func(*args, **kwargs)
+                    finally:
+                        failed = ProviderCache._end(parent, flag, token)
+                    if failed:
+                        ProviderCache._count(namespace, "failures")
+                        return value, True
+                    entry = entry_for(value)
+                    if entry is not None and ProviderCache.ENABLED:
+                        ProviderCache._store(key, namespace, entry)
+                    return value, False
+
+                def refresh(key, args, kwargs):
+                    try:
+                        ProviderCache._count(namespace, "refreshes")
+                        SingleFlight.do(key, call, key, args, kwargs, shareable=shareable)
+                    except Exception as e:
+                        print(f"⚠️ Erro ao atualizar cache {namespace}: {e}")
+                    finally:
+                        ProviderCache._release_refresh(key)
+
+                @functools.wraps(func)
+                def wrapper(*args, **kwargs):
+                    key = make_key(args, kwargs)
+                    if key is None:
+                        return func(*args, **kwargs)
+
+                    entry, source = None, None
+                    if ProviderCache.ENABLED:
+                        entry, source = ProviderCache._l1_get(key), "l1"
+                        if entry is None:
+                            entry, source = ProviderCache._l2_get(key), "l2"
+                    if entry is not None and time.time() < entry[2]:
+                        value, stale = ProviderCache._serve(namespace, entry, source)
+                        if stale and ProviderCache._claim_refresh(key):
+                            threading.Thread(
+                                target=refresh, args=(key, args, kwargs), daemon=True, name=f"cache-refresh-{namespace}"
+                            ).start()
+                        return value
+
+                    ProviderCache._count(namespace, "misses")
+                    return ProviderCache._unwrap(SingleFlight.do(key, call, key, args, kwargs, shareable=shareable))
+
+            return wrapper
+
+        return decorator
+
+    @staticmethod
+    def stats() -> dict:
+        with ProviderCache._lock:
+            namespaces = {name: dict(counters) for name, counters in ProviderCache._stats.items()}
+            l1_entries = len(ProviderCache._l1)
+            refreshing = len(ProviderCache._refreshing)
+        for counters in namespaces.values():
+            served = sum(counters.get(f, 0) for f in ("l1_hits", "l2_hits", "negative_hits", "stale_hits"))
+            total = served + counters.get("misses", 0)
+            counters["hit_rate"] = round(served / total, 3) if total else 0.0
+        return {
+            "enabled": ProviderCache.ENABLED,
+            "l1_entries": l1_entries,
+            "l1_max_entries": ProviderCache.L1_SIZE,
+            "refreshing": refreshing,
+            "namespaces": namespaces,
+            "single_flight": SingleFlight.stats(),
+        }
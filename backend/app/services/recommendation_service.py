@@ -1,12 +1,15 @@
+import asyncio
 from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import desc
 from rapidfuzz import fuzz
 from unidecode import unidecode
 import random
+from typing import Optional
 
 from app.services.release_date_provider import ReleaseDateProvider
 from app.services.catalog_provider import CatalogProvider
 from app.services.tidal_provider import TidalProvider
+from app.services.request_deadline import RequestDeadline
 
 def normalize_text(text: str) -> str:
     """Helper local para normalização"""
@@ -39,68 +42,77 @@ class MusicRecommender:
 
         return news[:limit]
 
+    # Artistas processados ao mesmo tempo (cada um: uma busca no catálogo + tira-teima no iTunes)
+    ARTIST_CONCURRENCY = 5
+
     async def _process_artists_list(self, artists: list[str], is_fallback: bool = False) -> list[dict]:
         """
         Processa uma lista de artistas buscando álbuns e usando ReleaseDateProvider para precisão.
+        Os artistas são consultados ao mesmo tempo, dentro do prazo da request; o resultado
+        segue a ordem da lista.
         """
-        results_list = []
+        semaphore = asyncio.Semaphore(MusicRecommender.ARTIST_CONCURRENCY)
+
+        async def one(artist: str):
+            async with semaphore:
+                if RequestDeadline.expired():
+                    return None
+                try:
+                    return await self._latest_release(artist, is_fallback)
+                except Exception as e:
+                    print(f"⚠️ Erro processando {artist}: {e}")
+                    return None
+
+        results = await asyncio.gather(*(one(artist) for artist in artists))
+        return [item for item in results if item]
+
+    async def _latest_release(self, artist: str, is_fallback: bool) -> Optional[dict]:
+        # 1. Busca no CatalogProvider (YTMusic)
+        results = await run_in_threadpool(CatalogProvider.search_catalog, artist, "album", 10)
+        if not results: return None
+
+        # 2. Filtra por nome (STRICT MATCH)
+        # Mudança Crítica: Usamos token_sort_ratio > 90 para evitar falsos positivos
+        # Isso impede que "Laufey" dê match com "The Moon" ou bandas aleatórias
+        artist_clean = normalize_text(artist)
+        artist_albums = []
+        
+        for r in results:
+            r_artist_clean = normalize_text(r['artistName'])
+            # Verifica match muito forte ou contêm o nome exato
+            if fuzz.token_sort_ratio(artist_clean, r_artist_clean) > 90 or artist_clean == r_artist_clean:
+                artist_albums.append(r)
+        
+        if not artist_albums: return None
+
+        # 3. Encontra o ano mais recente
+        artist_albums.sort(key=lambda x: str(x.get('year') or "0000"), reverse=True)
+        latest_year = artist_albums[0].get('year')
         
-        for artist in artists:
-            try:
-                # 1. Busca no CatalogProvider (YTMusic)
-                results = await run_in_threadpool(CatalogProvider.search_catalog, artist, "album", 10)
-                if not results: continue
-
-                # 2. Filtra por nome (STRICT MATCH)
-                # Mudança Crítica: Usamos token_sort_ratio > 90 para evitar falsos positivos
-                # Isso impede que "Laufey" dê match com "The Moon" ou bandas aleatórias
-                artist_clean = normalize_text(artist)
-                artist_albums = []
-                
-                for r in results:
-                    r_artist_clean = normalize_text(r['artistName'])
-                    # Verifica match muito forte ou contêm o nome exato
-                    if fuzz.token_sort_ratio(artist_clean, r_artist_clean) > 90 or artist_clean == r_artist_clean:
-                        artist_albums.append(r)
-                
-                if not artist_albums: continue
-
-                # 3. Encontra o ano mais recente
-                artist_albums.sort(key=lambda x: str(x.get('year') or "0000"), reverse=True)
-                latest_year = artist_albums[0].get('year')
-                
-                if not latest_year: continue
-
-                # Filtra candidatos desse ano
-                candidates = [a for a in artist_albums if a.get('year') == latest_year]
-                winner = candidates[0]
-
-                # 4. TIRA-TEIMA (USO DO RELEASE DATE PROVIDER)
-                # Se houver empate no ano (ex: 3 singles em 2025), busca data exata no iTunes
-                if len(candidates) > 1:
-                    print(f"   ⚔️ Empate em {latest_year} para {artist}. Buscando datas exatas...")
-                    for cand in candidates:
-                        exact_date = await run_in_threadpool(
-                            ReleaseDateProvider.get_exact_date, 
-                            artist, 
-                            cand['collectionName']
-                        )
-                        cand['releaseDate'] = exact_date or f"{latest_year}-01-01"
-                        print(f"      -> {cand['collectionName']}: {cand['releaseDate']}")
-
-                    # Ordena pela data completa
-                    candidates.sort(key=lambda x: x['releaseDate'], reverse=True)
-                    winner = candidates[0]
-                
-                # 5. Formata o vencedor
-                item = self._format_item(winner, is_fallback=is_fallback)
-                results_list.append(item)
-
-            except Exception as e:
-                print(f"⚠️ Erro processando {artist}: {e}")
-                continue
+        if not latest_year: return None
+
+        # Filtra candidatos desse ano
+        candidates = [a for a in artist_albums if a.get('year') == latest_year]
+        winner = candidates[0]
+
+        # 4. TIRA-TEIMA (USO DO RELEASE DATE PROVIDER)
+        # Se houver empate no ano (ex: 3 singles em 2025), busca data exata no iTunes
+        if len(candidates) > 1:
+            print(f"   ⚔️ Empate em {latest_year} para {artist}. Buscando datas exatas...")
+            exact_dates = await asyncio.gather(*(
+                run_in_threadpool(ReleaseDateProvider.get_exact_date, artist, cand['collectionName'])
+                for cand in candidates
+            ))
+            for cand, exact_date in zip(candidates, exact_dates):
+                cand['releaseDate'] = exact_date or f"{latest_year}-01-01"
+                print(f"      -> {cand['collectionName']}: {cand['releaseDate']}")
+
+            # Ordena pela data completa
+            candidates.sort(key=lambda x: x['releaseDate'], reverse=True)
+            winner = candidates[0]
         
-        return results_list
+        # 5. Formata o vencedor
+        return self._format_item(winner, is_fallback=is_fallback)
 
     def _format_item(self, winner: dict, is_global: bool = False, is_fallback: bool = False) -> dict:
         color = "#4A00E0" if is_global else f"#{hash(winner['artistName']) & 0xFFFFFF:06x}"
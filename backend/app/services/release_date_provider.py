@@ -1,6 +1,8 @@
-import httpx
 from urllib.parse import quote
 
+from app.services.http_clients import HttpClients
+from app.services.provider_cache import ProviderCache, DAY
+
 class ReleaseDateProvider:
     """
     Serviço especializado em encontrar a data exata de lançamento (YYYY-MM-DD)
@@ -9,6 +11,7 @@ class ReleaseDateProvider:
     """
     
     @staticmethod
+    @ProviderCache.cached("itunes.release_date", ttl=30 * DAY)
     def get_exact_date(artist: str, album_name: str) -> str:
         try:
             # Busca específica por álbum
@@ -21,13 +24,13 @@ class ReleaseDateProvider:
                 "limit": 1
             }
             
-            with httpx.Client() as client:
-                resp = client.get(url, params=params, timeout=5.0)
-                if resp.status_code == 200:
-                    data = resp.json()
-                    if data['resultCount'] > 0:
-                        # Retorna algo como "2025-08-22T07:00:00Z"
-                        return data['results'][0].get('releaseDate', '')
+            client = HttpClients.get_sync("itunes")
+            resp = client.get(url, params=params, timeout=5.0)
+            if resp.status_code == 200:
+                data = resp.json()
+                if data['resultCount'] > 0:
+                    # Retorna algo como "2025-08-22T07:00:00Z"
+                    return data['results'][0].get('releaseDate', '')
             
             return ""
         except Exception as e:
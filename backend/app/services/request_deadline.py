@@ -0,0 +1,50 @@
+import time
+import functools
+from contextvars import ContextVar
+from typing import Optional
+
+# Instante (time.monotonic) em que a request atual deixa de esperar provedores externos
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class RequestDeadline:
+    """
+    Orçamento de tempo de uma rota para chamadas a provedores externos.
+
+    O prazo vive num ContextVar: vale para tudo que a rota chama, inclusive tasks do
+    asyncio.gather e funções em run_in_threadpool (que copiam o contexto). Os clientes
+    HTTP compartilhados encurtam o timeout de cada chamada para o que sobra do prazo e
+    recusam chamadas depois dele; loops longos consultam expired() para parar cedo.
+    """
+
+    @staticmethod
+    def remaining() -> Optional[float]:
+        """Segundos restantes (pode ser negativo) ou None se a rota não tem prazo."""
+        deadline = _deadline.get()
+        return None if deadline is None else deadline - time.monotonic()
+
+    @staticmethod
+    def expired() -> bool:
+        remaining = RequestDeadline.remaining()
+        return remaining is not None and remaining <= 0
+
+    @staticmethod
+    def clear():
+        """Remove o prazo do contexto atual (ex.: atualização em background iniciada por uma request)."""
+        _deadline.set(None)
+
+    @staticmethod
+    def limit(seconds: float):
+        """Decorator de rota async: as chamadas externas feitas por ela terminam em até `seconds`."""
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                deadline = time.monotonic() + seconds
+                current = _deadline.get()
+                token = _deadline.set(deadline if current is None else min(current, deadline))
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    _deadline.reset(token)
+            return wrapper
+        return decorator
@@ -0,0 +1,128 @@
+import os
+import copy
+import asyncio
+import threading
+import concurrent.futures
+from typing import Callable, Dict, Optional, Tuple
+
+
+class _NoResult(Exception):
+    """
+    A líder não tem resultado para dividir: foi cancelada (cliente desconectou) ou o resultado
+    só vale para ela. Quem esperava faz a própria chamada.
+    """
+
+
+class SingleFlight:
+    """
+    Junta chamadas idênticas simultâneas numa só.
+
+    A primeira chamada com uma chave (provedor, método, argumentos) vira a líder e vai ao
+    upstream; as que chegam enquanto ela está em andamento esperam o mesmo resultado (ou a
+    mesma exceção). O resultado fica num concurrent.futures.Future, então rotas async e
+    código em threads (run_in_threadpool, workers) compartilham a mesma chamada.
+    Cada seguidor recebe uma cópia do resultado. `shareable(resultado)` falso faz a líder
+    ficar com o resultado só para ela.
+    """
+
+    # Seguidor em thread não espera para sempre: se a líder depende de uma thread do pool
+    # que está ocupada esperando, ele desiste e faz a própria chamada
+    WAIT_TIMEOUT = float(os.getenv("SINGLE_FLIGHT_WAIT_TIMEOUT", "30"))
+
+    _inflight: Dict[str, concurrent.futures.Future] = {}
+    _lock = threading.Lock()
+    _leaders = 0
+    _coalesced = 0
+
+    @staticmethod
+    def _claim(key: str) -> Tuple[concurrent.futures.Future, bool]:
+        with SingleFlight._lock:
+            future = SingleFlight._inflight.get(key)
+            if future is not None:
+                SingleFlight._coalesced += 1
+                return future, False
+            future = concurrent.futures.Future()
+            # Em execução: um seguidor cancelado não consegue cancelar o future compartilhado
+            future.set_running_or_notify_cancel()
+            SingleFlight._inflight[key] = future
+            SingleFlight._leaders += 1
+            return future, True
+
+    @staticmethod
+    def _release(key: str, future: concurrent.futures.Future):
+        with SingleFlight._lock:
+            if SingleFlight._inflight.get(key) is future:
+                del SingleFlight._inflight[key]
+
+    @staticmethod
+    def _publish(future: concurrent.futures.Future, value, shareable: Optional[Callable]):
+        if future.done():
+            return
+        if shareable is not None and not shareable(value):
+            SingleFlight._fail(future, _NoResult())
+            return
+        # Snapshot antes de devolver: quem chamou pode alterar o próprio valor enquanto os seguidores copiam
+        future.set_result(copy.deepcopy(value))
+
+    @staticmethod
+    def _fail(future: concurrent.futures.Future, error: BaseException):
+        if future.done():
+            return
+        future.set_exception(error)
+        future.exception()  # Marca como consumida se ninguém estava esperando
+
+    @staticmethod
+    def do(key: str, func: Callable, *args, shareable: Optional[Callable] = None, **kwargs):
+        """Executa func(*args, **kwargs) ou espera a execução idêntica em andamento."""
+        future, leader = SingleFlight._claim(key)
+        if not leader:
+            try:
+                return copy.deepcopy(future.result(timeout=SingleFlight.WAIT_TIMEOUT))
+            except (_NoResult, concurrent.futures.TimeoutError):
+                return func(*args, **kwargs)
+
+        try:
+            value = func(*args, **kwargs)
+            SingleFlight._publish(future, value, shareable)
+            return value
+        except BaseException as e:
+            SingleFlight._fail(future, e)
+            raise
+        finally:
+            # Nenhum seguidor fica esperando um future que nunca completa
+            SingleFlight._fail(future, _NoResult())
+            SingleFlight._release(key, future)
+
+    @staticmethod
+    async def do_async(key: str, func: Callable, *args, shareable: Optional[Callable] = None, **kwargs):
+        """Versão para corrotinas: func(*args, **kwargs) deve retornar um awaitable."""
+        future, leader = SingleFlight._claim(key)
+        if not leader:
+            try:
+                # shield: cancelar este seguidor não mexe no future dos outros
+                return copy.deepcopy(await asyncio.shield(asyncio.wrap_future(future)))
+            except _NoResult:
+                return await func(*args, **kwargs)
+
+        try:
+            value = await func(*args, **kwargs)
+            SingleFlight._publish(future, value, shareable)
+            return value
+        except asyncio.CancelledError:
+            SingleFlight._fail(future, _NoResult())
+            raise
+        except Exception as e:
+            SingleFlight._fail(future, e)
+            raise
+        finally:
+            SingleFlight._fail(future, _NoResult())
+            SingleFlight._release(key, future)
+
+    @staticmethod
+    def stats() -> dict:
+        with SingleFlight._lock:
+            return {
+                "in_flight": len(SingleFlight._inflight),
+                "leaders_total": SingleFlight._leaders,
+                "coalesced_total": SingleFlight._coalesced,
+            }
@@ -3,6 +3,7 @@ import httpx
 import uuid
 from urllib.parse import quote
 from fastapi import HTTPException
+from app.services.http_clients import HttpClients
 
 # Pega as configs das variáveis de ambiente
 SLSKD_URL = os.getenv("SLSKD_API_URL", "http://slskd:5030/api/v0").rstrip("/")
@@ -25,23 +26,23 @@ async def search_slskd(query: str):
 
     print(f"📡 Enviando busca para: {SLSKD_URL}/searches")
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(f"{SLSKD_URL}/searches", json=payload, headers=headers)
-            response.raise_for_status()
+    client = HttpClients.get_async("slskd")
+    try:
+        response = await client.post(f"{SLSKD_URL}/searches", json=payload, headers=headers)
+        response.raise_for_status()
             
-            return {
-                "status": "Search initiated", 
-                "search_id": search_id,
-                "query": query,
-                "message": "Busca iniciada com sucesso."
-            }
-        except httpx.HTTPStatusError as e:
-            print(f"❌ Erro Slskd ({e.response.status_code}): {e.response.text}")
-            raise HTTPException(status_code=e.response.status_code, detail=f"Erro no Soulseek: {e.response.text}")
-        except Exception as e:
-            print(f"❌ Erro de conexão: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+        return {
+            "status": "Search initiated", 
+            "search_id": search_id,
+            "query": query,
+            "message": "Busca iniciada com sucesso."
+        }
+    except httpx.HTTPStatusError as e:
+        print(f"❌ Erro Slskd ({e.response.status_code}): {e.response.text}")
+        raise HTTPException(status_code=e.response.status_code, detail=f"Erro no Soulseek: {e.response.text}")
+    except Exception as e:
+        print(f"❌ Erro de conexão: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
 async def get_search_results(search_id: str):
     if not API_KEY:
@@ -49,16 +50,16 @@ async def get_search_results(search_id: str):
 
     headers = {"X-API-KEY": API_KEY}
     
-    async with httpx.AsyncClient() as client:
-        try:
-            url = f"{SLSKD_URL}/searches/{search_id}/responses"
-            response = await client.get(url, headers=headers)
-            if response.status_code == 200:
-                return response.json()
-            return []
-        except Exception as e:
-            print(f"❌ Erro ao buscar resultados: {e}")
-            return []
+    client = HttpClients.get_async("slskd")
+    try:
+        url = f"{SLSKD_URL}/searches/{search_id}/responses"
+        response = await client.get(url, headers=headers)
+        if response.status_code == 200:
+            return response.json()
+        return []
+    except Exception as e:
+        print(f"❌ Erro ao buscar resultados: {e}")
+        return []
 
 async def download_slskd(username: str, filename: str, size: int = None):
     if not API_KEY:
@@ -79,25 +80,25 @@ async def download_slskd(username: str, filename: str, size: int = None):
 
     print(f"⬇️ Solicitando download em: {endpoint}")
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(endpoint, json=payload, headers=headers)
+    client = HttpClients.get_async("slskd")
+    try:
+        response = await client.post(endpoint, json=payload, headers=headers)
             
-            if response.status_code == 500:
-                 print(f"❌ Slskd 500: {response.text}")
-                 raise HTTPException(status_code=503, detail="O usuário não está disponível.")
+        if response.status_code == 500:
+             print(f"❌ Slskd 500: {response.text}")
+             raise HTTPException(status_code=503, detail="O usuário não está disponível.")
 
-            if response.status_code not in [200, 201, 204]:
-                 print(f"❌ Erro Slskd ({response.status_code}): {response.text}")
-                 raise HTTPException(status_code=response.status_code, detail=f"Slskd Error: {response.text}")
+        if response.status_code not in [200, 201, 204]:
+             print(f"❌ Erro Slskd ({response.status_code}): {response.text}")
+             raise HTTPException(status_code=response.status_code, detail=f"Slskd Error: {response.text}")
             
-            return {"status": "Download queued", "file": filename}
+        return {"status": "Download queued", "file": filename}
             
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(status_code=e.response.status_code, detail=str(e))
-        except Exception as e:
-            if isinstance(e, HTTPException): raise e
-            raise HTTPException(status_code=500, detail=str(e))
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=str(e))
+    except Exception as e:
+        if isinstance(e, HTTPException): raise e
+        raise HTTPException(status_code=500, detail=str(e))
 
 async def get_transfer_status(filename: str):
     if not API_KEY: return None
@@ -105,50 +106,50 @@ async def get_transfer_status(filename: str):
     headers = {"X-API-KEY": API_KEY}
     endpoint = f"{SLSKD_URL}/transfers/downloads"
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(endpoint, headers=headers)
-            if response.status_code == 200:
-                downloads = response.json()
+    client = HttpClients.get_async("slskd")
+    try:
+        response = await client.get(endpoint, headers=headers)
+        if response.status_code == 200:
+            downloads = response.json()
                 
-                target = filename.replace("\\", "/").lower()
-                target_simple = os.path.basename(target) 
+            target = filename.replace("\\", "/").lower()
+            target_simple = os.path.basename(target) 
                 
-                for item in downloads:
-                    remote_file = item.get('filename', '').replace("\\", "/").lower()
-                    remote_simple = os.path.basename(remote_file)
+            for item in downloads:
+                remote_file = item.get('filename', '').replace("\\", "/").lower()
+                remote_simple = os.path.basename(remote_file)
                     
-                    is_match = (target_simple == remote_simple) or (target in remote_file) or (remote_file in target)
+                is_match = (target_simple == remote_simple) or (target in remote_file) or (remote_file in target)
                     
-                    if is_match:
-                        total = item.get('size', 1)
-                        transferred = item.get('bytesTransferred', 0)
-                        percent = (transferred / total) * 100 if total > 0 else 0.0
+                if is_match:
+                    total = item.get('size', 1)
+                    transferred = item.get('bytesTransferred', 0)
+                    percent = (transferred / total) * 100 if total > 0 else 0.0
                         
-                        raw_state = item.get('state', 'Unknown')
-                        friendly_state = raw_state
-
-                        # --- TRADUÇÃO DE ESTADOS ---
-                        if 'Succeeded' in raw_state:
-                            friendly_state = 'Completed'
-                        # Captura Rejected, Cancelled, Errored, TimedOut
-                        elif any(x in raw_state for x in ['Rejected', 'Cancelled', 'Errored', 'TimedOut', 'Aborted']):
-                            friendly_state = 'Failed' # Estado unificado de erro
-                        elif 'InProgress' in raw_state:
-                            friendly_state = 'Downloading'
-                        elif any(s in raw_state for s in ['Queued', 'Requested', 'Initializing']):
-                            friendly_state = 'Queued'
-
-                        return {
-                            "state": friendly_state,
-                            "raw_state": raw_state,
-                            "bytes_transferred": transferred,
-                            "total_bytes": total,
-                            "speed": item.get('speed', 0),
-                            "percent": percent,
-                            "username": item.get('username')
-                        }
-            return None 
-        except Exception as e:
-            print(f"⚠️ Erro ao checar status global: {e}")
-            return None
\ No newline at end of file
+                    raw_state = item.get('state', 'Unknown')
+                    friendly_state = raw_state
+
+                    # --- TRADUÇÃO DE ESTADOS ---
+                    if 'Succeeded' in raw_state:
+                        friendly_state = 'Completed'
+                    # Captura Rejected, Cancelled, Errored, TimedOut
+                    elif any(x in raw_state for x in ['Rejected', 'Cancelled', 'Errored', 'TimedOut', 'Aborted']):
+                        friendly_state = 'Failed' # Estado unificado de erro
+                    elif 'InProgress' in raw_state:
+                        friendly_state = 'Downloading'
+                    elif any(s in raw_state for s in ['Queued', 'Requested', 'Initializing']):
+                        friendly_state = 'Queued'
+
+                    return {
+                        "state": friendly_state,
+                        "raw_state": raw_state,
+                        "bytes_transferred": transferred,
+                        "total_bytes": total,
+                        "speed": item.get('speed', 0),
+                        "percent": percent,
+                        "username": item.get('username')
+                    }
+        return None 
+    except Exception as e:
+        print(f"⚠️ Erro ao checar status global: {e}")
+        return None
\ No newline at end of file
@@ -0,0 +1,231 @@
+import os
+import time
+import threading
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from starlette.datastructures import Headers
+
+from app.services.bandwidth_estimator import BandwidthEstimator
+
+# Registro do stream em andamento: a rota anota (tier, origem, tempos do ffmpeg) e o middleware fecha
+_current_stream: ContextVar[Optional[dict]] = ContextVar("current_stream", default=None)
+
+
+class _Histogram:
+    """Histograma cumulativo no formato do Prometheus, com uma série por tier."""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series: Dict[str, dict] = {}
+
+    def observe(self, value: float, tier: str):
+        series = self._series.setdefault(tier, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series["buckets"][i] += 1
+        series["sum"] += value
+        series["count"] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for tier, series in sorted(self._series.items()):
+            for bound, count in zip(self.buckets, series["buckets"]):
+                lines.append(f'{self.name}_bucket{{tier="{tier}",le="{bound:g}"}} {count}')
+            lines.append(f'{self.name}_bucket{{tier="{tier}",le="+Inf"}} {series["count"]}')
+            lines.append(f'{self.name}_sum{{tier="{tier}"}} {series["sum"]:.6f}')
+            lines.append(f'{self.name}_count{{tier="{tier}"}} {series["count"]}')
+        return lines
+
+
+class StreamMetrics:
+    """
+    Instrumentação das respostas de mídia (/stream e segmentos HLS).
+
+    Mede por request: resolução do caminho, espera na fila e spawn do ffmpeg, time-to-first-byte,
+    bytes enviados, vazão efetiva e se o cliente desconectou antes do fim. Exporta histogramas e
+    contadores em texto do Prometheus e guarda as últimas N requests numa tabela em memória.
+    """
+
+    PATHS = {"/stream", "/stream/hls/segment.ts"}
+    RECENT_SIZE = int(os.getenv("STREAM_METRICS_RECENT", "200"))  # 0 desliga a tabela
+
+    _lock = threading.Lock()
+    _recent: deque = deque(maxlen=max(RECENT_SIZE, 1))
+    _requests: Dict[Tuple[str, str, int], int] = {}  # (tier, origem, status) -> total
+    _disconnects: Dict[str, int] = {}
+    _bytes: Dict[str, int] = {}
+
+    _histograms = {
+        "ttfb": _Histogram("orfeu_stream_ttfb_seconds", "Tempo até o primeiro byte do corpo.",
+                           (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)),
+        "resolve": _Histogram("orfeu_stream_path_resolve_seconds", "Tempo para resolver o filename no disco.",
+                              (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)),
+        "queue": _Histogram("orfeu_stream_ffmpeg_queue_seconds", "Espera por vaga no pool de ffmpeg.",
+                            (0.001, 0.01, 0.1, 0.5, 1, 2.5, 5, 10)),
+        "spawn": _Histogram("orfeu_stream_ffmpeg_spawn_seconds", "Tempo para iniciar o processo ffmpeg.",
+                            (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)),
+        "throughput": _Histogram("orfeu_stream_throughput_kbps", "Vazão efetiva do envio (do primeiro ao último byte).",
+                                 (64, 128, 256, 512, 1000, 2000, 5000, 10000, 50000)),
+        "bytes": _Histogram("orfeu_stream_response_bytes", "Bytes enviados por resposta.",
+                            (64e3, 256e3, 1e6, 4e6, 16e6, 64e6, 256e6)),
+    }
+
+    @staticmethod
+    def annotate(**fields):
+        """Acrescenta informações ao registro do stream atual (ignorado fora de uma request medida)."""
+        record = _current_stream.get()
+        if record is not None:
+            record.update(fields)
+
+    @staticmethod
+    def finish(record: dict):
+        ended = time.monotonic()
+        tier = record.get("tier") or "unknown"
+        status = record.get("status") or 0
+        first_byte = record.get("first_byte")
+        sent = record["bytes"]
+        # Resposta de sucesso que não chegou ao último chunk: o cliente foi embora no meio
+        disconnected = 200 <= status < 300 and not record["completed"]
+
+        ttfb = first_byte - record["started"] if first_byte else None
+        throughput = None
+        if first_byte and sent and ended - first_byte > 0.001:
+            throughput = sent * 8 / 1000 / (ended - first_byte)
+
+        with StreamMetrics._lock:
+            key = (tier, record.get("source") or "unknown", status)
+            StreamMetrics._requests[key] = StreamMetrics._requests.get(key, 0) + 1
+            StreamMetrics._bytes[tier] = StreamMetrics._bytes.get(tier, 0) + sent
+            if disconnected:
+                StreamMetrics._disconnects[tier] = StreamMetrics._disconnects.get(tier, 0) + 1
+
+            hist = StreamMetrics._histograms
+            if ttfb is not None:
+                hist["ttfb"].observe(ttfb, tier)
+            if record.get("resolve_seconds") is not None:
+                hist["resolve"].observe(record["resolve_seconds"], tier)
+            if record.get("queue_seconds") is not None:
+                hist["queue"].observe(record["queue_seconds"], tier)
+            if record.get("spawn_seconds") is not None:
+                hist["spawn"].observe(record["spawn_seconds"], tier)
+            if throughput is not None:
+                hist["throughput"].observe(throughput, tier)
+            if 200 <= status < 300:
+                hist["bytes"].observe(sent, tier)
+
+            if StreamMetrics.RECENT_SIZE > 0:
+                def ms(value):
+                    return round(value * 1000, 1) if value is not None else None
+
+                StreamMetrics._recent.append({
+                    "at": datetime.now().isoformat(timespec="seconds"),
+                    "path": record["path"],
+                    "filename": record.get("filename"),
+                    "client": record["client"],
+                    "tier": tier,
+                    "source": record.get("source"),
+                    "status": status,
+                    "resolve_ms": ms(record.get("resolve_seconds")),
+                    "queue_ms": ms(record.get("queue_seconds")),
+                    "spawn_ms": ms(record.get("spawn_seconds")),
+                    "ttfb_ms": ms(ttfb),
+                    "bytes": sent,
+                    "duration_s": round(ended - record["started"], 3),
+                    "throughput_kbps": round(throughput, 1) if throughput is not None else None,
+                    "disconnected": disconnected,
+                })
+
+    @staticmethod
+    def render_prometheus() -> str:
+        with StreamMetrics._lock:
+            lines = [
+                "# HELP orfeu_stream_requests_total Respostas de mídia por tier, origem e status.",
+                "# TYPE orfeu_stream_requests_total counter",
+            ]
+            for (tier, source, status), count in sorted(StreamMetrics._requests.items()):
+                lines.append(f'orfeu_stream_requests_total{{tier="{tier}",source="{source}",status="{status}"}} {count}')
+            lines += [
+                "# HELP orfeu_stream_disconnects_total Streams interrompidos pelo cliente antes do fim.",
+                "# TYPE orfeu_stream_disconnects_total counter",
+            ]
+            for tier, count in sorted(StreamMetrics._disconnects.items()):
+                lines.append(f'orfeu_stream_disconnects_total{{tier="{tier}"}} {count}')
+            lines += [
+                "# HELP orfeu_stream_sent_bytes_total Bytes de mídia enviados.",
+                "# TYPE orfeu_stream_sent_bytes_total counter",
+            ]
+            for tier, count in sorted(StreamMetrics._bytes.items()):
+                lines.append(f'orfeu_stream_sent_bytes_total{{tier="{tier}"}} {count}')
+            for histogram in StreamMetrics._histograms.values():
+                lines += histogram.render()
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def recent(limit: int = 100) -> List[dict]:
+        with StreamMetrics._lock:
+            rows = list(StreamMetrics._recent)
+        return rows[-limit:][::-1] if StreamMetrics.RECENT_SIZE > 0 else []
+
+
+class StreamMetricsMiddleware:
+    """
+    Middleware ASGI (puro, sem bufferizar o streaming) que mede as respostas de mídia.
+    Também alimenta o BandwidthEstimator com a vazão da janela inicial de cada resposta.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in StreamMetrics.PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        record = {
+            "path": scope["path"],
+            "filename": query.get("filename", [None])[0],
+            "client": BandwidthEstimator.client_key(Headers(scope=scope), scope.get("client")),
+            "started": time.monotonic(),
+            "first_byte": None,
+            "bytes": 0,
+            "status": None,
+            "completed": False,
+        }
+        window_recorded = False
+
+        async def instrumented_send(message):
+            nonlocal window_recorded
+            if message["type"] == "http.response.start":
+                record["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                if body and record["first_byte"] is None:
+                    record["first_byte"] = time.monotonic()
+                await send(message)
+                record["bytes"] += len(body)
+                more_body = message.get("more_body", False)
+                if not more_body:
+                    record["completed"] = True
+
+                # O send só retorna quando o socket aceitou os dados: a janela inicial mede a rede do ouvinte
+                if not window_recorded and record["first_byte"] is not None:
+                    elapsed = time.monotonic() - record["first_byte"]
+                    if elapsed >= BandwidthEstimator.MEASURE_SECONDS or not more_body:
+                        window_recorded = True
+                        BandwidthEstimator.record(record["client"], record["bytes"], elapsed)
+                return
+            await send(message)
+
+        token = _current_stream.set(record)
+        try:
+            await self.app(scope, receive, instrumented_send)
+        finally:
+            _current_stream.reset(token)
+            StreamMetrics.finish(record)
@@ -0,0 +1,78 @@
+import os
+from typing import List, Set, Tuple
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from app.services.audio_manager import AudioManager
+from app.services.cover_service import CoverService
+from app.services.pretranscode_worker import PretranscodeWorker
+
+
+class StreamPrefetcher:
+    """
+    Aquecimento das próximas faixas da fila do player.
+
+    Para cada faixa (na ordem em que vão tocar): resolve o caminho, pede ao kernel para
+    carregar o arquivo no page cache e lê o começo de fato, agenda o tier pedido no
+    pré-transcode (fora das vagas do pool interativo) e extrai a capa. Assim a troca
+    de faixa não espera o disco acordar nem o ffmpeg começar.
+    """
+
+    MAX_TRACKS = int(os.getenv("PREFETCH_MAX_TRACKS", "5"))
+    READ_AHEAD_BYTES = int(os.getenv("PREFETCH_READ_AHEAD_MB", "4")) * 1024 * 1024
+    READ_CHUNK = 1024 * 1024
+
+    _inflight: Set[Tuple[str, str]] = set()  # (filename, tier) sendo aquecidos
+
+    @staticmethod
+    def _read_ahead(path: str):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            if hasattr(os, "posix_fadvise"):
+                # Leitura antecipada do arquivo inteiro, em background no kernel
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            # O fadvise é só um conselho: o começo (headers, capa, primeiro buffer) é lido de fato
+            remaining = StreamPrefetcher.READ_AHEAD_BYTES
+            while remaining > 0:
+                chunk = os.read(fd, min(StreamPrefetcher.READ_CHUNK, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    async def _warm_one(filename: str, quality: str):
+        try:
+            path = await run_in_threadpool(AudioManager.find_local_file, filename)
+        except HTTPException:
+            return
+
+        await run_in_threadpool(StreamPrefetcher._read_ahead, path)
+
+        if quality != "lossless":
+            # Só pelo worker de baixa prioridade: um encode aqui ocuparia vaga do pool interativo
+            PretranscodeWorker.enqueue(path, [quality])
+
+        try:
+            await CoverService.get_cover_digest(path)
+        except Exception as e:
+            print(f"⚠️ Prefetch sem capa ({filename}): {e}")
+
+    @staticmethod
+    async def warm(filenames: List[str], quality: str):
+        """Aquece as faixas em ordem (a próxima a tocar primeiro). Roda como background task."""
+        if quality != "lossless":
+            quality = AudioManager.normalize_tier(quality)
+        for filename in filenames[:StreamPrefetcher.MAX_TRACKS]:
+            key = (filename, quality)
+            if key in StreamPrefetcher._inflight:
+                continue
+            StreamPrefetcher._inflight.add(key)
+            try:
+                await StreamPrefetcher._warm_one(filename, quality)
+            except Exception as e:
+                print(f"❌ Erro no prefetch de {filename}: {e}")
+            finally:
+                StreamPrefetcher._inflight.discard(key)
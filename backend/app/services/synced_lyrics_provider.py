@@ -25,6 +25,8 @@ import xml.etree.ElementTree as ET
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 
+from app.services.http_clients import HttpClients
+
 # Biblioteca syncedlyrics para múltiplas fontes
 try:
     import syncedlyrics
@@ -277,44 +279,44 @@ class SyncedLyricsProvider:
             return None
         
         try:
-            async with httpx.AsyncClient() as client:
-                headers = {
-                    "Authorization": f"Bearer {self.apple_token}",
-                    "Origin": "https://music.apple.com",
-                }
+            client = HttpClients.get_async("lyrics")
+            headers = {
+                "Authorization": f"Bearer {self.apple_token}",
+                "Origin": "https://music.apple.com",
+            }
                 
-                song_id = apple_music_id
+            song_id = apple_music_id
                 
-                # Se não tem ID, busca pelo nome ou ISRC
-                if not song_id:
-                    song_id = await self._search_apple_music_id(
-                        client, headers, track_name, artist_name, isrc
-                    )
+            # Se não tem ID, busca pelo nome ou ISRC
+            if not song_id:
+                song_id = await self._search_apple_music_id(
+                    client, headers, track_name, artist_name, isrc
+                )
                 
-                if not song_id:
-                    print(f"⚠️ Apple Music: Não encontrou ID para {track_name}")
-                    return None
+            if not song_id:
+                print(f"⚠️ Apple Music: Não encontrou ID para {track_name}")
+                return None
                 
-                # Busca as letras syllable-lyrics
-                lyrics_url = f"{self.APPLE_MUSIC_API}/v1/catalog/br/songs/{song_id}/syllable-lyrics"
+            # Busca as letras syllable-lyrics
+            lyrics_url = f"{self.APPLE_MUSIC_API}/v1/catalog/br/songs/{song_id}/syllable-lyrics"
                 
-                resp = await client.get(lyrics_url, headers=headers, timeout=10.0)
+            resp = await client.get(lyrics_url, headers=headers, timeout=10.0)
                 
-                if resp.status_code != 200:
-                    print(f"⚠️ Apple Music lyrics: {resp.status_code}")
-                    return None
+            if resp.status_code != 200:
+                print(f"⚠️ Apple Music lyrics: {resp.status_code}")
+                return None
                 
-                data = resp.json()
+            data = resp.json()
                 
-                # Extrai TTML
-                ttml = data.get("data", [{}])[0].get("attributes", {}).get("ttml")
+            # Extrai TTML
+            ttml = data.get("data", [{}])[0].get("attributes", {}).get("ttml")
                 
-                if not ttml:
-                    print("⚠️ Apple Music: TTML não encontrado")
-                    return None
+            if not ttml:
+                print("⚠️ Apple Music: TTML não encontrado")
+                return None
                 
-                # Parseia TTML
-                return self._parse_ttml(ttml)
+            # Parseia TTML
+            return self._parse_ttml(ttml)
                 
         except Exception as e:
             print(f"❌ Erro Apple Music lyrics: {e}")
@@ -488,63 +490,63 @@ class SyncedLyricsProvider:
         """Busca letras no LRCLIB (LRC com sincronização por linha)"""
         
         try:
-            async with httpx.AsyncClient() as client:
-                # 1. Busca exata
-                params = {
-                    "artist_name": artist_name,
-                    "track_name": track_name,
-                }
-                if album_name:
-                    params["album_name"] = album_name
-                if duration:
-                    params["duration"] = duration
+            client = HttpClients.get_async("lyrics")
+            # 1. Busca exata
+            params = {
+                "artist_name": artist_name,
+                "track_name": track_name,
+            }
+            if album_name:
+                params["album_name"] = album_name
+            if duration:
+                params["duration"] = duration
                 
-                resp = await client.get(
-                    f"{self.LRCLIB_API}/get",
-                    params=params,
-                    timeout=5.0
-                )
+            resp = await client.get(
+                f"{self.LRCLIB_API}/get",
+                params=params,
+                timeout=5.0
+            )
                 
-                data = None
+            data = None
                 
-                if resp.status_code == 200:
-                    data = resp.json()
-                elif resp.status_code == 404:
-                    # 2. Busca aproximada
-                    search_params = {"q": f"{artist_name} {track_name}"}
-                    search_resp = await client.get(
-                        f"{self.LRCLIB_API}/search",
-                        params=search_params,
-                        timeout=5.0
-                    )
-                    if search_resp.status_code == 200:
-                        results = search_resp.json()
-                        if results:
-                            data = results[0]
+            if resp.status_code == 200:
+                data = resp.json()
+            elif resp.status_code == 404:
+                # 2. Busca aproximada
+                search_params = {"q": f"{artist_name} {track_name}"}
+                search_resp = await client.get(
+                    f"{self.LRCLIB_API}/search",
+                    params=search_params,
+                    timeout=5.0
+                )
+                if search_resp.status_code == 200:
+                    results = search_resp.json()
+                    if results:
+                        data = results[0]
                 
-                if not data:
-                    return None
+            if not data:
+                return None
                 
-                # Prefere letras sincronizadas
-                synced_lrc = data.get("syncedLyrics")
-                plain_lyrics = data.get("plainLyrics", "")
+            # Prefere letras sincronizadas
+            synced_lrc = data.get("syncedLyrics")
+            plain_lyrics = data.get("plainLyrics", "")
                 
-                if synced_lrc:
-                    lines = self._parse_lrc(synced_lrc)
-                    return SyncedLyrics(
-                        source="lrclib",
-                        sync_type="line",
-                        lines=lines,
-                        plain_text=plain_lyrics or "\n".join(l.text for l in lines),
-                    )
-                elif plain_lyrics:
-                    # Sem sincronização, retorna texto plano
-                    return SyncedLyrics(
-                        source="lrclib",
-                        sync_type="none",
-                        lines=[],
-                        plain_text=plain_lyrics,
-                    )
+            if synced_lrc:
+                lines = self._parse_lrc(synced_lrc)
+                return SyncedLyrics(
+                    source="lrclib",
+                    sync_type="line",
+                    lines=lines,
+                    plain_text=plain_lyrics or "\n".join(l.text for l in lines),
+                )
+            elif plain_lyrics:
+                # Sem sincronização, retorna texto plano
+                return SyncedLyrics(
+                    source="lrclib",
+                    sync_type="none",
+                    lines=[],
+                    plain_text=plain_lyrics,
+                )
                 
         except Exception as e:
             print(f"❌ Erro LRCLIB: {e}")
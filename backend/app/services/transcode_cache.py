@@ -0,0 +1,223 @@
+import os
+import uuid
+import hashlib
+import threading
+from typing import AsyncIterator, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.services.audio_manager import AudioManager
+from app.services.ffmpeg_pool import FFmpegJob
+
+
+class TranscodeCache:
+    """
+    Cache em disco das versões transcodificadas (tiers MP3/AAC/Opus) e dos segmentos HLS.
+
+    A chave é derivada do conteúdo de origem (caminho + mtime + tamanho) e do tier,
+    então qualquer alteração no arquivo original invalida a entrada automaticamente.
+    O arquivo é gravado enquanto o primeiro ouvinte recebe o stream e, a partir daí,
+    servido direto do disco. O despejo é LRU (pelo mtime, renovado a cada hit)
+    quando o tamanho total ultrapassa o orçamento configurado.
+    """
+
+    CACHE_DIR = os.getenv("TRANSCODE_CACHE_DIR", "/cache/transcode")
+    MAX_BYTES = int(os.getenv("TRANSCODE_CACHE_MAX_MB", "5120")) * 1024 * 1024
+
+    # Ao despejar, libera até ficar abaixo desta fração do orçamento (evita despejo a cada gravação)
+    EVICT_TARGET_RATIO = 0.9
+
+    _lock = threading.Lock()
+    _total_bytes: Optional[int] = None  # Calculado por start() ou, se ainda não rodou, na primeira gravação
+
+    @staticmethod
+    def cache_key(file_path: str, quality: str) -> str:
+        st = os.stat(file_path)
+        tier = AudioManager.normalize_tier(quality)
+        raw = f"{os.path.abspath(file_path)}|{st.st_mtime_ns}|{st.st_size}|{tier}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    @staticmethod
+    def derived_path(file_path: str, kind: str, ext: str) -> str:
+        """Entrada derivada do arquivo de origem que não é um tier de áudio (ex.: capa extraída)."""
+        st = os.stat(file_path)
+        raw = f"{os.path.abspath(file_path)}|{st.st_mtime_ns}|{st.st_size}|{kind}"
+        return TranscodeCache._entry_path(hashlib.sha256(raw.encode()).hexdigest(), ext)
+
+    @staticmethod
+    def content_path(digest: str, kind: str, ext: str) -> str:
+        """Entrada endereçada pelo conteúdo (ex.: capa pelo hash dos bytes): arquivos com a mesma imagem compartilham."""
+        key = hashlib.sha256(f"{digest}|{kind}".encode()).hexdigest()
+        return TranscodeCache._entry_path(key, ext)
+
+    @staticmethod
+    def _entry_path(key: str, ext: str) -> str:
+        # Shard por prefixo para não ter milhares de arquivos num único diretório
+        return os.path.join(TranscodeCache.CACHE_DIR, key[:2], f"{key}.{ext}")
+
+    @staticmethod
+    def segment_path(file_path: str, quality: str, index: int, segment_seconds: float) -> str:
+        """Caminho do segmento HLS no cache (mesma chave de conteúdo + índice e duração do segmento)."""
+        key = TranscodeCache.cache_key(file_path, quality)
+        # "hls-track": segmentos de um encode contínuo (não reaproveita os codificados um a um)
+        seg_key = hashlib.sha256(f"{key}|hls-track|{segment_seconds}|{index}".encode()).hexdigest()
+        return TranscodeCache._entry_path(seg_key, "ts")
+
+    @staticmethod
+    def store(final_path: str, data: bytes):
+        """Grava uma entrada completa de uma vez (ex.: segmento HLS) e contabiliza no orçamento."""
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        temp_path = f"{final_path}.{uuid.uuid4().hex[:8]}.part"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, final_path)
+        TranscodeCache._register(len(data))
+
+    @staticmethod
+    def touch(path: str) -> bool:
+        """Renova o LRU de uma entrada; retorna False se ela não existe."""
+        try:
+            os.utime(path, None)
+            return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def lookup(file_path: str, quality: str) -> Optional[str]:
+        """Retorna o caminho do arquivo em cache (e renova o LRU) ou None."""
+        try:
+            ext = AudioManager.tier_codec(quality)["ext"]
+            entry = TranscodeCache._entry_path(TranscodeCache.cache_key(file_path, quality), ext)
+            if os.path.isfile(entry):
+                os.utime(entry, None)
+                return entry
+        except OSError:
+            pass
+        return None
+
+    @staticmethod
+    async def tee_stream(job: FFmpegJob, file_path: str, quality: str) -> AsyncIterator[bytes]:
+        """
+        Repassa os chunks do encoder ao cliente enquanto grava no cache.
+        Só promove o arquivo se o ffmpeg terminou com código 0; streams interrompidos
+        e encodes que falharam (fonte corrompida, processo morto) são descartados.
+        """
+        chunks = job.iter_chunks()
+        try:
+            key = TranscodeCache.cache_key(file_path, quality)
+            final_path = TranscodeCache._entry_path(key, AudioManager.tier_codec(quality)["ext"])
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            temp_path = f"{final_path}.{uuid.uuid4().hex[:8]}.part"
+            # Escrita síncrona de propósito: chunks pequenos em disco local, e o fechamento
+            # precisa funcionar mesmo com o escopo cancelado (cliente desconectou)
+            out = open(temp_path, "wb")
+        except OSError as e:
+            print(f"⚠️ Cache de transcode indisponível: {e}")
+            async for chunk in chunks:
+                yield chunk
+            return
+
+        completed = False
+        written = 0
+        try:
+            async for chunk in chunks:
+                if out is not None:
+                    try:
+                        out.write(chunk)
+                        written += len(chunk)
+                    except OSError as e:
+                        print(f"⚠️ Falha ao gravar cache de transcode: {e}")
+                        out.close()
+                        out = None
+                yield chunk
+            # EOF no stdout não basta: um encode truncado também termina o pipe
+            await job.process.wait()
+            completed = job.process.returncode == 0
+            if not completed:
+                print(f"⚠️ Encode terminou com código {job.process.returncode}, não vai para o cache: {os.path.basename(file_path)} [{quality}]")
+        finally:
+            if out is not None:
+                out.close()
+            if completed and out is not None and written > 0:
+                os.replace(temp_path, final_path)
+                # A contabilidade pode varrer o diretório e despejar entradas: fora do event loop
+                await run_in_threadpool(TranscodeCache._register, written)
+                print(f"💾 Transcode em cache: {os.path.basename(file_path)} [{quality}] ({written // 1024} KB)")
+            elif os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @staticmethod
+    def start():
+        """Calcula o tamanho em uso numa thread na inicialização (a varredura não cai numa request)."""
+        threading.Thread(target=TranscodeCache._ensure_total, daemon=True, name="transcode-cache-scan").start()
+
+    @staticmethod
+    def _ensure_total():
+        with TranscodeCache._lock:
+            if TranscodeCache._total_bytes is None:
+                TranscodeCache._total_bytes = TranscodeCache._scan_total()
+
+    @staticmethod
+    def _scan_total() -> int:
+        total = 0
+        for _, path, size in TranscodeCache._iter_entries():
+            total += size
+        return total
+
+    @staticmethod
+    def _iter_entries():
+        """Lista (mtime, caminho, tamanho) de todas as entradas finalizadas."""
+        if not os.path.isdir(TranscodeCache.CACHE_DIR):
+            return
+        for shard in os.scandir(TranscodeCache.CACHE_DIR):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".part") or not entry.is_file():
+                    continue
+                try:
+                    st = entry.stat()
+                    yield st.st_mtime, entry.path, st.st_size
+                except OSError:
+                    continue
+
+    @staticmethod
+    def _register(size: int):
+        """Soma uma entrada nova ao total e despeja se passou do orçamento. Bloqueante: chamar fora do event loop."""
+        with TranscodeCache._lock:
+            if TranscodeCache._total_bytes is None:
+                # Primeira gravação do processo: o arquivo recém-promovido já entra na varredura
+                TranscodeCache._total_bytes = TranscodeCache._scan_total()
+            else:
+                TranscodeCache._total_bytes += size
+
+            if TranscodeCache._total_bytes > TranscodeCache.MAX_BYTES:
+                TranscodeCache._evict_locked()
+
+    @staticmethod
+    def _evict_locked():
+        target = int(TranscodeCache.MAX_BYTES * TranscodeCache.EVICT_TARGET_RATIO)
+        entries = sorted(TranscodeCache._iter_entries())  # Mais antigo (menos usado) primeiro
+        total = sum(size for _, _, size in entries)
+        removed = 0
+        for _, path, size in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                continue
+        TranscodeCache._total_bytes = total
+        if removed:
+            print(f"🧹 Cache de transcode: {removed} entradas removidas (LRU), {total // (1024 * 1024)} MB em uso")
+
+    @staticmethod
+    def stats() -> dict:
+        """Não varre o disco: enquanto a contagem inicial não terminou, used_bytes é None."""
+        return {
+            "dir": TranscodeCache.CACHE_DIR,
+            "used_bytes": TranscodeCache._total_bytes,
+            "max_bytes": TranscodeCache.MAX_BYTES,
+        }
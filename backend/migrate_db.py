@@ -22,6 +22,8 @@ def run_migration():
             ("tracks", "tidal_id", "ALTER TABLE tracks ADD COLUMN tidal_id VARCHAR(100)"),
             ("tracks", "genre", "ALTER TABLE tracks ADD COLUMN genre VARCHAR(100)"),
             ("tracks", "album_id", "ALTER TABLE tracks ADD COLUMN album_id VARCHAR(100)"),
+            ("tracks", "file_size", "ALTER TABLE tracks ADD COLUMN file_size BIGINT"),
+            ("tracks", "file_mtime", "ALTER TABLE tracks ADD COLUMN file_mtime DOUBLE PRECISION"),
             ("users", "profile_image_url", "ALTER TABLE users ADD COLUMN profile_image_url TEXT"),
             ("playlists", "cover_url", "ALTER TABLE playlists ADD COLUMN cover_url TEXT"),
         ]
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Os testes rodam sem Docker: banco e cache em diretórios temporários
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'orfeu_tests.db')}")
+os.environ.setdefault("TRANSCODE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "orfeu_tests_transcode"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
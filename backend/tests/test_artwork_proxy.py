@@ -0,0 +1,45 @@
+import os
+import asyncio
+
+import pytest
+
+from app.services.artwork_proxy import ArtworkProxy
+from app.services.transcode_cache import TranscodeCache
+
+URL = "https://resources.tidal.com/images/abc/640x640.jpg"
+IMAGE = b"\xff\xd8\xff\xe0" + b"arte" * 16
+downloaded = []  # Downloads da arte remota
+
+
+@pytest.fixture
+def remote(tmp_path, monkeypatch):
+    monkeypatch.setattr(TranscodeCache, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(TranscodeCache, "_total_bytes", None)
+    downloaded.clear()
+
+    async def download(url):
+        downloaded.append(url)
+        return IMAGE
+
+    monkeypatch.setattr(ArtworkProxy, "_download", staticmethod(download))
+
+
+def test_original_is_downloaded_once(remote):
+    assert asyncio.run(ArtworkProxy.get(URL)) == (IMAGE, "image/jpeg")
+    assert asyncio.run(ArtworkProxy.get(URL)) == (IMAGE, "image/jpeg")
+    assert len(downloaded) == 1
+
+
+def test_evicted_between_check_and_read_is_downloaded_again(remote, monkeypatch):
+    asyncio.run(ArtworkProxy.get(URL))
+    touch = TranscodeCache.touch
+
+    def touch_then_evict(path):
+        found = touch(path)
+        if found:
+            os.remove(path)  # Despejo do LRU no meio
+        return found
+
+    monkeypatch.setattr(TranscodeCache, "touch", staticmethod(touch_then_evict))
+    assert asyncio.run(ArtworkProxy.get(URL)) == (IMAGE, "image/jpeg")
+    assert len(downloaded) == 2
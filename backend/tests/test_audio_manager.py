@@ -0,0 +1,37 @@
+import shutil
+import subprocess
+
+import mutagen
+import pytest
+
+from app.services.audio_manager import AudioManager
+
+pytestmark = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg não instalado")
+
+TAGS = {"title": "Título", "artist": "Artista", "album": "Álbum", "genre": "Rock", "date": "2020"}
+COVER = b"\xff\xd8\xff\xe0" + b"\x00" * 64
+
+
+def _make(path) -> str:
+    cmd = ["ffmpeg", "-v", "error", "-f", "lavfi", "-i", "sine=duration=1"]
+    for key, value in TAGS.items():
+        cmd += ["-metadata", f"{key}={value}"]
+    subprocess.run(cmd + ["-y", str(path)], check=True)
+    return str(path)
+
+
+@pytest.mark.parametrize("ext", ["mp3", "m4a", "flac", "ogg"])
+def test_single_open_tags_match_easy_mode(tmp_path, ext):
+    path = _make(tmp_path / f"faixa.{ext}")
+    info = AudioManager.read_file_info(path)
+    assert info["tags"] == AudioManager._tags_from(mutagen.File(path, easy=True)) == TAGS
+    assert info["has_cover"] is False
+
+
+@pytest.mark.parametrize("ext", ["mp3", "flac"])
+def test_has_cover_from_same_open(tmp_path, ext):
+    path = _make(tmp_path / f"faixa.{ext}")
+    AudioManager.embed_metadata(path, {"title": "T", "artist": "A", "album": "B"}, COVER)
+    info = AudioManager.read_file_info(path)
+    assert info["has_cover"] is True
+    assert AudioManager.read_embedded_picture(path)[0] == COVER
@@ -0,0 +1,99 @@
+import time
+
+import pytest
+
+from app.services.circuit_breaker import CircuitBreaker, CircuitBreakers
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker("teste", slow_seconds=2.0, open_seconds=30.0)
+
+
+def _fail(breaker, times=1):
+    for _ in range(times):
+        breaker.record(False, 0.1, "HTTP 503")
+
+
+def test_opens_after_consecutive_failures(breaker):
+    _fail(breaker, CircuitBreaker.CONSECUTIVE_FAILURES - 1)
+    assert breaker.state == "closed"
+    _fail(breaker)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.stats()["rejected_total"] == 1
+
+
+def test_opens_on_failure_rate(breaker):
+    for _ in range(3):
+        breaker.record(True, 0.1)
+        _fail(breaker)
+    # 3 falhas em 6, sem nunca 5 seguidas: taxa >= 50% abre
+    assert breaker.state == "open"
+
+
+def test_successes_keep_it_closed(breaker):
+    for _ in range(10):
+        breaker.record(True, 0.1)
+        _fail(breaker, 1)
+        breaker.record(True, 0.1)
+    assert breaker.state == "closed"
+
+
+def test_slow_calls_count_as_failures(breaker):
+    for _ in range(CircuitBreaker.CONSECUTIVE_FAILURES):
+        breaker.record(True, 2.5)
+    assert breaker.state == "open"
+    assert breaker.stats()["last_error"] == "lenta (2.5s)"
+
+
+def test_half_open_allows_a_single_probe(breaker, clock):
+    _fail(breaker, CircuitBreaker.CONSECUTIVE_FAILURES)
+    clock[0] += 29
+    assert not breaker.allow()
+    clock[0] += 1
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()  # Só uma chamada de teste por vez
+
+
+def test_successful_probe_closes(breaker, clock):
+    _fail(breaker, CircuitBreaker.CONSECUTIVE_FAILURES)
+    clock[0] += 30
+    assert breaker.allow()
+    breaker.record(True, 0.1)
+    assert breaker.state == "closed"
+    assert breaker.stats()["window_calls"] == 0
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens(breaker, clock):
+    _fail(breaker, CircuitBreaker.CONSECUTIVE_FAILURES)
+    clock[0] += 30
+    assert breaker.allow()
+    _fail(breaker)
+    assert breaker.state == "open"
+    assert breaker.stats()["opened_total"] == 2
+    assert breaker.stats()["retry_in_seconds"] == 30
+
+
+def test_released_probe_lets_another_try(breaker, clock):
+    _fail(breaker, CircuitBreaker.CONSECUTIVE_FAILURES)
+    clock[0] += 30
+    assert breaker.allow()
+    breaker.release()  # Abandonada pelo prazo da request: não conta
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+def test_registry_has_one_breaker_per_provider():
+    assert CircuitBreakers.get("tidal") is CircuitBreakers.get("tidal")
+    assert CircuitBreakers.get("downloads") is None
+    assert set(CircuitBreakers.stats()) == set(CircuitBreakers.SLOW_CALL_SECONDS)
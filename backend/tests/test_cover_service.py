@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+from app.services.cover_service import CoverService
+from app.services.metadata_cache import MetadataCache
+from app.services.transcode_cache import TranscodeCache
+
+COVER = b"\xff\xd8\xff\xe0" + b"capa" * 16
+extracted = []  # Leituras da capa no arquivo de áudio
+
+
+@pytest.fixture
+def audio_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(TranscodeCache, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(TranscodeCache, "_total_bytes", None)
+    monkeypatch.setattr(MetadataCache, "has_cover", staticmethod(lambda path: None))
+    extracted.clear()
+
+    def read_picture(path):
+        extracted.append(path)
+        return COVER, "image/jpeg"
+
+    monkeypatch.setattr("app.services.cover_service.AudioManager.read_embedded_picture", staticmethod(read_picture))
+    path = tmp_path / "faixa.flac"
+    path.write_bytes(b"audio")
+    return str(path)
+
+
+def test_cover_is_extracted_once(audio_file):
+    assert CoverService._get_cover_sync(audio_file, None, None)[:2] == (COVER, "image/jpeg")
+    assert CoverService._get_cover_sync(audio_file, None, None)[:2] == (COVER, "image/jpeg")
+    assert len(extracted) == 1
+
+
+def test_evicted_between_check_and_read_is_reextracted(audio_file, monkeypatch):
+    CoverService._get_cover_sync(audio_file, None, None)
+    load_ref = CoverService._load_ref
+
+    def load_then_evict(path):
+        ref = load_ref(path)
+        digest, mime = ref
+        os.remove(TranscodeCache.content_path(digest, "cover", "jpg"))  # Despejo do LRU no meio
+        return ref
+
+    monkeypatch.setattr(CoverService, "_load_ref", staticmethod(load_then_evict))
+    assert CoverService._get_cover_sync(audio_file, None, None)[:2] == (COVER, "image/jpeg")
+    assert len(extracted) == 2
+
+
+def test_evicted_ref_is_reextracted(audio_file, monkeypatch):
+    CoverService._get_cover_sync(audio_file, None, None)
+    ref_path = TranscodeCache.derived_path(audio_file, "cover-ref", "ref")
+    read = CoverService._read
+
+    def read_evicted_ref(path):
+        if path == ref_path:
+            raise FileNotFoundError(path)
+        return read(path)
+
+    monkeypatch.setattr(CoverService, "_read", staticmethod(read_evicted_ref))
+    assert CoverService._get_cover_sync(audio_file, None, None)[:2] == (COVER, "image/jpeg")
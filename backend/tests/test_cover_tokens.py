@@ -0,0 +1,67 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.cover_tokens import CoverTokens
+
+
+def _rejected(token: str) -> str:
+    with pytest.raises(HTTPException) as exc:
+        CoverTokens.verify(token)
+    assert exc.value.status_code == 404
+    return exc.value.detail
+
+
+def test_round_trip_track_id():
+    assert CoverTokens.verify(CoverTokens.sign("ignorado.flac", track_id=42)) == (42, None)
+
+
+def test_round_trip_filename():
+    filename = "Artista/Álbum/01 - Faixa.flac"
+    assert CoverTokens.verify(CoverTokens.sign(filename)) == (None, filename)
+
+
+def test_same_url_within_bucket():
+    assert CoverTokens.sign("a.flac", track_id=7) == CoverTokens.sign("a.flac", track_id=7)
+
+
+def test_expiry_is_rounded_up_to_bucket(monkeypatch):
+    now = 1_700_000_123
+    monkeypatch.setattr(time, "time", lambda: now)
+    expires = int(CoverTokens.sign("a.flac", track_id=1).split(".")[1], 16)
+    assert expires % CoverTokens.BUCKET_SECONDS == 0
+    assert now + CoverTokens.TTL_SECONDS <= expires < now + CoverTokens.TTL_SECONDS + CoverTokens.BUCKET_SECONDS
+
+
+def test_tampered_subject_is_rejected():
+    subject, expires, mac = CoverTokens.sign("a.flac", track_id=1).split(".")
+    assert _rejected(f"t2.{expires}.{mac}") == "Cover hash inválido."
+
+
+def test_extended_expiry_is_rejected():
+    subject, expires, mac = CoverTokens.sign("a.flac", track_id=1).split(".")
+    assert _rejected(f"{subject}.{int(expires, 16) + 86400:x}.{mac}") == "Cover hash inválido."
+
+
+def test_other_secret_is_rejected(monkeypatch):
+    token = CoverTokens.sign("a.flac", track_id=1)
+    monkeypatch.setattr(CoverTokens, "SECRET", b"outro-segredo")
+    assert _rejected(token) == "Cover hash inválido."
+
+
+def test_expired_token(monkeypatch):
+    token = CoverTokens.sign("a.flac", track_id=1)
+    later = time.time() + CoverTokens.TTL_SECONDS + CoverTokens.BUCKET_SECONDS + 1
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert _rejected(token) == "Cover hash expirado."
+
+
+@pytest.mark.parametrize("token", ["", "abc", "a.b", "t1.zz.mac", "a.b.c.d"])
+def test_malformed_tokens(token):
+    _rejected(token)
+
+
+def test_unknown_subject_kind_is_rejected():
+    payload = f"x1.{int(time.time()) + 60:x}"
+    assert _rejected(f"{payload}.{CoverTokens._mac(payload)}") == "Cover hash inválido."
@@ -0,0 +1,71 @@
+import pytest
+from starlette.requests import Request
+
+from app.services.file_streaming import RangeNotSatisfiable, parse_range_header, range_file_response, stream_file_from
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", [(0, 99)]),
+    ("bytes=500-", [(500, 999)]),
+    ("bytes=-100", [(900, 999)]),
+    ("bytes=-5000", [(0, 999)]),          # Sufixo maior que o arquivo: o arquivo inteiro
+    ("bytes=900-5000", [(900, 999)]),     # Fim além do arquivo é truncado
+    ("bytes=0-0, 10-19", [(0, 0), (10, 19)]),
+    ("bytes=0-9,2000-3000", [(0, 9)]),    # Intervalo fora do arquivo é ignorado
+    ("BYTES=1-2", [(1, 2)]),
+])
+def test_valid_ranges(header, expected):
+    assert parse_range_header(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", [
+    "items=0-10",
+    "bytes=",
+    "bytes=abc-def",
+    "bytes=10-5",
+    "bytes=5",
+    "bytes=0-9,",
+])
+def test_malformed_ranges_serve_whole_file(header):
+    assert parse_range_header(header, 1000) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=2000-3000", "bytes=-0"])
+def test_unsatisfiable_ranges(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range_header(header, 1000)
+
+
+def _request(headers: dict) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+@pytest.fixture
+def empty_file(tmp_path):
+    path = tmp_path / "vazio.mp3"
+    path.write_bytes(b"")
+    return str(path)
+
+
+@pytest.mark.parametrize("header", ["bytes=0-", "bytes=-100", "bytes=0-0"])
+def test_empty_file_range_is_416(empty_file, header):
+    response = range_file_response(_request({"Range": header}), empty_file, "audio/mpeg")
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */0"
+
+
+def test_empty_file_with_stale_if_range_is_empty_200(empty_file):
+    response = range_file_response(_request({"Range": "bytes=0-", "If-Range": '"outra"'}), empty_file, "audio/mpeg")
+    assert response.status_code == 200
+    assert response.body == b""
+
+
+def test_empty_file_seek_is_empty_200(empty_file):
+    response = stream_file_from(empty_file, 4096, "audio/mpeg")
+    assert response.status_code == 200
+    assert response.body == b""
+    assert response.headers["content-length"] == "0"
@@ -0,0 +1,58 @@
+import os
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.hls_service import HLSService
+from app.services.transcode_cache import TranscodeCache
+
+
+class FakeHLSJob:
+    """Faz o papel do ffmpeg: grava os segmentos e a lista segments.csv no diretório de saída."""
+
+    def __init__(self, out_dir: str, segments: int):
+        self.out_dir = out_dir
+        self.segments = segments
+        self.process = SimpleNamespace(returncode=None)
+
+    async def read_all(self) -> bytes:
+        with open(os.path.join(self.out_dir, "segments.csv"), "w") as csv:
+            for index in range(self.segments):
+                name = f"seg{index:05d}.ts"
+                with open(os.path.join(self.out_dir, name), "wb") as f:
+                    f.write(b"G" * 188)
+                csv.write(f"{name},{index * 6.0},{(index + 1) * 6.0}\n")
+        self.process.returncode = 0
+        return b""
+
+
+@pytest.fixture
+def track(tmp_path, monkeypatch):
+    monkeypatch.setattr(TranscodeCache, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(TranscodeCache, "_total_bytes", None)
+    monkeypatch.setattr(HLSService, "_produced", HLSService._produced.__class__())
+    # 13s pela duração do container: 3 segmentos na playlist, mas o encode só produz 2
+    monkeypatch.setattr("app.services.hls_service.MetadataCache.get_metadata", staticmethod(lambda path: {"duration": 13.0}))
+
+    async def encode_hls(file_path, quality, out_dir, segment_seconds):
+        return FakeHLSJob(out_dir, 2)
+
+    monkeypatch.setattr("app.services.hls_service.AudioManager.encode_hls", staticmethod(encode_hls))
+    path = tmp_path / "faixa.flac"
+    path.write_bytes(b"audio")
+    return str(path)
+
+
+def test_segment_missing_after_complete_encode_is_404(track):
+    async def main():
+        with pytest.raises(HTTPException) as exc:
+            await HLSService.get_segment(track, "medium", 2)
+        assert exc.value.status_code == 404
+        assert os.path.isfile(await HLSService.get_segment(track, "medium", 1))
+        return await HLSService.build_playlist(track, "faixa.flac", "medium")
+
+    playlist = asyncio.run(main())
+    assert "index=1" in playlist
+    assert "index=2" not in playlist  # A playlist passa a refletir o encode
@@ -0,0 +1,64 @@
+import os
+from email.utils import formatdate
+
+from starlette.requests import Request
+
+from app.services.http_cache import if_range_matches, is_not_modified, make_etag
+
+MTIME = 1_700_000_000.0
+ETAG = '"3e8-abc"'
+
+
+def _request(method: str = "GET", **headers) -> Request:
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": method, "headers": raw})
+
+
+def test_make_etag_changes_with_content_and_suffix(tmp_path):
+    path = tmp_path / "a.flac"
+    path.write_bytes(b"x" * 10)
+    st = os.stat(path)
+    assert make_etag(st) != make_etag(st, "medium")
+    assert make_etag(st, weak=True).startswith('W/"')
+    os.utime(path, (MTIME, MTIME))
+    assert make_etag(os.stat(path)) != make_etag(st)
+
+
+def test_if_none_match_uses_weak_comparison():
+    assert is_not_modified(_request(if_none_match=ETAG), ETAG, MTIME)
+    assert is_not_modified(_request(if_none_match=f'"other", W/{ETAG}'), ETAG, MTIME)
+    assert is_not_modified(_request(if_none_match="*"), ETAG, MTIME)
+    assert not is_not_modified(_request(if_none_match='"other"'), ETAG, MTIME)
+
+
+def test_if_none_match_takes_precedence_over_date():
+    request = _request(if_none_match='"other"', if_modified_since=formatdate(MTIME, usegmt=True))
+    assert not is_not_modified(request, ETAG, MTIME)
+
+
+def test_if_modified_since():
+    assert is_not_modified(_request(if_modified_since=formatdate(MTIME, usegmt=True)), ETAG, MTIME + 0.5)
+    assert not is_not_modified(_request(if_modified_since=formatdate(MTIME - 1, usegmt=True)), ETAG, MTIME)
+    assert not is_not_modified(_request(if_modified_since="não é data"), ETAG, MTIME)
+
+
+def test_conditionals_only_apply_to_get_and_head():
+    assert is_not_modified(_request("HEAD", if_none_match=ETAG), ETAG, MTIME)
+    assert not is_not_modified(_request("POST", if_none_match=ETAG), ETAG, MTIME)
+
+
+def test_if_range_without_header_always_matches():
+    assert if_range_matches(_request(), ETAG, MTIME)
+
+
+def test_if_range_etag_needs_strong_match():
+    assert if_range_matches(_request(if_range=ETAG), ETAG, MTIME)
+    assert not if_range_matches(_request(if_range='"other"'), ETAG, MTIME)
+    assert not if_range_matches(_request(if_range=f"W/{ETAG}"), ETAG, MTIME)
+    assert not if_range_matches(_request(if_range=f"W/{ETAG}"), f"W/{ETAG}", MTIME)
+
+
+def test_if_range_date_needs_exact_match():
+    assert if_range_matches(_request(if_range=formatdate(MTIME, usegmt=True)), ETAG, MTIME)
+    assert not if_range_matches(_request(if_range=formatdate(MTIME - 60, usegmt=True)), ETAG, MTIME)
+    assert not if_range_matches(_request(if_range="lixo"), ETAG, MTIME)
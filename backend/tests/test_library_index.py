@@ -0,0 +1,67 @@
+import pytest
+from fastapi import HTTPException
+
+from app.services.audio_manager import AudioManager
+from app.services.library_index import LibraryIndex
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    monkeypatch.setattr(AudioManager, "BASE_PATH", str(tmp_path))
+    monkeypatch.setattr(LibraryIndex, "BASE_PATH", str(tmp_path))
+    monkeypatch.setattr(LibraryIndex, "_by_name", {})
+    monkeypatch.setattr(LibraryIndex, "_by_lower", {})
+    monkeypatch.setattr(LibraryIndex, "_ready", False)
+    monkeypatch.setattr(LibraryIndex, "_inotify_active", False)
+    (tmp_path / "Artista" / "Album").mkdir(parents=True)
+    (tmp_path / "Artista" / "Album" / "01 - Faixa.flac").write_bytes(b"x")
+    LibraryIndex.build()
+    return tmp_path
+
+
+def test_lookup_by_basename(library):
+    found = AudioManager.find_local_file("outra/pasta/01 - Faixa.flac")
+    assert found == str(library / "Artista" / "Album" / "01 - Faixa.flac")
+
+
+def test_polling_index_miss_falls_back_to_disk_and_indexes(library):
+    new_file = library / "Novo" / "02 - Nova.flac"
+    new_file.parent.mkdir()
+    new_file.write_bytes(b"x")
+
+    assert AudioManager.find_local_file("02 - Nova.flac") == str(new_file)
+    assert LibraryIndex.lookup("02 - Nova.flac") == str(new_file)
+
+
+def test_live_index_miss_is_404_without_walking(library, monkeypatch):
+    monkeypatch.setattr(LibraryIndex, "_inotify_active", True)
+    monkeypatch.setattr(AudioManager, "_walk_lookup", staticmethod(lambda name: pytest.fail("varreu o disco")))
+    with pytest.raises(HTTPException) as exc:
+        AudioManager.find_local_file("nao-existe.flac")
+    assert exc.value.status_code == 404
+
+
+def test_add_path_ignores_files_outside_library(library, tmp_path_factory):
+    outside = tmp_path_factory.mktemp("fora") / "x.flac"
+    LibraryIndex.add_path(str(outside))
+    assert "x.flac" not in LibraryIndex._by_name
+
+
+def test_events_during_rebuild_are_not_lost(library, monkeypatch):
+    scan = LibraryIndex._scan
+    new_file = library / "Artista" / "Album" / "02 - Nova.flac"
+
+    def scan_then_event(root_rel: str = ""):
+        files = scan(root_rel)
+        # O inotify entrega eventos depois que a varredura já passou pela pasta
+        new_file.write_bytes(b"x")
+        LibraryIndex.add_file("Artista/Album/02 - Nova.flac")
+        LibraryIndex.remove_file("Artista/Album/01 - Faixa.flac")
+        return files
+
+    monkeypatch.setattr(LibraryIndex, "_scan", staticmethod(scan_then_event))
+    LibraryIndex.build()
+
+    assert LibraryIndex.lookup("02 - Nova.flac") == str(new_file)
+    assert "01 - Faixa.flac" not in LibraryIndex._by_name
+    assert LibraryIndex._journals == []
@@ -0,0 +1,43 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.database import Base
+from app.services.library_scanner import LibraryScanner
+
+
+@pytest.fixture
+def db(monkeypatch):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[models.Track.__table__])
+    session = sessionmaker(bind=engine)()
+    monkeypatch.setattr(LibraryScanner, "_progress", {"errors": 0})
+    yield session
+    session.close()
+
+
+def _row(filename: str, genre=None) -> dict:
+    return {"filename": filename, "title": filename, "artist": "A", "album": None, "genre": genre,
+            "duration": 1.0, "format": "FLAC", "bitrate": 900, "file_size": 10, "file_mtime": 1.0}
+
+
+def test_batch_insert(db):
+    LibraryScanner._flush(db, [_row("a.flac"), _row("b.flac")], [])
+    assert sorted(t.filename for t in db.query(models.Track)) == ["a.flac", "b.flac"]
+
+
+def test_track_created_during_scan_does_not_abort_batch(db):
+    # Criada por uma request entre o diff e a gravação do lote
+    db.add(models.Track(filename="b.flac", title="b", artist="A", genre="Rock"))
+    db.commit()
+
+    inserts = [_row("a.flac"), _row("b.flac"), _row("c.flac")]
+    LibraryScanner._flush(db, inserts, [])
+
+    tracks = {t.filename: t for t in db.query(models.Track)}
+    assert sorted(tracks) == ["a.flac", "b.flac", "c.flac"]
+    assert tracks["b.flac"].file_size == 10
+    assert tracks["b.flac"].genre == "Rock"  # Gênero já resolvido não se perde
+    assert LibraryScanner._progress["errors"] == 0
+    assert inserts == []
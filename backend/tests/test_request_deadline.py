@@ -0,0 +1,63 @@
+import asyncio
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.services.request_deadline import RequestDeadline
+
+
+def test_no_deadline_outside_routes():
+    assert RequestDeadline.remaining() is None
+    assert not RequestDeadline.expired()
+
+
+def test_limit_sets_and_resets_the_deadline():
+    @RequestDeadline.limit(5)
+    async def route():
+        return RequestDeadline.remaining()
+
+    remaining = asyncio.run(route())
+    assert 4.5 < remaining <= 5
+    assert RequestDeadline.remaining() is None
+
+
+def test_nested_limit_keeps_the_shorter_deadline():
+    @RequestDeadline.limit(10)
+    async def inner():
+        return RequestDeadline.remaining()
+
+    @RequestDeadline.limit(1)
+    async def outer():
+        return await inner(), RequestDeadline.remaining()
+
+    inner_remaining, outer_remaining = asyncio.run(outer())
+    assert inner_remaining <= 1
+    assert outer_remaining <= 1
+
+
+def test_deadline_reaches_tasks_and_threads():
+    @RequestDeadline.limit(0.05)
+    async def route():
+        await asyncio.sleep(0.06)
+        in_task = await asyncio.gather(asyncio.sleep(0, result=None), _expired_async())
+        in_thread = await run_in_threadpool(RequestDeadline.expired)
+        return in_task[1], in_thread
+
+    async def _expired_async():
+        return RequestDeadline.expired()
+
+    assert asyncio.run(route()) == (True, True)
+
+
+def test_clear_only_affects_the_current_context():
+    @RequestDeadline.limit(5)
+    async def route():
+        async def background():
+            RequestDeadline.clear()
+            return RequestDeadline.remaining()
+
+        cleared = await asyncio.create_task(background())
+        return cleared, RequestDeadline.remaining()
+
+    cleared, remaining = asyncio.run(route())
+    assert cleared is None
+    assert remaining is not None
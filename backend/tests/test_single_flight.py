@@ -0,0 +1,211 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+from app.services.metadata_provider import MetadataProvider
+from app.services.provider_cache import ProviderCache
+from app.services.request_deadline import RequestDeadline
+from app.services.single_flight import SingleFlight
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_concurrent_calls_are_coalesced_and_copied():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"tracks": [1, 2]}
+
+    async def main():
+        return await asyncio.gather(*(SingleFlight.do_async("t:coalesce", fetch) for _ in range(10)))
+
+    results = _run(main())
+    assert len(calls) == 1
+    assert all(r == {"tracks": [1, 2]} for r in results)
+    results[0]["tracks"].append(3)
+    assert results[1] == {"tracks": [1, 2]}
+    assert "t:coalesce" not in SingleFlight._inflight
+
+
+def test_cancelled_follower_does_not_poison_the_key():
+    release = None
+
+    async def fetch():
+        await release.wait()
+        return "ok"
+
+    async def main():
+        nonlocal release
+        release = asyncio.Event()
+        leader = asyncio.create_task(SingleFlight.do_async("t:cancel", fetch))
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(SingleFlight.do_async("t:cancel", fetch))
+        patient = asyncio.create_task(SingleFlight.do_async("t:cancel", fetch))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        await asyncio.sleep(0.01)
+        release.set()
+        return await leader, await patient, cancelled.cancelled()
+
+    assert _run(main()) == ("ok", "ok", True)
+    assert "t:cancel" not in SingleFlight._inflight
+
+
+def test_cancelled_leader_makes_followers_call_themselves():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return len(calls)
+
+    async def main():
+        leader = asyncio.create_task(SingleFlight.do_async("t:leader", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(SingleFlight.do_async("t:leader", fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    assert _run(main()) == 2
+    assert "t:leader" not in SingleFlight._inflight
+
+
+def test_leader_exception_reaches_followers():
+    async def fetch():
+        await asyncio.sleep(0.02)
+        raise ValueError("upstream")
+
+    async def main():
+        return await asyncio.gather(*(SingleFlight.do_async("t:error", fetch) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(r, ValueError) for r in _run(main()))
+    assert "t:error" not in SingleFlight._inflight
+
+
+def test_unshareable_result_stays_with_the_leader():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return len(calls)
+
+    async def main():
+        return await asyncio.gather(*(
+            SingleFlight.do_async("t:private", fetch, shareable=lambda value: value != 1) for _ in range(2)
+        ))
+
+    assert _run(main()) == [1, 2]
+
+
+def test_threads_share_the_call():
+    calls = []
+    results = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        return "ok"
+
+    threads = [threading.Thread(target=lambda: results.append(SingleFlight.do("t:threads", fetch))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["ok"] * 5
+    assert len(calls) == 1
+
+
+@pytest.fixture
+def no_cache(monkeypatch):
+    monkeypatch.setattr(ProviderCache, "ENABLED", False)
+    monkeypatch.setattr(ProviderCache, "_stats", {})
+
+
+def test_followers_inherit_the_failure_flag(no_cache):
+    @ProviderCache.cached("t.inner", ttl=60)
+    async def inner(query: str):
+        await asyncio.sleep(0.02)
+        ProviderCache.mark_failed()
+        return []
+
+    @ProviderCache.cached("t.outer_a", ttl=60)
+    async def outer_a(query: str):
+        return await inner(query)
+
+    @ProviderCache.cached("t.outer_b", ttl=60)
+    async def outer_b(query: str):
+        await asyncio.sleep(0.005)  # Chega depois: vira seguidora de inner
+        return await inner(query)
+
+    async def main():
+        await asyncio.gather(outer_a("x"), outer_b("x"))
+
+    _run(main())
+    stats = ProviderCache.stats()["namespaces"]
+    assert stats["t.inner"]["failures"] == 1
+    assert stats["t.outer_a"]["failures"] == 1
+    assert stats["t.outer_b"]["failures"] == 1  # Sem o flag, o resultado vazio iria para o cache
+
+
+def test_failure_from_expired_deadline_is_not_shared(no_cache):
+    calls = []
+
+    @ProviderCache.cached("t.deadline", ttl=60)
+    async def fetch(query: str):
+        calls.append(RequestDeadline.expired())
+        await asyncio.sleep(0.03)
+        if RequestDeadline.expired():
+            ProviderCache.mark_failed()  # Como o cliente HTTP faz ao recusar a chamada
+            return []
+        return ["resultado"]
+
+    @RequestDeadline.limit(0.01)
+    async def short_request():
+        return await fetch("x")
+
+    async def patient_request():
+        await asyncio.sleep(0.005)
+        return await fetch("x")
+
+    async def main():
+        return await asyncio.gather(short_request(), patient_request())
+
+    assert _run(main()) == [[], ["resultado"]]
+    assert len(calls) == 2
+
+
+def test_genre_error_policy_is_per_caller(no_cache, monkeypatch):
+    calls = []
+
+    def failing_query(term: str, entity: str):
+        calls.append(term)
+        time.sleep(0.05)
+        raise RuntimeError("429")
+
+    monkeypatch.setattr(MetadataProvider, "_query_itunes", failing_query)
+    results = {}
+
+    def lookup(raise_errors: bool):
+        try:
+            results[raise_errors] = MetadataProvider.get_genre("Artista", "Álbum", raise_errors=raise_errors)
+        except RuntimeError as e:
+            results[raise_errors] = e
+
+    threads = [threading.Thread(target=lookup, args=(flag,)) for flag in (False, True)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Uma busca só, mas quem não pediu raise_errors não recebe a exceção (e vice-versa)
+    assert len(calls) == 1
+    assert results[False] == "Desconhecido"
+    assert isinstance(results[True], RuntimeError)
@@ -0,0 +1,105 @@
+import os
+import asyncio
+
+import pytest
+
+from app.services.ffmpeg_pool import FFmpegPool
+from app.services.transcode_cache import TranscodeCache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(TranscodeCache, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(TranscodeCache, "MAX_BYTES", 1000)
+    monkeypatch.setattr(TranscodeCache, "_total_bytes", None)
+    return tmp_path
+
+
+def _entry(name: str) -> str:
+    return TranscodeCache._entry_path(name * 64, "mp3")
+
+
+def _store_aged(name: str, size: int, mtime: float) -> str:
+    path = _entry(name)
+    TranscodeCache.store(path, b"x" * size)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_first_register_scans_existing_entries(cache):
+    _store_aged("a", 300, 1000)
+    # A primeira gravação conta o que já estava no disco, inclusive ela mesma
+    assert TranscodeCache.stats()["used_bytes"] == 300
+    TranscodeCache.store(_entry("b"), b"x" * 200)
+    assert TranscodeCache.stats()["used_bytes"] == 500
+
+
+def test_evicts_least_recently_used_until_below_target(cache):
+    oldest = _store_aged("a", 400, 1000)
+    middle = _store_aged("b", 400, 2000)
+    newest = _store_aged("c", 400, 3000)  # 1200 > 1000: despeja até ficar <= 900
+
+    assert not os.path.exists(oldest)
+    assert os.path.exists(middle)
+    assert os.path.exists(newest)
+    assert TranscodeCache.stats()["used_bytes"] == 800
+
+
+def test_touch_renews_lru(cache):
+    first = _store_aged("a", 400, 1000)
+    second = _store_aged("b", 400, 2000)
+    assert TranscodeCache.touch(first)  # Agora é o mais recente
+
+    TranscodeCache.store(_entry("c"), b"x" * 400)
+
+    assert os.path.exists(first)
+    assert not os.path.exists(second)
+
+
+def test_partial_files_are_ignored(cache):
+    path = _entry("a")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.abcd1234.part", "wb") as f:
+        f.write(b"x" * 5000)
+    TranscodeCache._ensure_total()
+    assert TranscodeCache.stats()["used_bytes"] == 0
+
+
+def test_stats_does_not_scan(cache):
+    _store_aged("a", 100, 1000)
+    TranscodeCache._total_bytes = None
+    assert TranscodeCache.stats()["used_bytes"] is None
+    TranscodeCache._ensure_total()
+    assert TranscodeCache.stats()["used_bytes"] == 100
+
+
+def _tee(source: str, script: str) -> bytes:
+    """Passa pelo tee_stream a saída de um processo que faz o papel do ffmpeg."""
+    async def run():
+        job = await FFmpegPool.spawn(["sh", "-c", script], admission=False)
+        try:
+            return b"".join([chunk async for chunk in TranscodeCache.tee_stream(job, source, "medium")])
+        finally:
+            await job.close()
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "faixa.flac"
+    path.write_bytes(b"fonte")
+    return str(path)
+
+
+def test_tee_stream_caches_successful_encode(cache, source):
+    assert _tee(source, "printf encoded") == b"encoded"
+    cached = TranscodeCache.lookup(source, "medium")
+    with open(cached, "rb") as f:
+        assert f.read() == b"encoded"
+
+
+def test_tee_stream_skips_failed_encode(cache, source):
+    # O cliente recebe o que saiu, mas um encode truncado não vira o tier completo
+    assert _tee(source, "printf truncated; exit 1") == b"truncated"
+    assert TranscodeCache.lookup(source, "medium") is None
+    assert not [name for _, _, names in os.walk(cache) for name in names if name.endswith(".mp3")]